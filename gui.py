@@ -11,6 +11,7 @@ from tkinter import filedialog, messagebox, ttk
 from typing import List, Optional
 
 from src.batch_processor import BatchProcessor
+from src.change_store import ChangeStore
 from src.converter import DialogConverter
 from src import updater
 
@@ -18,6 +19,9 @@ from src import updater
 class DialogConverterGUI:
     """Interfaz gráfica para conversión de diálogos."""
 
+    # Almacén SQLite de cambios que se crea en la carpeta de salida
+    CHANGE_STORE_NAME = "cambios.sqlite"
+
     def __init__(self, root: tk.Tk):
         self.root = root
         self.root.title("Conversor de Diálogos a Español")
@@ -374,9 +378,15 @@ class DialogConverterGUI:
         files = filedialog.askopenfilenames(
             title="Seleccionar archivos",
             filetypes=[
-                ("Archivos de texto", "*.txt *.odt"),
+                (
+                    "Archivos de texto",
+                    "*.txt *.md *.markdown *.html *.htm *.odt *.fodt *.docx *.epub",
+                ),
                 ("Archivos de texto", "*.txt"),
-                ("Documentos ODT", "*.odt"),
+                ("Documentos ODT", "*.odt *.fodt"),
+                ("Documentos Word", "*.docx"),
+                ("Libros EPUB", "*.epub"),
+                ("Markdown / HTML", "*.md *.markdown *.html *.htm"),
                 ("Todos los archivos", "*.*"),
             ],
         )
@@ -421,7 +431,7 @@ class DialogConverterGUI:
                 )
             else:
                 self.status_var.set(
-                    "AVISO: No se encontraron archivos .txt o .odt en la carpeta"
+                    "AVISO: No se encontraron archivos para convertir en la carpeta"
                 )
 
     def _update_default_output(self):
@@ -544,7 +554,9 @@ class DialogConverterGUI:
         def run_in_thread():
             try:
                 converter = DialogConverter()
-                batch = BatchProcessor(converter)
+                batch = BatchProcessor(
+                    converter, change_store=output_path / self.CHANGE_STORE_NAME
+                )
 
                 results_list = batch.process_files(
                     files=self.selected_files,
@@ -656,15 +668,21 @@ class DialogConverterGUI:
             if isinstance(file_path, str):
                 file_path = Path(file_path)
 
-            filename = file_path.name
+            filename = file_path.as_posix()
 
             if success:
-                status = "OK"
+                status = (
+                    "Sin diálogos"
+                    if result.get("status") == BatchProcessor.STATUS_NO_DIALOG
+                    else "OK"
+                )
                 changes = str(result.get("changes", 0))
                 warnings = result.get("warnings", 0)
                 avisos = str(warnings) if warnings > 0 else "-"
                 # Guardar path del log usando el nombre de archivo como clave
-                log_file = output_dir / f"{file_path.stem}_convertido.log.txt"
+                log_file = result.get("log_file") or (
+                    output_dir / f"{file_path.stem}_convertido.log.txt"
+                )
                 self.result_logs[filename] = log_file
                 tag = "warning" if warnings > 0 else ""
             else:
@@ -694,10 +712,13 @@ class DialogConverterGUI:
             values = tree.item(item_id, "values")
             filename = values[0]
 
-            # Buscar el log correspondiente
+            # Buscar el log correspondiente (preferir el almacén SQLite)
             log_file = self.result_logs.get(filename)
+            store_path = output_dir / self.CHANGE_STORE_NAME
 
-            if log_file and log_file.exists():
+            if log_file and store_path.exists():
+                self._show_log_window(log_file, filename, store_path=store_path)
+            elif log_file and log_file.exists():
                 self._show_log_window(log_file, filename)
             else:
                 messagebox.showerror(
@@ -730,8 +751,15 @@ class DialogConverterGUI:
             f"OK: Procesamiento completado: {success_count}/{total} archivos"
         )
 
-    def _show_log_window(self, log_file: Path, filename: str):
-        """Muestra ventana con el contenido del log formateado."""
+    def _show_log_window(
+        self, log_file: Path, filename: str, store_path: Optional[Path] = None
+    ):
+        """
+        Muestra ventana con el contenido del log formateado.
+
+        Si hay almacén SQLite del lote, los cambios se consultan ahí (con
+        filtro por regla) en vez de parsear el log de texto.
+        """
         log_window = tk.Toplevel(self.root)
         log_window.title(f"Log de conversión - {filename}")
         log_window.geometry("1000x700")
@@ -748,11 +776,22 @@ class DialogConverterGUI:
 
         ttk.Label(
             header_frame,
-            text=f"Archivo: {log_file.name}",
+            text=f"Archivo: {store_path.name if store_path else log_file.name}",
             font=("Helvetica", 9),
             foreground="gray",
         ).pack(side=tk.RIGHT)
 
+        rule_var = tk.StringVar(value="Todas")
+        if store_path:
+            ttk.Combobox(
+                header_frame,
+                textvariable=rule_var,
+                values=("Todas", "N1", "D1", "D2", "D3", "D4", "D5"),
+                state="readonly",
+                width=8,
+            ).pack(side=tk.RIGHT, padx=10)
+            ttk.Label(header_frame, text="Regla:").pack(side=tk.RIGHT)
+
         # Text widget con scrollbar
         text_frame = ttk.Frame(log_window, padding="10")
         text_frame.pack(fill=tk.BOTH, expand=True)
@@ -805,17 +844,28 @@ class DialogConverterGUI:
         )
         text_widget.tag_config("stats", font=("Monospace", 9), foreground="#7f8c8d")
 
-        # Leer y parsear log
-        try:
-            with open(log_file, "r", encoding="utf-8") as f:
-                log_content = f.read()
+        def load_log(*_):
+            text_widget.config(state="normal")
+            text_widget.delete("1.0", tk.END)
+            try:
+                if store_path:
+                    rule = rule_var.get()
+                    with ChangeStore(store_path) as store:
+                        log_content = store.generate_report(
+                            filename, rule=None if rule == "Todas" else rule
+                        )
+                else:
+                    with open(log_file, "r", encoding="utf-8") as f:
+                        log_content = f.read()
 
-            # Parsear y formatear log
-            self._format_log_content(text_widget, log_content)
+                # Parsear y formatear log
+                self._format_log_content(text_widget, log_content)
+            except Exception as e:
+                text_widget.insert("1.0", f"Error al leer el log:\n{str(e)}")
             text_widget.config(state="disabled")  # Solo lectura
-        except Exception as e:
-            text_widget.insert("1.0", f"Error al leer el log:\n{str(e)}")
-            text_widget.config(state="disabled")
+
+        load_log()
+        rule_var.trace_add("write", load_log)
 
         text_widget.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         vsb.pack(side=tk.RIGHT, fill=tk.Y)
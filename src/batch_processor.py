@@ -2,19 +2,72 @@
 Procesador de lotes para múltiples archivos.
 """
 
+import os
 import shutil
 from pathlib import Path
 from typing import Callable, Dict, List, Optional
 
+from .change_store import ChangeStore
 from .converter import DialogConverter
+from .docx_handler import DOCXProcessor, docx_options, is_docx_file
+from .epub_handler import EPUBProcessor, epub_options, is_epub_file
+from .logger import LOG_MODES, StatsConversionLogger, create_logger
+from .markup_handler import MarkupProcessor, is_markup_file
 from .odt_handler import ODTProcessor, is_odt_file
+from .patch_handler import patch_path_for, save_patch
 
 
 class BatchProcessor:
     """Procesa múltiples archivos en una carpeta."""
 
-    def __init__(self, converter: DialogConverter):
+    # Nombre base del resumen del lote en modo "stats"
+    STATS_LOG_STEM = "resumen_lote"
+
+    # Estado de los archivos copiados tal cual por no tener diálogos
+    STATUS_NO_DIALOG = "skipped: no dialog"
+
+    def __init__(
+        self,
+        converter: DialogConverter,
+        log_mode: str = "full",
+        change_store: Optional[Path] = None,
+        log_options: Optional[Dict] = None,
+        odt_options: Optional[Dict] = None,
+        export_text: bool = False,
+        export_stats: bool = False,
+        patch: bool = False,
+    ):
+        """
+        Args:
+            converter: Conversor base
+            log_mode: "full" (log detallado por archivo) o "stats" (solo
+                contadores, un único resumen para todo el lote)
+            change_store: Ruta de un almacén SQLite donde registrar los
+                cambios de todo el lote (opcional, requiere log_mode "full")
+            log_options: Opciones del log detallado (max_records_per_rule,
+                sample_size, seed, dedup)
+            odt_options: Opciones de `ODTProcessor` (streaming, workers,
+                splice, compress_level, compress_threads, exclude_styles,
+                exclude_sections, exclude_elements)
+            export_text: Exportar además el texto convertido de cada ODT a
+                `<nombre>_convertido.txt`, en la misma pasada
+            export_stats: Guardar además las estadísticas de cada ODT en
+                `<nombre>_convertido.stats.json`, en la misma pasada
+            patch: Guardar solo un parche por archivo (`<nombre>.patch` o
+                `.patch.xml`) en lugar de la copia convertida y el original
+        """
+        if log_mode not in LOG_MODES:
+            raise ValueError(f"Modo de log desconocido: {log_mode}")
+        if change_store is not None and log_mode != "full":
+            raise ValueError("El almacén de cambios requiere log_mode 'full'")
         self.converter = converter
+        self.log_mode = log_mode
+        self.change_store = change_store
+        self.log_options = dict(log_options or {})
+        self.odt_options = dict(odt_options or {})
+        self.export_text = export_text
+        self.export_stats = export_stats
+        self.patch = patch
 
     def process_directory(
         self,
@@ -55,7 +108,10 @@ class BatchProcessor:
 
         # Procesar archivos
         results = self.process_files(
-            files, output_dir, progress_callback=self._show_progress
+            files,
+            output_dir,
+            progress_callback=self._show_progress,
+            base_dir=input_dir,
         )
 
         # Limpiar línea de progreso
@@ -76,6 +132,7 @@ class BatchProcessor:
         files: List[Path],
         output_dir: Path,
         progress_callback: Optional[Callable[[int, int, str], None]] = None,
+        base_dir: Optional[Path] = None,
     ) -> List[Dict]:
         """
         Procesa una lista de archivos.
@@ -84,85 +141,171 @@ class BatchProcessor:
             files: Lista de archivos a procesar
             output_dir: Carpeta de salida
             progress_callback: Función de callback para progreso (current, total, filename)
+            base_dir: Carpeta respecto a la que se nombran los archivos en los
+                resultados, el resumen y el almacén (default: carpeta común)
 
         Returns:
             Lista de resultados
         """
         results = []
+        if base_dir is None:
+            base_dir = self._common_dir(files)
 
-        for idx, file_path in enumerate(files, 1):
-            if progress_callback:
-                progress_callback(idx, len(files), file_path.name)
+        # En modo "stats" un único logger de contadores acumula todo el lote
+        stats_logger = StatsConversionLogger() if self.log_mode == "stats" else None
 
-            try:
-                # CREAR NUEVO CONVERTIDOR POR CADA ARCHIVO
-                converter = DialogConverter()
-
-                # Determinar archivo de salida
-                output_file = (
-                    output_dir / f"{file_path.stem}_convertido{file_path.suffix}"
-                )
-
-                # Procesar según tipo
-                if is_odt_file(file_path):
-                    processor = ODTProcessor(file_path)
-                    processor.process_and_save(output_file, converter.convert)
-                    log_content = converter.logger.generate_report()
-                else:
-                    with open(file_path, "r", encoding="utf-8") as f:
-                        text = f.read()
+        # Almacén SQLite compartido por todo el lote (opcional)
+        store = ChangeStore(self.change_store) if self.change_store else None
 
-                    converted_text, logger = converter.convert(text)
+        try:
+            for idx, file_path in enumerate(files, 1):
+                file_key = self._file_key(file_path, base_dir)
+                if progress_callback:
+                    progress_callback(idx, len(files), file_key)
 
-                    with open(output_file, "w", encoding="utf-8") as f:
-                        f.write(converted_text)
+                try:
+                    results.append(
+                        self._process_file(
+                            file_path, output_dir, stats_logger, store, file_key
+                        )
+                    )
+                except Exception as e:
+                    results.append(
+                        {"file": file_key, "success": False, "error": str(e)}
+                    )
+        finally:
+            if store is not None:
+                store.close()
+
+        if stats_logger is not None:
+            stats_logger.save_to_file(output_dir / f"{self.STATS_LOG_STEM}.log.txt")
+            stats_logger.save_structured_log(
+                output_dir / f"{self.STATS_LOG_STEM}.log.json"
+            )
 
-                    log_content = logger.generate_report()
+        return results
 
-                # Guardar log
-                log_file = output_dir / f"{file_path.stem}_convertido.log.txt"
-                with open(log_file, "w", encoding="utf-8") as f:
-                    f.write(log_content)
+    def _process_file(
+        self,
+        file_path: Path,
+        output_dir: Path,
+        stats_logger: Optional[StatsConversionLogger] = None,
+        store: Optional[ChangeStore] = None,
+        file_key: Optional[str] = None,
+    ) -> Dict:
+        """
+        Convierte un archivo y guarda sus logs.
 
-                # Copiar archivo original para debug
-                original_copy = (
-                    output_dir / f"{file_path.stem}_original{file_path.suffix}"
-                )
-                shutil.copy2(file_path, original_copy)
+        Args:
+            file_path: Archivo a procesar
+            output_dir: Carpeta de salida
+            stats_logger: Logger de contadores compartido (modo "stats")
+            store: Almacén SQLite del lote (opcional)
+            file_key: Nombre del archivo en el resumen y el almacén
+                (default: nombre del archivo)
 
-                # Guardar log estructurado JSON (si hay cambios)
-                json_log_path = None
-                try:
-                    if converter.logger.changes:
-                        json_log_path = (
-                            output_dir / f"{file_path.stem}_convertido.log.json"
-                        )
-                        converter.logger.save_structured_log(json_log_path)
-                except Exception:
-                    pass
-
-                results.append(
-                    {
-                        "file": file_path.name,
-                        "success": True,
-                        "changes": len(converter.logger.changes),
-                        "warnings": len(converter.logger.warnings),
-                        "output": output_file,
-                        "log_file": log_file,
-                        "json_log": str(json_log_path) if json_log_path else None,
-                    }
-                )
-
-            except Exception as e:
-                results.append(
-                    {"file": file_path.name, "success": False, "error": str(e)}
-                )
+        Returns:
+            Dict con el resultado del archivo
+        """
+        if file_key is None:
+            file_key = file_path.name
 
-        return results
+        # CREAR NUEVO CONVERTIDOR POR CADA ARCHIVO
+        if stats_logger is not None:
+            stats_logger.begin_file(file_key)
+            logger = stats_logger
+        else:
+            logger = create_logger(self.log_mode, **self.log_options)
+        converter = DialogConverter(logger=logger)
+
+        # Determinar archivo de salida
+        output_file = output_dir / f"{file_path.stem}_convertido{file_path.suffix}"
+
+        # Procesar según tipo
+        status = "converted"
+        if self.patch:
+            output_file = patch_path_for(file_path, output_dir)
+            save_patch(file_path, output_file, converter.convert, self.odt_options)
+        elif is_odt_file(file_path):
+            processor = ODTProcessor(file_path, **self.odt_options)
+            exports = {}
+            if self.export_text:
+                exports["text_path"] = output_file.with_suffix(".txt")
+            if self.export_stats:
+                exports["stats_path"] = output_file.with_suffix(".stats.json")
+            if not processor.process_and_save(
+                output_file, converter.convert, **exports
+            ):
+                status = self.STATUS_NO_DIALOG
+        elif is_docx_file(file_path):
+            processor = DOCXProcessor(file_path, **docx_options(self.odt_options))
+            if not processor.process_and_save(output_file, converter.convert):
+                status = self.STATUS_NO_DIALOG
+        elif is_epub_file(file_path):
+            processor = EPUBProcessor(file_path, **epub_options(self.odt_options))
+            if not processor.process_and_save(output_file, converter.convert):
+                status = self.STATUS_NO_DIALOG
+        elif is_markup_file(file_path):
+            processor = MarkupProcessor(file_path)
+            if not processor.process_and_save(output_file, converter.convert):
+                status = self.STATUS_NO_DIALOG
+        else:
+            with open(file_path, "r", encoding="utf-8") as f:
+                text = f.read()
+
+            converted_text, _ = converter.convert(text)
+
+            with open(output_file, "w", encoding="utf-8") as f:
+                f.write(converted_text)
+
+        # Guardar log (en modo "stats" se escribe un resumen al final)
+        if stats_logger is not None:
+            log_file = output_dir / f"{self.STATS_LOG_STEM}.log.txt"
+        else:
+            log_file = output_dir / f"{file_path.stem}_convertido.log.txt"
+            with open(log_file, "w", encoding="utf-8") as f:
+                f.write(converter.logger.generate_report())
+
+        # Copiar archivo original para debug (el parche ya se aplica sobre él)
+        if not self.patch:
+            original_copy = output_dir / f"{file_path.stem}_original{file_path.suffix}"
+            shutil.copy2(file_path, original_copy)
+
+        # Guardar log estructurado JSON (si hay cambios)
+        json_log_path = None
+        if stats_logger is not None:
+            file_stats = stats_logger.current_file_stats
+            changes = file_stats["changes"]
+            warnings = file_stats["warnings"]
+        else:
+            stats = converter.logger.get_stats()
+            changes = stats["total_changes"]
+            warnings = stats["total_warnings"]
+            try:
+                if changes:
+                    json_log_path = output_dir / f"{file_path.stem}_convertido.log.json"
+                    converter.logger.save_structured_log(json_log_path)
+            except Exception:
+                pass
+
+        # Registrar en el almacén del lote
+        if store is not None:
+            store.add_logger(file_key, converter.logger, file_path)
+
+        return {
+            "file": file_key,
+            "success": True,
+            "status": status,
+            "changes": changes,
+            "warnings": warnings,
+            "output": output_file,
+            "log_file": log_file,
+            "json_log": str(json_log_path) if json_log_path else None,
+        }
 
     def find_files(self, directory: Path, pattern: str, recursive: bool) -> List[Path]:
         """
-        Encuentra archivos .odt y .txt en la carpeta.
+        Encuentra archivos .odt, .fodt, .docx, .epub, .md, .html y .txt en la carpeta.
 
         Args:
             directory: Carpeta a buscar
@@ -175,7 +318,17 @@ class BatchProcessor:
         files = []
 
         # Extensiones soportadas
-        extensions = {".odt", ".txt"}
+        extensions = {
+            ".odt",
+            ".fodt",
+            ".docx",
+            ".epub",
+            ".md",
+            ".markdown",
+            ".html",
+            ".htm",
+            ".txt",
+        }
 
         if recursive:
             iterator = directory.rglob(pattern)
@@ -190,6 +343,27 @@ class BatchProcessor:
 
         return sorted(files)
 
+    @staticmethod
+    def _common_dir(files: List[Path]) -> Optional[Path]:
+        """Carpeta común a todos los archivos (None si no la hay)."""
+        try:
+            return Path(os.path.commonpath([f.parent for f in files]))
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _file_key(file_path: Path, base_dir: Optional[Path]) -> str:
+        """
+        Nombre de un archivo en el resumen y el almacén: su ruta relativa a
+        `base_dir`, para que "a/cap1.odt" y "b/cap1.odt" no se pisen.
+        """
+        if base_dir is not None:
+            try:
+                return file_path.relative_to(base_dir).as_posix()
+            except ValueError:
+                pass
+        return file_path.name
+
     def _show_progress(self, current: int, total: int, filename: str):
         """
         Muestra barra de progreso.
@@ -235,7 +409,10 @@ class BatchProcessor:
             print("\n✅ Archivos procesados correctamente:")
             for result in successful:
                 changes = result.get("changes", 0)
-                print(f"   ✓ {result['file']:<40} → {changes:>5} cambios")
+                if result.get("status") == self.STATUS_NO_DIALOG:
+                    print(f"   ✓ {result['file']:<40} → sin diálogos (copiado)")
+                else:
+                    print(f"   ✓ {result['file']:<40} → {changes:>5} cambios")
 
         if failed:
             print("\n❌ Archivos con errores:")
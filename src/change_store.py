@@ -0,0 +1,293 @@
+"""
+Almacén SQLite de cambios, compartido por todos los archivos de un lote.
+
+Permite consultar al instante cambios concretos (p. ej. "todos los D3 del
+capítulo 12") sin abrir y parsear cientos de logs de texto.
+"""
+
+import io
+import sqlite3
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+from .logger import ConversionLogger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    name TEXT PRIMARY KEY,
+    path TEXT,
+    changes INTEGER NOT NULL DEFAULT 0,
+    warnings INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS changes (
+    id INTEGER PRIMARY KEY,
+    file TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    line INTEGER NOT NULL,
+    paragraph INTEGER NOT NULL,
+    rule_code TEXT NOT NULL,
+    rule TEXT NOT NULL,
+    original TEXT,
+    converted TEXT,
+    original_fragment TEXT,
+    converted_fragment TEXT,
+    original_span_start INTEGER,
+    original_span_end INTEGER,
+    converted_span_start INTEGER,
+    converted_span_end INTEGER
+);
+CREATE TABLE IF NOT EXISTS warnings (
+    id INTEGER PRIMARY KEY,
+    file TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    paragraph INTEGER NOT NULL,
+    message TEXT,
+    text TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_changes_file ON changes (file, seq);
+CREATE INDEX IF NOT EXISTS idx_changes_rule ON changes (rule_code, file);
+CREATE INDEX IF NOT EXISTS idx_changes_line ON changes (file, line);
+CREATE INDEX IF NOT EXISTS idx_changes_paragraph ON changes (file, paragraph);
+CREATE INDEX IF NOT EXISTS idx_warnings_file ON warnings (file, line);
+"""
+
+_CHANGE_COLUMNS = (
+    "file, seq, line, paragraph, rule_code, rule, original, converted, "
+    "original_fragment, converted_fragment, original_span_start, "
+    "original_span_end, converted_span_start, converted_span_end"
+)
+
+
+def rule_code(rule: str) -> str:
+    """Código corto de una regla ("D3: Inciso..." → "D3")."""
+    return rule.split(":", 1)[0].strip()
+
+
+def parse_range(value: Optional[str]) -> Optional[Tuple[int, int]]:
+    """Convierte "12" o "10-20" en un rango inclusivo (inicio, fin)."""
+    if value is None:
+        return None
+    if "-" in value:
+        start, end = value.split("-", 1)
+        return int(start), int(end)
+    return int(value), int(value)
+
+
+class ChangeStore:
+    """Almacén indexado (SQLite) de cambios y avisos de un lote."""
+
+    def __init__(self, db_path: Path, batch_size: int = 1000):
+        """
+        Abre (o crea) el almacén.
+
+        Args:
+            db_path: Ruta del archivo .sqlite
+            batch_size: Filas por executemany dentro de cada transacción
+        """
+        self.db_path = db_path
+        self.batch_size = max(1, batch_size)
+        self.conn = sqlite3.connect(str(db_path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """Cierra la conexión."""
+        self.conn.close()
+
+    def add_logger(
+        self, file_name: str, logger: ConversionLogger, path: Optional[Path] = None
+    ):
+        """
+        Guarda todos los cambios y avisos de un archivo.
+
+        Si el logger recortó su registro, solo se guardan los cambios
+        conservados; el total del archivo sigue siendo exacto.
+
+        Reemplaza lo que hubiera de una ejecución anterior del mismo archivo.
+        Las inserciones se agrupan en lotes dentro de una única transacción.
+        """
+        with self.conn:
+            self.conn.execute("DELETE FROM changes WHERE file = ?", (file_name,))
+            self.conn.execute("DELETE FROM warnings WHERE file = ?", (file_name,))
+
+            rows = []
+            for rec in logger.changes:
+                o_span = rec.original_span or (None, None)
+                c_span = rec.converted_span or (None, None)
+                # Un cambio deduplicado se expande en una fila por aparición
+                # (todas con los textos de la primera)
+                for seq, line, paragraph in rec.occurrences:
+                    rows.append(
+                        (
+                            file_name,
+                            seq,
+                            line,
+                            paragraph,
+                            rule_code(rec.rule),
+                            rec.rule,
+                            rec.original,
+                            rec.converted,
+                            rec.original_fragment,
+                            rec.converted_fragment,
+                            o_span[0],
+                            o_span[1],
+                            c_span[0],
+                            c_span[1],
+                        )
+                    )
+                if len(rows) >= self.batch_size:
+                    self._insert_changes(rows)
+                    rows = []
+            if rows:
+                self._insert_changes(rows)
+
+            self.conn.executemany(
+                "INSERT INTO warnings (file, line, paragraph, message, text) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    (
+                        file_name,
+                        w["line"],
+                        w.get("paragraph", 0),
+                        w["message"],
+                        w["text"],
+                    )
+                    for w in logger.warnings
+                ),
+            )
+
+            self.conn.execute(
+                "INSERT OR REPLACE INTO files (name, path, changes, warnings) "
+                "VALUES (?, ?, ?, ?)",
+                (
+                    file_name,
+                    str(path) if path else None,
+                    logger.total_changes,
+                    len(logger.warnings),
+                ),
+            )
+
+    def _insert_changes(self, rows: Iterable[tuple]):
+        self.conn.executemany(
+            f"INSERT INTO changes ({_CHANGE_COLUMNS}) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+
+    def has_file(self, file_name: str) -> bool:
+        """Indica si el almacén tiene registros del archivo."""
+        row = self.conn.execute(
+            "SELECT 1 FROM files WHERE name = ?", (file_name,)
+        ).fetchone()
+        return row is not None
+
+    def files(self) -> List[sqlite3.Row]:
+        """Archivos registrados con sus totales."""
+        return self.conn.execute(
+            "SELECT name, path, changes, warnings FROM files ORDER BY name"
+        ).fetchall()
+
+    def query(
+        self,
+        file: Optional[str] = None,
+        rule: Optional[str] = None,
+        lines: Optional[Tuple[int, int]] = None,
+        paragraphs: Optional[Tuple[int, int]] = None,
+        limit: Optional[int] = None,
+    ) -> List[sqlite3.Row]:
+        """
+        Consulta cambios usando los índices del almacén.
+
+        Args:
+            file: Nombre exacto del archivo, o patrón GLOB si contiene * o ?
+            rule: Código de regla ("D3") o nombre completo de la regla
+            lines: Rango inclusivo de líneas
+            paragraphs: Rango inclusivo de párrafos
+            limit: Máximo de filas a devolver
+
+        Returns:
+            Filas ordenadas por archivo y orden de registro
+        """
+        where, params = [], []
+        if file:
+            if any(c in file for c in "*?["):
+                where.append("file GLOB ?")
+            else:
+                where.append("file = ?")
+            params.append(file)
+        if rule:
+            if ":" in rule:
+                where.append("rule = ?")
+            else:
+                where.append("rule_code = ?")
+            params.append(rule)
+        if lines:
+            where.append("line BETWEEN ? AND ?")
+            params.extend(lines)
+        if paragraphs:
+            where.append("paragraph BETWEEN ? AND ?")
+            params.extend(paragraphs)
+
+        sql = f"SELECT id, {_CHANGE_COLUMNS} FROM changes"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY file, seq"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self.conn.execute(sql, params).fetchall()
+
+    def warnings(self, file: str) -> List[sqlite3.Row]:
+        """Avisos registrados para un archivo."""
+        return self.conn.execute(
+            "SELECT line, paragraph, message, text FROM warnings "
+            "WHERE file = ? ORDER BY id",
+            (file,),
+        ).fetchall()
+
+    def generate_report(self, file: str, rule: Optional[str] = None) -> str:
+        """
+        Genera, a partir del almacén, un reporte con el mismo formato que
+        `ConversionLogger.generate_report` (lo usa el visor de logs).
+
+        Los archivos se nombran por su ruta relativa a la carpeta del lote
+        (p. ej. "parte1/cap1.odt"), como en `add_logger`.
+        """
+        formatter = ConversionLogger()
+        rows = self.query(file=file, rule=rule)
+        warnings = [dict(w) for w in self.warnings(file)]
+
+        # Si el logger recortó su registro hay menos filas que cambios: el
+        # total del archivo se toma de la tabla files
+        total = len(rows)
+        if rule is None:
+            stored = self.conn.execute(
+                "SELECT changes FROM files WHERE name = ?", (file,)
+            ).fetchone()
+            if stored is not None:
+                total = stored["changes"]
+
+        buffer = io.StringIO()
+        formatter.write_report_header(buffer, total, warnings)
+
+        if not rows:
+            buffer.write("No se realizaron cambios.\n")
+            return buffer.getvalue()
+
+        for row in rows:
+            formatter.write_change_entry(
+                buffer,
+                row["seq"],
+                row["line"],
+                row["rule"],
+                row["original"],
+                row["converted"],
+            )
+
+        return buffer.getvalue()
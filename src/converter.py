@@ -3,11 +3,21 @@ Lógica principal de conversión de diálogos.
 """
 
 import re
-from typing import Tuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
 from .logger import ConversionLogger
 from .rules import DIALOG_TAGS, is_dialog_tag
 
+# Un run de texto enriquecido: (texto, estilo). El estilo es un valor opaco
+# para el conversor; un run sin texto es un ancla que se conserva en su lugar
+Run = Tuple[str, Any]
+
+# Caracteres que una regla puede eliminar al reescribir una coincidencia
+# (comillas, espacios y puntuación débil); ver `_align_replacement`
+_DROPPABLE = frozenset("\"'\u201C\u201D\u2018\u2019«» \t.,")
+
 
 class DialogConverter:
     """Conversor de diálogos de comillas a formato español con rayas."""
@@ -22,9 +32,66 @@ class DialogConverter:
     # Comillas españolas (latinas)
     LATIN_QUOTES = ("«", "»")
 
-    def __init__(self):
-        self.logger = ConversionLogger()
+    # Todo carácter que alguna regla necesita; un texto sin ninguno de ellos
+    # no puede cambiar
+    QUOTE_CHARS = frozenset("\"'\u201C\u201D\u2018\u2019«»")
+
+    def __init__(self, logger: Optional[ConversionLogger] = None):
+        # Permite inyectar otro logger (p. ej. StatsConversionLogger compartido
+        # por todo un lote)
+        self.logger = logger if logger is not None else ConversionLogger()
         self.current_line = 0
+        # Bloques de texto (líneas) ya convertidos en llamadas anteriores a
+        # convert(); permite numerar párrafos a lo largo de todo un documento
+        self.paragraph_offset = 0
+        # Resultados calculados de antemano (ver prefetch), por texto
+        self._prefetched: Dict[str, List[tuple]] = {}
+        # Conversiones grabadas para repetirlas después (ver recording)
+        self._recording: Optional[List[tuple]] = None
+        # Procedencia de cada carácter de la línea en curso (índice en el
+        # texto original, o None si lo insertó una regla). Solo se mantiene
+        # al convertir runs (ver convert_runs)
+        self._origins: Optional[List[Optional[int]]] = None
+
+    def prefetch(
+        self,
+        texts: Iterable[str],
+        workers: Optional[int] = None,
+        chunksize: int = 64,
+    ):
+        """
+        Convierte de antemano, en un pool de procesos, textos que luego se
+        pedirán a `convert`.
+
+        Cada texto se convierte con un conversor nuevo; cuando después se
+        llama a `convert` con ese texto, se reutiliza el resultado y su log
+        se incorpora al de este conversor con la misma numeración que en
+        serie. El resultado es idéntico al de convertir todo en orden.
+
+        Args:
+            texts: Textos en el orden en que se convertirán
+            workers: Procesos del pool (default: uno por CPU)
+            chunksize: Textos por tarea enviada a cada proceso
+        """
+        # Los textos sin comillas se resuelven al instante en convert(), y
+        # cada texto repetido se convierte una sola vez
+        texts = [text for text in texts if self.has_quotes(text)]
+        unique = list(dict.fromkeys(texts))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = dict(
+                zip(unique, pool.map(convert_isolated, unique, chunksize=chunksize))
+            )
+        for text in texts:
+            self._prefetched.setdefault(text, []).append(results[text])
+
+    @classmethod
+    def has_quotes(cls, text: str) -> bool:
+        """Indica si el texto contiene algún carácter de comillas."""
+        return not cls.QUOTE_CHARS.isdisjoint(text)
+
+    def clear_prefetched(self):
+        """Descarta los resultados de `prefetch` que no se usaron."""
+        self._prefetched.clear()
 
     def _get_sentence_context(self, full_line: str, match) -> str:
         """
@@ -58,7 +125,65 @@ class DialogConverter:
         Returns:
             Tupla (texto_convertido, logger)
         """
-        # PASO 0: Normalizar comillas
+        converted, _ = self._convert(text)
+        return converted, self.logger
+
+    def convert_runs(self, runs: List[Run]) -> Tuple[List[Run], ConversionLogger]:
+        """
+        Convierte texto enriquecido dado como lista de runs (texto, estilo).
+
+        Las reglas se aplican al texto concatenado exactamente como en
+        `convert` (mismo resultado y mismo log), pero se sigue la procedencia
+        de cada carácter: el estilo viaja con los caracteres que sobreviven y
+        los insertados (rayas, espacios) toman el del carácter al que
+        reemplazan o, si no reemplazan ninguno, el de sus vecinos. Los runs
+        sin texto son anclas (p. ej. elementos que no son texto) y se
+        conservan junto al carácter que las seguía.
+
+        Args:
+            runs: Runs de entrada, en orden
+
+        Returns:
+            Tupla (runs_convertidos, logger). Si el texto no cambia, se
+            devuelve la misma lista recibida.
+        """
+        text = "".join(run_text for run_text, _ in runs)
+        converted, origins = self._convert(text, track=True)
+        if converted == text:
+            return runs, self.logger
+        return _runs_from_origins(runs, converted, origins), self.logger
+
+    def _convert(
+        self, text: str, track: bool = False
+    ) -> Tuple[str, Optional[List[Optional[int]]]]:
+        """
+        Convierte un texto; con `track`, devuelve además la procedencia de
+        cada carácter del resultado (None si el texto no cambió).
+        """
+        prefetched = self._prefetched.get(text)
+        if prefetched:
+            entry = prefetched.pop(0)
+            if not prefetched:
+                del self._prefetched[text]
+            if self._recording is not None:
+                self._recording.append(entry)
+            return self._replay(entry)
+
+        if not self.has_quotes(text):
+            if self._recording is not None:
+                self._recording.append((text, None, None))
+            return self._convert_unchanged(text), None
+
+        if self._recording is not None:
+            entry = convert_isolated(text)
+            self._recording.append(entry)
+            return self._replay(entry)
+
+        self.logger.paragraph = self.paragraph_offset + 1
+        self._origins = list(range(len(text))) if track else None
+
+        # PASO 0: Normalizar comillas (carácter por carácter: no altera
+        # la procedencia)
         text = self._normalize_quotes(text)
 
         # PASO 1: Normalizar espacios antes de verbos de dicción
@@ -66,10 +191,21 @@ class DialogConverter:
 
         lines = text.split("\n")
         converted_lines = []
+        text_origins = self._origins
+        converted_origins = [] if track else None
+        pos = 0
 
         for line_num, line in enumerate(lines, 1):
             self.current_line = line_num
+            self.logger.paragraph = self.paragraph_offset + line_num
+            if track:
+                if line_num > 1:
+                    converted_origins.append(text_origins[pos - 1])
+                self._origins = text_origins[pos : pos + len(line)]
+                pos += len(line) + 1
             converted_line = self._convert_line(line)
+            if track:
+                converted_origins.extend(self._origins)
             # Detectar comillas sin cerrar: si quedan comillas dobles (rectas o
             # tipográficas) después de la conversión, el diálogo no estaba bien formado
             if any(c in converted_line for c in ('"', '\u201C', '\u201D')):
@@ -88,7 +224,98 @@ class DialogConverter:
                 pass
             converted_lines.append(converted_line)
 
-        return "\n".join(converted_lines), self.logger
+        self._origins = None
+        self.paragraph_offset += len(lines)
+
+        return "\n".join(converted_lines), converted_origins
+
+    def _replay(self, entry: tuple) -> Tuple[str, Optional[List[Optional[int]]]]:
+        """
+        Usa un resultado de `convert_isolated`: incorpora su log a este
+        conversor con la numeración que tendría en serie.
+        """
+        converted, logger, origins = entry
+        lines = converted.split("\n")
+        self.logger.absorb(logger, self.paragraph_offset, lines)
+        self.paragraph_offset += len(lines)
+        return converted, origins
+
+    @contextmanager
+    def recording(self) -> Iterator[List[tuple]]:
+        """
+        Graba las conversiones hechas dentro del bloque para poder repetirlas
+        después con `replay`, sin volver a convertir.
+
+        Cada texto con comillas se convierte por separado (como en
+        `prefetch`) y su log se incorpora con `_replay`: el resultado y el
+        log son idénticos a los de la conversión en serie.
+
+        Yields:
+            Lista que se va llenando con una entrada por texto convertido
+        """
+        entries: List[tuple] = []
+        self._recording = entries
+        try:
+            yield entries
+        finally:
+            self._recording = None
+
+    def replay(self, entries: List[tuple]):
+        """
+        Repite conversiones grabadas con `recording`: su log se incorpora al
+        de este conversor como si los textos se convirtieran ahora.
+        """
+        for entry in entries:
+            converted, logger, _ = entry
+            if logger is None:
+                self._convert_unchanged(converted)
+            else:
+                self._replay(entry)
+
+    def _convert_unchanged(self, text: str) -> str:
+        """
+        Camino rápido para textos sin comillas: ninguna regla los cambia.
+
+        Mantiene la numeración de párrafos y, como en la conversión normal,
+        intenta ubicar en estas líneas los spans pendientes de textos
+        anteriores.
+        """
+        lines = text.split("\n")
+        for line_num, line in enumerate(lines, 1):
+            self.logger.paragraph = self.paragraph_offset + line_num
+            self.logger.post_process_line_spans(line_num, line)
+        self.paragraph_offset += len(lines)
+        return text
+
+    def _sub(self, pattern, repl, line: str) -> str:
+        """
+        Equivale a `pattern.sub(repl, line)`; si se está siguiendo la
+        procedencia de los caracteres, la actualiza para el resultado.
+        """
+        if self._origins is None:
+            return pattern.sub(repl, line)
+
+        parts = []
+        origins = []
+        pos = 0
+        for match in pattern.finditer(line):
+            start, end = match.span()
+            result = repl(match)
+            parts.append(line[pos:start])
+            origins.extend(self._origins[pos:start])
+            parts.append(result)
+            origins.extend(
+                _align_replacement(match.group(0), result, self._origins[start:end])
+            )
+            pos = end
+
+        if not parts:
+            return line
+
+        parts.append(line[pos:])
+        origins.extend(self._origins[pos:])
+        self._origins = origins
+        return "".join(parts)
 
     def _normalize_quotes(self, text: str) -> str:
         """
@@ -156,7 +383,7 @@ class DialogConverter:
             # No es verbo, dejar como está
             return match.group(0)
 
-        result_text = pattern.sub(add_space, text)
+        result_text = self._sub(pattern, add_space, text)
 
         # Log the normalization changes
         if changes_made:
@@ -252,7 +479,7 @@ class DialogConverter:
             else:
                 return f'"{content1}", {verb}. "{content2}"'
 
-        return pattern.sub(replace_punct, line)
+        return self._sub(pattern, replace_punct, line)
 
     def _convert_dialog_with_interruption(self, line: str, original: str) -> str:
         """
@@ -308,7 +535,7 @@ class DialogConverter:
             )
             return result
 
-        line = pattern1.sub(replace_interruption1, line)
+        line = self._sub(pattern1, replace_interruption1, line)
 
         # Patrón 2: "texto1", verbo resto. "texto2" (con punto)
         pattern2 = re.compile(
@@ -351,7 +578,7 @@ class DialogConverter:
             )
             return result
 
-        return pattern2.sub(replace_interruption2, line)
+        return self._sub(pattern2, replace_interruption2, line)
 
     def _convert_dialog_with_narration(self, line: str, original: str) -> str:
         """
@@ -415,7 +642,7 @@ class DialogConverter:
             )
             return result
 
-        return pattern.sub(replace_narration, line)
+        return self._sub(pattern, replace_narration, line)
 
     def _convert_dialog_with_tag(self, line: str, original: str) -> str:
         """
@@ -473,7 +700,7 @@ class DialogConverter:
             )
             return result
 
-        new_line = pattern1.sub(replace1, line)
+        new_line = self._sub(pattern1, replace1, line)
 
         # Patrón 2: "texto", verbo o "texto." Verbo (comillas tipográficas y rectas)
         pattern2 = re.compile(
@@ -543,7 +770,7 @@ class DialogConverter:
                 return result
 
         if new_line == line:
-            new_line = pattern2.sub(replace2, new_line)
+            new_line = self._sub(pattern2, replace2, new_line)
 
         # Patrón 3: Comillas simples con etiqueta (simples tipográficas y rectas)
         pattern3 = re.compile(
@@ -587,7 +814,7 @@ class DialogConverter:
             )
             return result
 
-        new_line = pattern3.sub(replace3, new_line)
+        new_line = self._sub(pattern3, replace3, new_line)
 
         return new_line
 
@@ -625,7 +852,7 @@ class DialogConverter:
             )
             return result
 
-        new_line = pattern1.sub(replace1, line)
+        new_line = self._sub(pattern1, replace1, line)
 
         # Comillas simples al inicio (simples tipográficas y rectas)
         pattern2 = re.compile(
@@ -655,7 +882,7 @@ class DialogConverter:
             return result
 
         if new_line == line:
-            new_line = pattern2.sub(replace2, new_line)
+            new_line = self._sub(pattern2, replace2, new_line)
 
         # NUEVO: Comillas que son diálogos adicionales en la misma línea
         # Patrón: después de un espacio o después de narración
@@ -702,7 +929,7 @@ class DialogConverter:
         # Solo aplicar si la línea ya tiene rayas (indica
         # que estamos en contexto de diálogos)
         if self.EM_DASH in new_line:
-            new_line = pattern_additional.sub(replace_additional, new_line)
+            new_line = self._sub(pattern_additional, replace_additional, new_line)
 
         return new_line
 
@@ -781,6 +1008,120 @@ class DialogConverter:
             )
             return result
 
-        new_line = pattern.sub(replace, line)
+        new_line = self._sub(pattern, replace, line)
 
         return new_line
+
+
+def _align_replacement(
+    source: str, result: str, source_origins: List[Optional[int]]
+) -> List[Optional[int]]:
+    """
+    Procedencia de los caracteres del reemplazo de una coincidencia.
+
+    Las reglas solo quitan comillas y puntuación, insertan rayas y espacios
+    y pasan verbos a minúsculas, sin reordenar el texto. Basta entonces un
+    recorrido lineal: cada carácter del resultado se empareja con el
+    siguiente igual del original, saltando solo caracteres eliminables; si
+    no lo hay, es un carácter insertado (None).
+    """
+    origins = []
+    j = 0
+    for ch in result:
+        k = j
+        while (
+            k < len(source)
+            and source[k] != ch
+            and source[k].lower() != ch.lower()
+            and source[k] in _DROPPABLE
+        ):
+            k += 1
+        if k < len(source) and (source[k] == ch or source[k].lower() == ch.lower()):
+            origins.append(source_origins[k])
+            j = k + 1
+        else:
+            origins.append(None)
+    return origins
+
+
+def _runs_from_origins(
+    runs: List[Run], converted: str, origins: List[Optional[int]]
+) -> List[Run]:
+    """
+    Reparte el texto convertido en runs según la procedencia de cada carácter.
+
+    La procedencia es creciente (las reglas no reordenan el texto), así que
+    todo se resuelve en recorridos lineales.
+    """
+    source_styles = []
+    anchors = []
+    for run_text, style in runs:
+        if run_text:
+            source_styles.extend([style] * len(run_text))
+        else:
+            anchors.append((len(source_styles), style))
+    source_len = len(source_styles)
+
+    # Procedencia del vecino más cercano con procedencia, a cada lado
+    before = []
+    last = -1
+    for origin in origins:
+        before.append(last)
+        if origin is not None:
+            last = origin
+    after = [source_len] * len(origins)
+    last = source_len
+    for i in range(len(origins) - 1, -1, -1):
+        after[i] = last
+        if origins[i] is not None:
+            last = origins[i]
+
+    styles = []
+    for i, origin in enumerate(origins):
+        if origin is not None:
+            styles.append(source_styles[origin])
+        elif after[i] - before[i] > 1:
+            # Reemplaza caracteres eliminados: toma el estilo del primero
+            styles.append(source_styles[before[i] + 1])
+        elif before[i] < 0:
+            styles.append(source_styles[after[i]] if source_len else None)
+        elif after[i] >= source_len:
+            styles.append(source_styles[before[i]])
+        elif source_styles[before[i]] == source_styles[after[i]]:
+            styles.append(source_styles[before[i]])
+        else:
+            styles.append(None)
+
+    result: List[Run] = []
+    start = 0
+    anchor_idx = 0
+    for i in range(len(converted) + 1):
+        # Las anclas van antes del primer carácter que venga de su derecha
+        while anchor_idx < len(anchors) and (
+            i == len(converted)
+            or (origins[i] is not None and origins[i] >= anchors[anchor_idx][0])
+        ):
+            if i > start:
+                result.append((converted[start:i], styles[start]))
+                start = i
+            result.append(("", anchors[anchor_idx][1]))
+            anchor_idx += 1
+        if i < len(converted) and i > start and styles[i] != styles[start]:
+            result.append((converted[start:i], styles[start]))
+            start = i
+    if start < len(converted):
+        result.append((converted[start:], styles[start]))
+    return result
+
+
+def convert_isolated(text: str) -> tuple:
+    """
+    Convierte un texto con un conversor nuevo (función para el pool).
+
+    Devuelve (texto_convertido, logger, procedencia) para que el proceso
+    principal pueda usar el resultado tanto en `convert` como en
+    `convert_runs`.
+    """
+    converter = DialogConverter()
+    converted, origins = converter._convert(text, track=True)
+    return converted, converter.logger, origins
@@ -0,0 +1,336 @@
+"""
+Módulo para trabajar con archivos DOCX (Office Open XML).
+
+Comparte con `odt_handler` la copia de entradas del ZIP sin recomprimir, el
+parseo con splice (solo se re-serializan los párrafos que cambian) y la
+conversión sobre el modelo de runs (texto, estilo).
+"""
+
+import io
+import shutil
+import zipfile
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+from .odt_handler import (
+    RAW_COPY_CHUNK,
+    _iter_preorder,
+    _iter_spliced_units,
+    _runs_converter,
+    _split_by_slot,
+    _XMLStreamWriter,
+    copy_raw_entry,
+    open_compressed_entry,
+    stream_may_have_dialog,
+)
+
+_W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_W_P = f"{_W_NS}p"
+_W_T = f"{_W_NS}t"
+_XML_SPACE = "{http://www.w3.org/XML/1998/namespace}space"
+
+# Partes con texto del documento que se convierten (si existen)
+DOCX_TEXT_PARTS = ("word/document.xml", "word/footnotes.xml", "word/endnotes.xml")
+
+# Elementos (de w:) que contienen runs del párrafo y se recorren
+_RUN_CONTAINERS = frozenset(
+    f"{_W_NS}{name}"
+    for name in (
+        "r",
+        "hyperlink",
+        "ins",
+        "moveTo",
+        "smartTag",
+        "sdt",
+        "sdtContent",
+        "fldSimple",
+        "customXml",
+        "bdo",
+        "dir",
+    )
+)
+
+# Saltos de línea: separan tramos, como text:line-break en ODT
+_LINE_BREAKS = frozenset((f"{_W_NS}br", f"{_W_NS}cr"))
+
+# Elementos sin texto que ocupan una posición en la línea: anclas
+_RUN_ANCHORS = frozenset(
+    f"{_W_NS}{name}"
+    for name in (
+        "tab",
+        "ptab",
+        "noBreakHyphen",
+        "softHyphen",
+        "sym",
+        "drawing",
+        "pict",
+        "object",
+    )
+)
+
+# Opciones de `ODTProcessor` que también aplican a DOCX
+_SHARED_OPTIONS = ("workers", "compress_level", "compress_threads")
+
+
+def docx_options(odt_options: dict) -> dict:
+    """Subconjunto de las opciones de ODT que admite `DOCXProcessor`."""
+    return {k: v for k, v in odt_options.items() if k in _SHARED_OPTIONS}
+
+
+class DOCXProcessor:
+    """Procesa archivos DOCX preservando toda su estructura."""
+
+    def __init__(
+        self,
+        filepath: Path,
+        workers: int = 0,
+        compress_level: Optional[int] = None,
+        compress_threads: int = 0,
+    ):
+        """
+        Inicializa el procesador de DOCX.
+
+        Args:
+            filepath: Ruta al archivo .docx
+            workers: Si es mayor que 1, convertir los párrafos en un pool de
+                procesos (como en `ODTProcessor`)
+            compress_level: Nivel de deflate de las partes convertidas (0 =
+                sin comprimir)
+            compress_threads: Hilos para comprimir las partes convertidas
+        """
+        if compress_level is not None and not 0 <= compress_level <= 9:
+            raise ValueError(f"Nivel de compresión inválido: {compress_level}")
+        self.filepath = filepath
+        self.workers = workers
+        self.compress_level = compress_level
+        self.compress_threads = compress_threads
+        # Runs ya extraídos por párrafo (ver _collect_paragraph_texts)
+        self._paragraph_runs = {}
+
+    def _text_parts(self, docx_zip: zipfile.ZipFile) -> list:
+        names = set(docx_zip.namelist())
+        return [name for name in DOCX_TEXT_PARTS if name in names]
+
+    def has_dialog(self) -> bool:
+        """Indica si alguna parte con texto del documento contiene comillas."""
+        with zipfile.ZipFile(self.filepath, "r") as docx_zip:
+            for name in self._text_parts(docx_zip):
+                with docx_zip.open(name) as part:
+                    if stream_may_have_dialog(part):
+                        return True
+        return False
+
+    def process_and_save(
+        self, output_path: Path, text_converter_func, skip_without_dialog=True
+    ) -> bool:
+        """
+        Procesa el DOCX aplicando conversiones y guarda preservando estructura.
+
+        Las partes con texto (`DOCX_TEXT_PARTS`) se convierten párrafo a
+        párrafo; el resto de entradas se copian sin descomprimir, en el mismo
+        orden.
+
+        Args:
+            output_path: Ruta de salida
+            text_converter_func: Función que convierte el texto. Recibe str y
+                retorna tuple[str, logger]
+            skip_without_dialog: Si ninguna parte tiene comillas en su texto,
+                copiar el archivo tal cual sin parsear ni recomprimir
+
+        Returns:
+            True si se procesó el documento, False si se copió sin cambios
+        """
+        try:
+            if skip_without_dialog and not self.has_dialog():
+                shutil.copyfile(self.filepath, output_path)
+                return False
+
+            if self.compress_level == 0:
+                zip_options = {"compression": zipfile.ZIP_STORED}
+            else:
+                zip_options = {
+                    "compression": zipfile.ZIP_DEFLATED,
+                    "compresslevel": self.compress_level,
+                }
+
+            with zipfile.ZipFile(self.filepath, "r") as input_zip, open(
+                self.filepath, "rb"
+            ) as raw_input:
+                text_parts = set(self._text_parts(input_zip))
+                with zipfile.ZipFile(output_path, "w", **zip_options) as output_zip:
+                    for info in input_zip.infolist():
+                        if info.filename not in text_parts:
+                            copy_raw_entry(raw_input, output_zip, info)
+                            continue
+                        with input_zip.open(info) as source, open_compressed_entry(
+                            output_zip, info, threads=self.compress_threads
+                        ) as raw_out:
+                            self._process_part(source, raw_out, text_converter_func)
+
+            return True
+
+        except Exception as e:
+            raise Exception(f"Error procesando DOCX: {e}")
+
+    def _process_part(self, source: BinaryIO, raw_out: BinaryIO, text_converter_func):
+        """
+        Convierte una parte XML copiando sus bytes originales y
+        re-serializando solo los `w:p` que cambian (como el modo splice de
+        ODT). Las declaraciones de namespace de la raíz, `mc:Ignorable` y el
+        resto del marcado quedan idénticos byte a byte.
+        """
+        content_xml = source.read()
+        view = memoryview(content_xml)
+
+        buffer = io.StringIO()
+        writer = _XMLStreamWriter(buffer)
+        units = _iter_spliced_units(content_xml, writer, units=("p",))
+
+        converter = getattr(text_converter_func, "__self__", None)
+        parallel = self.workers > 1 and hasattr(converter, "prefetch")
+        if parallel:
+            units = list(units)
+            texts = []
+            for _, _, unit in units:
+                self._collect_paragraph_texts(unit, texts)
+            converter.prefetch(texts, workers=self.workers)
+
+        try:
+            out = io.BufferedWriter(raw_out, RAW_COPY_CHUNK)
+            copied = 0
+            for begin, stop, unit in units:
+                if not self._convert_paragraphs_in_tree(unit, text_converter_func):
+                    continue
+                writer.element(unit)
+                out.write(view[copied:begin])
+                out.write(buffer.getvalue().encode("utf-8"))
+                buffer.seek(0)
+                buffer.truncate()
+                copied = stop
+            out.write(view[copied:])
+            out.flush()
+            out.detach()
+        finally:
+            if parallel:
+                converter.clear_prefetched()
+            self._paragraph_runs.clear()
+
+    def _convert_paragraphs_in_tree(self, element, converter_func) -> bool:
+        """
+        Convierte todos los `w:p` del subárbol (incluidos los de cuadros de
+        texto anidados).
+
+        Returns:
+            True si cambió algún párrafo
+        """
+        changed = False
+        for elem in _iter_preorder(element):
+            if elem.tag == _W_P and self._convert_paragraph(elem, converter_func):
+                changed = True
+        return changed
+
+    def _collect_paragraph_texts(self, element, texts: list):
+        """
+        Recoge, sin modificar el árbol, los textos que
+        `_convert_paragraphs_in_tree` pasará al conversor, en el mismo orden.
+        """
+        for elem in _iter_preorder(element):
+            if elem.tag == _W_P:
+                segments = self._extract_runs(elem)
+                self._paragraph_runs[elem] = segments
+                for runs in segments:
+                    text = "".join(run_text for run_text, _ in runs)
+                    if text.strip():
+                        texts.append(text)
+
+    def _convert_paragraph(self, element, converter_func) -> bool:
+        """
+        Convierte un párrafo sobre su modelo de runs. Cada tramo entre saltos
+        de línea se convierte por separado.
+
+        Returns:
+            True si el párrafo cambió
+        """
+        segments = self._paragraph_runs.pop(element, None)
+        if segments is None:
+            segments = self._extract_runs(element)
+
+        convert_runs = _runs_converter(converter_func)
+        changed = False
+        for runs in segments:
+            if not "".join(run_text for run_text, _ in runs).strip():
+                continue
+            converted, _ = convert_runs(runs)
+            if converted is not runs:
+                self._apply_runs(runs, converted)
+                changed = True
+        return changed
+
+    def _extract_runs(self, element) -> list:
+        """
+        Modelo de runs de un `w:p`: una lista de runs (texto, estilo) por
+        cada tramo entre `w:br` / `w:cr`.
+
+        El "estilo" de un run es su elemento `w:t`: el formato lo da el
+        `w:rPr` del `w:r` que lo contiene, así que el texto que conserve ese
+        `w:t` conserva su formato. Tabuladores, guiones especiales, símbolos
+        e imágenes son anclas (runs sin texto). El texto borrado en control
+        de cambios (`w:del`, `w:delText`), los códigos de campo y los
+        párrafos de cuadros de texto anidados no forman parte del modelo.
+        """
+        segments = [[]]
+        stack = list(reversed(element))
+        while stack:
+            item = stack.pop()
+            tag = item.tag
+            if tag == _W_T:
+                segments[-1].append((item.text or "", item))
+            elif tag in _RUN_CONTAINERS:
+                stack.extend(reversed(item))
+            elif tag in _LINE_BREAKS:
+                segments.append([])
+            elif tag in _RUN_ANCHORS:
+                segments[-1].append(("", item))
+        return segments
+
+    def _apply_runs(self, runs: list, converted: list):
+        """
+        Reparte el texto convertido de un tramo entre sus `w:t` originales.
+
+        Los `w:r` y las anclas no se mueven: cada `w:t` recibe los caracteres
+        cuyo run de origen era él, y los insertados entre dos `w:t` van con
+        el siguiente (ver `_split_by_slot`). Si el conversor devolviera el
+        texto en un orden que no respeta el de los `w:t`, todo el tramo queda
+        en el primero (mismo texto, formato del primer run).
+        """
+        slots = [style for _, style in runs if style.tag == _W_T]
+        pieces = _split_by_slot(slots, converted)
+        if pieces is None:
+            pieces = [[] for _ in slots]
+            pieces[0] = [text for text, _ in converted if text]
+
+        for slot, texts in zip(slots, pieces):
+            text = "".join(texts)
+            slot.text = text
+            if text != text.strip():
+                slot.set(_XML_SPACE, "preserve")
+
+
+def is_docx_file(filepath: Path) -> bool:
+    """
+    Verifica si un archivo es DOCX.
+
+    Args:
+        filepath: Ruta del archivo
+
+    Returns:
+        True si es DOCX
+    """
+    if not filepath.exists() or filepath.suffix.lower() != ".docx":
+        return False
+
+    try:
+        with zipfile.ZipFile(filepath, "r") as z:
+            return "word/document.xml" in z.namelist()
+    except Exception:
+        return False
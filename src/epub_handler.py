@@ -0,0 +1,349 @@
+"""
+Módulo para trabajar con archivos EPUB.
+
+Los capítulos (documentos XHTML del spine del OPF) se convierten párrafo a
+párrafo con la misma maquinaria que ODT: parseo con splice (solo se
+re-serializan los `<p>` que cambian), modelo de runs y, con workers,
+conversión previa en un pool de procesos. El resto de recursos se copian
+sin recomprimir.
+"""
+
+import io
+import posixpath
+import shutil
+import zipfile
+import xml.etree.ElementTree as ET
+from html.entities import html5
+from pathlib import Path
+from typing import Optional
+from urllib.parse import unquote
+
+from .odt_handler import (
+    _iter_spliced_units,
+    _runs_converter,
+    _split_by_slot,
+    _XMLStreamWriter,
+    copy_raw_entry,
+    open_compressed_entry,
+    stream_may_have_dialog,
+)
+
+_CONTAINER_NS = "{urn:oasis:names:tc:opendocument:xmlns:container}"
+_OPF_NS = "{http://www.idpf.org/2007/opf}"
+_XHTML_BR = "{http://www.w3.org/1999/xhtml}br"
+
+# Tipos de medio de los documentos de contenido que se convierten
+_CONTENT_MEDIA_TYPES = ("application/xhtml+xml", "text/html")
+
+# Opciones de `ODTProcessor` que también aplican a EPUB
+_SHARED_OPTIONS = ("workers", "compress_level", "compress_threads")
+
+
+def epub_options(odt_options: dict) -> dict:
+    """Subconjunto de las opciones de ODT que admite `EPUBProcessor`."""
+    return {k: v for k, v in odt_options.items() if k in _SHARED_OPTIONS}
+
+
+def spine_documents(epub_zip: zipfile.ZipFile) -> list:
+    """
+    Documentos de contenido del EPUB en orden de lectura: el OPF se localiza
+    desde META-INF/container.xml y se recorren los `itemref` de su spine.
+
+    Returns:
+        Nombres de entrada del ZIP (sin repetir), en el orden del spine
+    """
+    container = ET.fromstring(epub_zip.read("META-INF/container.xml"))
+    rootfile = container.find(f".//{_CONTAINER_NS}rootfile")
+    if rootfile is None:
+        raise ValueError("container.xml sin rootfile")
+    opf_path = rootfile.get("full-path")
+    opf = ET.fromstring(epub_zip.read(opf_path))
+    base = posixpath.dirname(opf_path)
+
+    manifest = {}
+    for item in opf.iter(f"{_OPF_NS}item"):
+        if item.get("media-type") in _CONTENT_MEDIA_TYPES:
+            href = posixpath.normpath(posixpath.join(base, unquote(item.get("href"))))
+            manifest[item.get("id")] = href
+
+    names = set(epub_zip.namelist())
+    documents = []
+    for itemref in opf.iter(f"{_OPF_NS}itemref"):
+        name = manifest.get(itemref.get("idref"))
+        if name in names and name not in documents:
+            documents.append(name)
+    return documents
+
+
+class EPUBProcessor:
+    """Procesa archivos EPUB preservando toda su estructura."""
+
+    def __init__(
+        self,
+        filepath: Path,
+        workers: int = 0,
+        compress_level: Optional[int] = None,
+        compress_threads: int = 0,
+    ):
+        """
+        Inicializa el procesador de EPUB.
+
+        Args:
+            filepath: Ruta al archivo .epub
+            workers: Si es mayor que 1, convertir los párrafos de todos los
+                capítulos en un pool de procesos antes de reescribirlos
+            compress_level: Nivel de deflate de los capítulos convertidos
+                (0 = sin comprimir)
+            compress_threads: Hilos para comprimir los capítulos convertidos
+        """
+        if compress_level is not None and not 0 <= compress_level <= 9:
+            raise ValueError(f"Nivel de compresión inválido: {compress_level}")
+        self.filepath = filepath
+        self.workers = workers
+        self.compress_level = compress_level
+        self.compress_threads = compress_threads
+
+    def has_dialog(self) -> bool:
+        """Indica si algún capítulo contiene comillas en su texto."""
+        with zipfile.ZipFile(self.filepath, "r") as epub_zip:
+            for name in spine_documents(epub_zip):
+                with epub_zip.open(name) as document:
+                    if stream_may_have_dialog(document):
+                        return True
+        return False
+
+    def process_and_save(
+        self, output_path: Path, text_converter_func, skip_without_dialog=True
+    ) -> bool:
+        """
+        Procesa el EPUB aplicando conversiones y guarda preservando estructura.
+
+        Los capítulos se convierten en orden de lectura (el log sigue el
+        spine); después se escribe el ZIP con `mimetype` en primer lugar y
+        sin comprimir, como exige el formato, y el resto de entradas en su
+        orden original: los capítulos que cambiaron con su nuevo contenido y
+        todo lo demás copiado sin descomprimir.
+
+        Args:
+            output_path: Ruta de salida
+            text_converter_func: Función que convierte el texto. Recibe str y
+                retorna tuple[str, logger]
+            skip_without_dialog: Si ningún capítulo tiene comillas en su
+                texto, copiar el archivo tal cual sin parsear ni recomprimir
+
+        Returns:
+            True si se procesó el documento, False si se copió sin cambios
+        """
+        try:
+            if skip_without_dialog and not self.has_dialog():
+                shutil.copyfile(self.filepath, output_path)
+                return False
+
+            with zipfile.ZipFile(self.filepath, "r") as input_zip, open(
+                self.filepath, "rb"
+            ) as raw_input:
+                converted = self._convert_documents(
+                    input_zip, spine_documents(input_zip), text_converter_func
+                )
+
+                if self.compress_level == 0:
+                    zip_options = {"compression": zipfile.ZIP_STORED}
+                else:
+                    zip_options = {
+                        "compression": zipfile.ZIP_DEFLATED,
+                        "compresslevel": self.compress_level,
+                    }
+
+                infos = input_zip.infolist()
+                infos.sort(key=lambda info: info.filename != "mimetype")
+                with zipfile.ZipFile(output_path, "w", **zip_options) as output_zip:
+                    for info in infos:
+                        if info.filename in converted:
+                            with open_compressed_entry(
+                                output_zip, info, threads=self.compress_threads
+                            ) as out:
+                                out.write(converted[info.filename])
+                        elif (
+                            info.filename == "mimetype"
+                            and info.compress_type != zipfile.ZIP_STORED
+                        ):
+                            output_zip.writestr(
+                                info.filename,
+                                input_zip.read(info),
+                                compress_type=zipfile.ZIP_STORED,
+                            )
+                        else:
+                            copy_raw_entry(raw_input, output_zip, info)
+
+            return True
+
+        except Exception as e:
+            raise Exception(f"Error procesando EPUB: {e}")
+
+    def _convert_documents(
+        self, input_zip: zipfile.ZipFile, names: list, text_converter_func
+    ) -> dict:
+        """
+        Convierte los capítulos indicados, en ese orden.
+
+        Con workers, todos los capítulos se parsean primero y los textos de
+        todos sus párrafos se convierten de una vez en el pool de procesos
+        (`DialogConverter.prefetch`); la reescritura posterior reutiliza esos
+        resultados, con el mismo log que en serie.
+
+        Returns:
+            Nombre de entrada -> XHTML convertido, solo de los que cambiaron
+        """
+        documents = []
+        for name in names:
+            raw = input_zip.read(name)
+            buffer = io.StringIO()
+            writer = _XMLStreamWriter(buffer)
+            units = _iter_spliced_units(raw, writer, units=("p",), entities=html5)
+            documents.append((name, raw, writer, buffer, units))
+
+        converter = getattr(text_converter_func, "__self__", None)
+        parallel = self.workers > 1 and hasattr(converter, "prefetch")
+        runs_by_paragraph = {}
+        if parallel:
+            texts = []
+            for idx, (name, raw, writer, buffer, units) in enumerate(documents):
+                units = list(units)
+                documents[idx] = (name, raw, writer, buffer, units)
+                for _, _, paragraph in units:
+                    segments = _extract_runs(paragraph)
+                    runs_by_paragraph[paragraph] = segments
+                    texts.extend(
+                        text
+                        for text in (
+                            "".join(run_text for run_text, _ in runs)
+                            for runs in segments
+                        )
+                        if text.strip()
+                    )
+            converter.prefetch(texts, workers=self.workers)
+
+        converted = {}
+        try:
+            for name, raw, writer, buffer, units in documents:
+                result = self._splice_document(
+                    raw, writer, buffer, units, text_converter_func, runs_by_paragraph
+                )
+                if result is not None:
+                    converted[name] = result
+        finally:
+            if parallel:
+                converter.clear_prefetched()
+        return converted
+
+    def _splice_document(
+        self, raw, writer, buffer, units, text_converter_func, runs_by_paragraph
+    ) -> Optional[bytes]:
+        """
+        Convierte los `<p>` de un capítulo y arma el XHTML copiando los bytes
+        originales salvo los párrafos que cambiaron.
+
+        Returns:
+            El XHTML convertido, o None si ningún párrafo cambió
+        """
+        view = memoryview(raw)
+        out = io.BytesIO()
+        copied = 0
+        for begin, stop, paragraph in units:
+            segments = runs_by_paragraph.pop(paragraph, None)
+            if segments is None:
+                segments = _extract_runs(paragraph)
+            if not _convert_paragraph(segments, text_converter_func):
+                continue
+            writer.element(paragraph)
+            out.write(view[copied:begin])
+            out.write(buffer.getvalue().encode("utf-8"))
+            buffer.seek(0)
+            buffer.truncate()
+            copied = stop
+        if not copied:
+            return None
+        out.write(view[copied:])
+        return out.getvalue()
+
+
+def _extract_runs(element) -> list:
+    """
+    Modelo de runs de un `<p>`: una lista de runs (texto, hueco) por cada
+    tramo entre `<br/>`.
+
+    Un hueco es un par (elemento, 'text' | 'tail'): el lugar del árbol donde
+    está ese texto. Como el formato inline (`<em>`, `<span>`, enlaces...) lo
+    dan los elementos que rodean cada hueco, el texto que vuelve a su hueco
+    conserva su formato sin mover ninguna etiqueta.
+    """
+    segments = [[]]
+    stack = [(element, "text")]
+    while stack:
+        node, slot = stack.pop()
+        if slot == "tail":
+            if node.tail:
+                segments[-1].append((node.tail, (node, "tail")))
+            continue
+        if node is not element and node.tag == _XHTML_BR:
+            segments.append([])
+            continue
+        if node.text:
+            segments[-1].append((node.text, (node, "text")))
+        for child in reversed(node):
+            stack.append((child, "tail"))
+            stack.append((child, "text"))
+    return segments
+
+
+def _convert_paragraph(segments: list, text_converter_func) -> bool:
+    """
+    Convierte cada tramo de un párrafo y devuelve el texto a sus huecos.
+
+    Cada hueco recibe los caracteres que salieron de él, y los insertados
+    entre dos huecos van con el siguiente (ver `_split_by_slot`). Si el
+    conversor devolviera el texto en un orden que no respeta el de los
+    huecos, todo el tramo queda en el primero.
+
+    Returns:
+        True si el párrafo cambió
+    """
+    convert_runs = _runs_converter(text_converter_func)
+    changed = False
+    for runs in segments:
+        if not "".join(run_text for run_text, _ in runs).strip():
+            continue
+        converted, _ = convert_runs(runs)
+        if converted is runs:
+            continue
+        changed = True
+
+        slots = [slot for _, slot in runs]
+        pieces = _split_by_slot(slots, converted)
+        if pieces is None:
+            pieces = [[] for _ in slots]
+            pieces[0] = [text for text, _ in converted]
+
+        for (node, attr), texts in zip(slots, pieces):
+            setattr(node, attr, "".join(texts) or None)
+    return changed
+
+
+def is_epub_file(filepath: Path) -> bool:
+    """
+    Verifica si un archivo es EPUB.
+
+    Args:
+        filepath: Ruta del archivo
+
+    Returns:
+        True si es EPUB
+    """
+    if not filepath.exists() or filepath.suffix.lower() != ".epub":
+        return False
+
+    try:
+        with zipfile.ZipFile(filepath, "r") as z:
+            return "META-INF/container.xml" in z.namelist()
+    except Exception:
+        return False
@@ -5,18 +5,397 @@ Sistema de logging para registrar todos los cambios realizados.
 import difflib
 import io
 import json
+import random
+from array import array
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Orígenes posibles de un span (se guardan como índice en la tabla de cambios)
+SPAN_SOURCES = ("exact", "fuzzy", "raw", "full_text", "full_converted", "normalized")
+
+# Referencias especiales a textos internados
+_NO_TEXT = -1  # Sin texto (None)
+_FROM_SPAN = -2  # El fragmento es el slice del bloque indicado por su span
+
+
+class ChangeRecord:
+    """
+    Vista ligera de un cambio almacenado en una `ChangeTable`.
+
+    No guarda copias de los textos: resuelve cada campo bajo demanda a partir
+    de las columnas de la tabla. Expone también `get()` para mantener la
+    compatibilidad con el formato dict anterior.
+    """
+
+    __slots__ = ("_table", "_idx")
+
+    FIELDS = (
+        "seq",
+        "line",
+        "paragraph",
+        "rule",
+        "original",
+        "converted",
+        "original_fragment",
+        "converted_fragment",
+        "original_span",
+        "converted_span",
+        "original_span_source",
+        "converted_span_source",
+    )
+
+    def __init__(self, table: "ChangeTable", idx: int):
+        self._table = table
+        self._idx = idx
+
+    @property
+    def seq(self) -> int:
+        return self._table.seqs[self._idx]
+
+    @property
+    def line(self) -> int:
+        return self._table.lines[self._idx]
+
+    @property
+    def paragraph(self) -> int:
+        return self._table.paragraphs[self._idx]
+
+    @property
+    def rule(self) -> str:
+        return self._table.rule_name(self._table.rule_ids[self._idx])
+
+    @property
+    def original(self) -> str:
+        return self._table.text(self._table.original_ids[self._idx])
+
+    @property
+    def converted(self) -> str:
+        return self._table.text(self._table.converted_ids[self._idx])
+
+    @property
+    def original_span(self) -> Optional[List[int]]:
+        return self._table.span(self._idx, 0)
+
+    @property
+    def converted_span(self) -> Optional[List[int]]:
+        return self._table.span(self._idx, 1)
+
+    @property
+    def original_fragment(self) -> Optional[str]:
+        return self._table.fragment(self._idx, 0)
+
+    @property
+    def converted_fragment(self) -> Optional[str]:
+        return self._table.fragment(self._idx, 1)
+
+    @property
+    def original_span_source(self) -> Optional[str]:
+        return self._table.span_source(self._idx, 0)
+
+    @property
+    def converted_span_source(self) -> Optional[str]:
+        return self._table.span_source(self._idx, 1)
+
+    @property
+    def occurrences(self) -> List[Tuple[int, int, int]]:
+        """Apariciones (seq, línea, párrafo) del cambio, empezando por esta."""
+        return self._table.occurrences(self._idx)
+
+    @property
+    def count(self) -> int:
+        """Número de apariciones (más de una si el logger deduplica)."""
+        return self._table.occurrence_count(self._idx)
+
+    def get(self, key: str, default=None):
+        """Acceso estilo dict (compatibilidad con los registros anteriores)."""
+        if key not in self.FIELDS:
+            return default
+        value = getattr(self, key)
+        return default if value is None else value
+
+    def __getitem__(self, key: str):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def to_dict(self) -> dict:
+        """Materializa el registro como dict (mismo formato que antes)."""
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+
+class ChangeTable:
+    """
+    Almacén columnar y compacto de cambios.
+
+    Cada cambio ocupa unas pocas posiciones en arrays de enteros: la regla se
+    guarda como un id pequeño y los textos como referencias a una copia
+    internada y compartida (`_texts`). Los fragmentos que coinciden
+    exactamente con el slice indicado por su span no se guardan: se
+    reconstruyen a partir del bloque. Así, un lote con cientos de miles de
+    cambios repetitivos no duplica cada oración varias veces en memoria.
+    """
+
+    def __init__(self):
+        self._texts: List[str] = []
+        self._text_ids: Dict[str, int] = {}
+        self._rules: List[str] = []
+        self._rule_ids: Dict[str, int] = {}
+
+        # Ordinal del cambio entre todos los registrados (1, 2, ...); con
+        # registro recortado puede haber huecos y el orden físico no coincide
+        self.seqs = array("I")
+        self.lines = array("i")
+        self.paragraphs = array("i")
+        self.rule_ids = array("H")
+        self.original_ids = array("i")
+        self.converted_ids = array("i")
+        # Dos referencias por cambio: fragmento original y convertido
+        self.fragment_ids = array("i")
+        # Cuatro enteros por cambio: inicio/fin del span original y convertido
+        self.spans = array("i")
+        # Dos índices en SPAN_SOURCES por cambio (-1 = sin origen)
+        self.span_sources = array("b")
+        # Apariciones repetidas de un cambio deduplicado: índice → ternas
+        # (seq, línea, párrafo) planas; la primera aparición es la propia fila
+        self._repeats: Dict[int, array] = {}
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+    def __iter__(self) -> Iterator[ChangeRecord]:
+        for idx in range(len(self.lines)):
+            yield ChangeRecord(self, idx)
+
+    def __getitem__(self, idx: int) -> ChangeRecord:
+        if idx < 0:
+            idx += len(self.lines)
+        if not 0 <= idx < len(self.lines):
+            raise IndexError("índice de cambio fuera de rango")
+        return ChangeRecord(self, idx)
+
+    def intern(self, text: Optional[str]) -> int:
+        """Devuelve el id del texto en el pool compartido (lo añade si falta)."""
+        if text is None:
+            return _NO_TEXT
+        ref = self._text_ids.get(text)
+        if ref is None:
+            ref = len(self._texts)
+            self._texts.append(text)
+            self._text_ids[text] = ref
+        return ref
+
+    def text(self, ref: int) -> Optional[str]:
+        """Resuelve una referencia del pool de textos."""
+        return None if ref < 0 else self._texts[ref]
+
+    def rule_id(self, rule: str) -> int:
+        """Devuelve el id compacto de una regla."""
+        ref = self._rule_ids.get(rule)
+        if ref is None:
+            ref = len(self._rules)
+            self._rules.append(rule)
+            self._rule_ids[rule] = ref
+        return ref
+
+    def rule_name(self, ref: int) -> str:
+        return self._rules[ref]
+
+    def rules(self) -> List[str]:
+        """Reglas registradas, en orden de primera aparición."""
+        return list(self._rules)
+
+    def span(self, idx: int, which: int) -> Optional[List[int]]:
+        """Span original (which=0) o convertido (which=1) de un cambio."""
+        start = self.spans[idx * 4 + which * 2]
+        if start < 0:
+            return None
+        return [start, self.spans[idx * 4 + which * 2 + 1]]
+
+    def span_source(self, idx: int, which: int) -> Optional[str]:
+        code = self.span_sources[idx * 2 + which]
+        return None if code < 0 else SPAN_SOURCES[code]
+
+    def fragment(self, idx: int, which: int) -> Optional[str]:
+        ref = self.fragment_ids[idx * 2 + which]
+        if ref == _FROM_SPAN:
+            block = self.original_ids[idx] if which == 0 else self.converted_ids[idx]
+            start, end = self.span(idx, which)
+            return self.text(block)[start:end]
+        return self.text(ref)
+
+    def add_occurrence(self, idx: int, seq: int, line: int, paragraph: int):
+        """Registra otra aparición del cambio `idx` (sin duplicar sus textos)."""
+        repeats = self._repeats.get(idx)
+        if repeats is None:
+            repeats = self._repeats[idx] = array("i")
+        repeats.extend((seq, line, paragraph))
+
+    def occurrences(self, idx: int) -> List[Tuple[int, int, int]]:
+        found = [(self.seqs[idx], self.lines[idx], self.paragraphs[idx])]
+        repeats = self._repeats.get(idx)
+        if repeats:
+            found.extend(
+                (repeats[i], repeats[i + 1], repeats[i + 2])
+                for i in range(0, len(repeats), 3)
+            )
+        return found
+
+    def occurrence_count(self, idx: int) -> int:
+        return 1 + len(self._repeats.get(idx, ())) // 3
+
+    def _fragment_ref(
+        self, block: str, fragment: Optional[str], span: Optional[List[int]]
+    ) -> int:
+        if fragment is None:
+            return _NO_TEXT
+        if span is not None and block[span[0] : span[1]] == fragment:
+            return _FROM_SPAN
+        return self.intern(fragment)
+
+    def _encode(
+        self,
+        line: int,
+        rule: str,
+        original: str,
+        converted: str,
+        original_fragment: Optional[str] = None,
+        converted_fragment: Optional[str] = None,
+        original_span: Optional[List[int]] = None,
+        converted_span: Optional[List[int]] = None,
+        original_span_source: Optional[str] = None,
+        converted_span_source: Optional[str] = None,
+        paragraph: int = 0,
+        seq: int = 0,
+    ) -> tuple:
+        """Convierte un cambio en los valores de cada columna."""
+        spans = []
+        for span in (original_span, converted_span):
+            spans.extend((-1, -1) if span is None else (span[0], span[1]))
+        return (
+            seq,
+            line,
+            paragraph,
+            self.rule_id(rule),
+            self.intern(original),
+            self.intern(converted),
+            (
+                self._fragment_ref(original, original_fragment, original_span),
+                self._fragment_ref(converted, converted_fragment, converted_span),
+            ),
+            spans,
+            [
+                -1 if source is None else SPAN_SOURCES.index(source)
+                for source in (original_span_source, converted_span_source)
+            ],
+        )
+
+    def append(self, **fields) -> int:
+        """
+        Añade un cambio y devuelve su índice.
+
+        Acepta los mismos campos que `ChangeRecord.FIELDS` (el fragmento y el
+        span de cada lado son opcionales). Si no se indica `seq`, se usa la
+        posición del cambio en la tabla.
+        """
+        fields.setdefault("seq", len(self.lines) + 1)
+        seq, line, paragraph, rule, original, converted, frags, spans, sources = (
+            self._encode(**fields)
+        )
+        self.seqs.append(seq)
+        self.lines.append(line)
+        self.paragraphs.append(paragraph)
+        self.rule_ids.append(rule)
+        self.original_ids.append(original)
+        self.converted_ids.append(converted)
+        self.fragment_ids.extend(frags)
+        self.spans.extend(spans)
+        self.span_sources.extend(sources)
+        return len(self.lines) - 1
+
+    def replace(self, idx: int, **fields):
+        """
+        Sobrescribe el cambio `idx` con otro (lo usa el muestreo del logger).
+
+        Los textos del cambio reemplazado siguen en el pool compartido.
+        """
+        seq, line, paragraph, rule, original, converted, frags, spans, sources = (
+            self._encode(**fields)
+        )
+        self.seqs[idx] = seq
+        self.lines[idx] = line
+        self.paragraphs[idx] = paragraph
+        self.rule_ids[idx] = rule
+        self.original_ids[idx] = original
+        self.converted_ids[idx] = converted
+        self.fragment_ids[idx * 2 : idx * 2 + 2] = array("i", frags)
+        self.spans[idx * 4 : idx * 4 + 4] = array("i", spans)
+        self.span_sources[idx * 2 : idx * 2 + 2] = array("b", sources)
+        self._repeats.pop(idx, None)
+
+    def set_converted(
+        self,
+        idx: int,
+        span: Tuple[int, int],
+        converted: Optional[str] = None,
+    ):
+        """Actualiza el span (y opcionalmente el bloque) convertido de un cambio."""
+        # Materializar el fragmento antes de cambiar el bloque o el span
+        fragment = self.fragment(idx, 1)
+        if converted is not None:
+            self.converted_ids[idx] = self.intern(converted)
+        self.spans[idx * 4 + 2] = span[0]
+        self.spans[idx * 4 + 3] = span[1]
+        self.fragment_ids[idx * 2 + 1] = self._fragment_ref(
+            self.text(self.converted_ids[idx]), fragment, list(span)
+        )
 
 
 class ConversionLogger:
     """Registra y formatea los cambios realizados durante la conversión."""
 
-    def __init__(self):
-        # changes: list of dicts with detailed info and optional offsets
-        self.changes: List[dict] = []
+    def __init__(
+        self,
+        max_records_per_rule: Optional[int] = None,
+        sample_size: int = 0,
+        seed: int = 0,
+        dedup: bool = False,
+    ):
+        """
+        Args:
+            max_records_per_rule: Si se indica, solo se guardan en detalle los
+                primeros N cambios de cada regla (los totales siguen exactos)
+            sample_size: Cambios adicionales por regla que se conservan como
+                muestra aleatoria uniforme (reservoir) del resto
+            seed: Semilla del muestreo, para que los logs sean reproducibles
+            dedup: Guardar una sola vez cada transformación idéntica (regla,
+                fragmento original y convertido) con la lista de sus
+                apariciones; no se combina con max_records_per_rule
+        """
+        if dedup and max_records_per_rule is not None:
+            raise ValueError("dedup no puede combinarse con max_records_per_rule")
+        # changes: tabla columnar compacta; iterarla devuelve ChangeRecord
+        self.changes = ChangeTable()
+        # Totales exactos, aunque el registro detallado esté recortado
+        self.total_changes = 0
+        self.rule_totals: Dict[str, int] = {}
+        self.max_records_per_rule = max_records_per_rule
+        self.sample_size = max(0, sample_size)
+        self._rng = random.Random(seed)
+        # Índices de la tabla que forman la muestra de cada regla
+        self._samples: Dict[str, List[int]] = {}
+        # True si algún reemplazo del muestreo alteró el orden de la tabla
+        self._reordered = False
+        self.dedup = dedup
+        # Transformación → índice de la tabla (solo con dedup)
+        self._groups: Dict[tuple, int] = {}
+        # Índices de cambios sin converted_span, por línea (para
+        # post_process_line_spans)
+        self._unresolved: Dict[int, List[int]] = {}
         self.warnings: List[dict] = []
         self.line_number = 0
+        # Ordinal del bloque de texto en curso dentro del documento (lo
+        # actualiza DialogConverter; en TXT coincide con la línea)
+        self.paragraph = 0
         # Threshold tuning for when to fallback to the full text
         # (useful for multi-sentence fragments). Make configurable for tests.
         self.full_text_ratio = 1.5
@@ -54,6 +433,7 @@ class ConversionLogger:
 
         record = {
             "line": line_num,
+            "paragraph": self.paragraph,
             "rule": rule,
             "original": formatted_original,
             "converted": formatted_converted,
@@ -76,6 +456,20 @@ class ConversionLogger:
             and formatted_original.strip() == formatted_converted.strip()
         ):
             return
+
+        # Contar siempre; decidir si el cambio se guarda antes de calcular
+        # spans, para que los descartados no cuesten nada más
+        group_key = self._group_key(
+            rule,
+            formatted_orig_frag,
+            formatted_conv_frag,
+            formatted_original,
+            formatted_converted,
+        )
+        slot = self._admit(rule, line_num, self.paragraph, group_key)
+        if slot is None:
+            return
+
         # Threshold beyond which we allow falling back to the full_text
         # because the fragment seems to be multi-sentence and sentence
         # extraction trimmed the context. Tuned to avoid logging huge
@@ -263,7 +657,174 @@ class ConversionLogger:
             except Exception:
                 pass
 
-        self.changes.append(record)
+        self._store(
+            record,
+            slot,
+            group_key,
+            record["converted_span"] is None and bool(formatted_conv_frag),
+        )
+
+    def _group_key(
+        self,
+        rule: str,
+        original_fragment: Optional[str],
+        converted_fragment: Optional[str],
+        original: str,
+        converted: str,
+    ) -> Optional[tuple]:
+        """Clave de deduplicación de un cambio (None si no se deduplica)."""
+        if not self.dedup:
+            return None
+        if original_fragment or converted_fragment:
+            return (rule, original_fragment, converted_fragment)
+        return (rule, original, converted)
+
+    def _admit(
+        self, rule: str, line_num: int, paragraph: int, group_key: Optional[tuple]
+    ) -> Optional[int]:
+        """
+        Cuenta un cambio y decide si se guarda.
+
+        Returns:
+            None si no hay que guardarlo (descartado por el recorte o
+            repetición de una transformación ya registrada); si no, el
+            destino que indica `_record_slot`
+        """
+        self.total_changes += 1
+        count = self.rule_totals.get(rule, 0) + 1
+        self.rule_totals[rule] = count
+
+        # Una transformación ya registrada solo suma una aparición
+        if group_key is not None:
+            known = self._groups.get(group_key)
+            if known is not None:
+                self.changes.add_occurrence(
+                    known, self.total_changes, line_num, paragraph
+                )
+                return None
+
+        return self._record_slot(rule, count)
+
+    def _store(
+        self, record: dict, slot: int, group_key: Optional[tuple], pending: bool
+    ):
+        """Guarda un cambio admitido (añadiéndolo o reemplazando `slot`)."""
+        record["seq"] = self.total_changes
+        if slot >= 0:
+            self._forget_unresolved(slot)
+            self.changes.replace(slot, **record)
+            self._reordered = True
+            idx = slot
+        else:
+            idx = self.changes.append(**record)
+            if record["rule"] in self._samples:
+                self._samples[record["rule"]].append(idx)
+            if group_key is not None:
+                self._groups[group_key] = idx
+        if pending:
+            self._unresolved.setdefault(record["line"], []).append(idx)
+
+    def absorb(
+        self,
+        other: "ConversionLogger",
+        paragraph_offset: int,
+        converted_lines: List[str],
+    ):
+        """
+        Incorpora los cambios de un logger que convirtió un solo texto por
+        separado (p. ej. en otro proceso), como si se hubiera convertido
+        aquí: el resultado es idéntico al de la conversión en serie.
+
+        Args:
+            other: Logger sin opciones usado para ese texto
+            paragraph_offset: `paragraph_offset` del conversor antes del texto
+            converted_lines: Líneas del texto convertido
+        """
+        # En serie, los cambios pendientes de textos anteriores se intentan
+        # ubicar también en las líneas de este texto
+        for line_num, line in enumerate(converted_lines, 1):
+            if line_num in self._unresolved:
+                self.post_process_line_spans(line_num, line)
+
+        pending = {idx for ids in other._unresolved.values() for idx in ids}
+        for idx, rec in enumerate(other.changes):
+            record = rec.to_dict()
+            record["paragraph"] += paragraph_offset
+            group_key = self._group_key(
+                record["rule"],
+                record["original_fragment"],
+                record["converted_fragment"],
+                record["original"],
+                record["converted"],
+            )
+            slot = self._admit(
+                record["rule"], record["line"], record["paragraph"], group_key
+            )
+            if slot is None:
+                continue
+            self._store(record, slot, group_key, idx in pending)
+
+        for warning in other.warnings:
+            warning = dict(warning)
+            warning["paragraph"] += paragraph_offset
+            self.warnings.append(warning)
+
+        self.paragraph = paragraph_offset + len(converted_lines)
+
+    def _record_slot(self, rule: str, count: int) -> Optional[int]:
+        """
+        Decide qué hacer con el cambio número `count` de una regla.
+
+        Returns:
+            -1 para añadirlo, el índice de la tabla que debe reemplazar
+            (muestreo reservoir) o None para descartarlo
+        """
+        cap = self.max_records_per_rule
+        if cap is None or count <= cap:
+            return -1
+        extra = count - cap
+        sample = self._samples.setdefault(rule, [])
+        if extra <= self.sample_size:
+            return -1
+        j = self._rng.randrange(extra)
+        return sample[j] if j < self.sample_size else None
+
+    def _forget_unresolved(self, idx: int):
+        """Quita un cambio que va a reemplazarse de los pendientes de span."""
+        line = self.changes.lines[idx]
+        pending = self._unresolved.get(line)
+        if pending and idx in pending:
+            pending.remove(idx)
+            if not pending:
+                del self._unresolved[line]
+
+    def records(self) -> Iterator[ChangeRecord]:
+        """Cambios guardados, en el orden en que se registraron."""
+        if self._reordered:
+            return iter(sorted(self.changes, key=lambda rec: rec.seq))
+        return iter(self.changes)
+
+    def truncation(self) -> Dict[str, dict]:
+        """
+        Reglas cuyo registro detallado se recortó.
+
+        Returns:
+            Dict regla → {"total", "kept", "first", "sampled"}
+        """
+        truncated = {}
+        cap = self.max_records_per_rule
+        if cap is None:
+            return truncated
+        for rule, total in self.rule_totals.items():
+            if total > cap:
+                sampled = len(self._samples.get(rule, ()))
+                truncated[rule] = {
+                    "total": total,
+                    "kept": cap + sampled,
+                    "first": cap,
+                    "sampled": sampled,
+                }
+        return truncated
 
     def log_warning(self, line_num: int, text: str, message: str):
         """
@@ -277,6 +838,7 @@ class ConversionLogger:
         self.warnings.append(
             {
                 "line": line_num,
+                "paragraph": self.paragraph,
                 "text": self._format_text(text or ""),
                 "message": message,
             }
@@ -300,25 +862,39 @@ class ConversionLogger:
         norm_lines: List[str] = [" ".join(line.split()) for line in lines]
         return "\n".join(norm_lines)
 
-    def generate_report(self) -> str:
-        """
-        Genera el reporte completo de cambios.
-            Returns:
-                String con el reporte formateado
-        """
-        buffer = io.StringIO()
-
+    def write_report_header(
+        self,
+        buffer: io.StringIO,
+        total_changes: int,
+        warnings: List[dict],
+        truncated: Optional[Dict[str, dict]] = None,
+        distinct_changes: Optional[int] = None,
+    ):
+        """Escribe el resumen inicial del reporte y la sección de avisos."""
         buffer.write("\n")
         buffer.write("RESUMEN DE CONVERSIÓN\n")
         buffer.write("=" * 80 + "\n\n")
 
-        buffer.write(f"Total de cambios realizados: {len(self.changes)}\n")
-        buffer.write(f"Total de avisos: {len(self.warnings)}\n\n")
+        buffer.write(f"Total de cambios realizados: {total_changes}\n")
+        if distinct_changes is not None:
+            buffer.write(f"Cambios distintos: {distinct_changes}\n")
+        buffer.write(f"Total de avisos: {len(warnings)}\n\n")
+
+        if truncated:
+            buffer.write("✂ REGISTRO RECORTADO - Solo se detallan algunos cambios\n")
+            buffer.write("-" * 80 + "\n")
+            for rule, info in truncated.items():
+                buffer.write(f"  {rule}\n")
+                buffer.write(
+                    f"    {info['total']} cambios: se detallan los primeros "
+                    f"{info['first']} y una muestra de {info['sampled']}\n"
+                )
+            buffer.write("\n" + "=" * 80 + "\n\n")
 
-        if self.warnings:
+        if warnings:
             buffer.write("⚠ AVISOS - Comillas sin cerrar detectadas\n")
             buffer.write("-" * 80 + "\n\n")
-            for idx, w in enumerate(self.warnings, 1):
+            for idx, w in enumerate(warnings, 1):
                 buffer.write(f"AVISO #{idx}\n")
                 buffer.write(f"Línea: ~{w['line']}\n")
                 buffer.write(f"Problema: {w['message']}\n")
@@ -326,54 +902,94 @@ class ConversionLogger:
                 buffer.write("\n")
             buffer.write("=" * 80 + "\n\n")
 
-        if not self.changes:
-            buffer.write("No se realizaron cambios.\n")
-            return buffer.getvalue()
+    def write_change_entry(
+        self,
+        buffer: io.StringIO,
+        idx: int,
+        line_num: int,
+        rule: str,
+        original: Optional[str],
+        converted: Optional[str],
+        occurrences: Optional[List[Tuple[int, int, int]]] = None,
+    ):
+        """
+        Escribe la entrada "CAMBIO #n" de un cambio en el reporte.
+        Se reutiliza fuera del logger (p. ej. desde ChangeStore) para que
+        todos los reportes tengan el mismo formato.
+        """
+        buffer.write(f"CAMBIO #{idx}\n")
+        buffer.write(f"Línea: ~{line_num}\n")
+        buffer.write(f"Regla: {rule}\n")
+        if occurrences and len(occurrences) > 1:
+            lines = ", ".join(f"~{line}" for _, line, _ in occurrences)
+            buffer.write(f"Apariciones: {len(occurrences)} (líneas {lines})\n")
+        buffer.write("\n")
 
-        for idx, rec in enumerate(self.changes, 1):
-            line_num = rec.get("line")
-            original = rec.get("original")
-            converted = rec.get("converted")
-            rule = rec.get("rule")
+        # Formatear sin truncar
+        original_display = self._format_text(original or "")
+        converted_display = self._format_text(converted or "")
 
-            buffer.write(f"CAMBIO #{idx}\n")
-            buffer.write(f"Línea: ~{line_num}\n")
-            buffer.write(f"Regla: {rule}\n\n")
+        buffer.write("ORIGINAL:\n")
+        buffer.write(f"  {original_display}\n\n")
 
-            # Formatear sin truncar
-            original_display = self._format_text(original or "")
-            converted_display = self._format_text(converted or "")
+        buffer.write("CONVERTIDO:\n")
+        buffer.write(f"  {converted_display}\n\n")
 
-            buffer.write("ORIGINAL:\n")
-            buffer.write(f"  {original_display}\n\n")
+        # Añadir diff unificado para facilitar revisión inline
+        try:
+            orig_lines = original_display.splitlines(keepends=False)
+            conv_lines = converted_display.splitlines(keepends=False)
+            diff_lines = list(
+                difflib.unified_diff(
+                    orig_lines,
+                    conv_lines,
+                    fromfile="original",
+                    tofile="convertido",
+                    lineterm="",
+                    n=3,
+                )
+            )
+        except Exception:
+            diff_lines = []
 
-            buffer.write("CONVERTIDO:\n")
-            buffer.write(f"  {converted_display}\n\n")
+        if diff_lines:
+            buffer.write("DIFF (unified):\n")
+            for dl in diff_lines:
+                buffer.write(f"  {dl}\n")
+            buffer.write("\n")
 
-            # Añadir diff unificado para facilitar revisión inline
-            try:
-                orig_lines = original_display.splitlines(keepends=False)
-                conv_lines = converted_display.splitlines(keepends=False)
-                diff_lines = list(
-                    difflib.unified_diff(
-                        orig_lines,
-                        conv_lines,
-                        fromfile="original",
-                        tofile="convertido",
-                        lineterm="",
-                        n=3,
-                    )
-                )
-            except Exception:
-                diff_lines = []
+        buffer.write("-" * 80 + "\n\n")
 
-            if diff_lines:
-                buffer.write("DIFF (unified):\n")
-                for dl in diff_lines:
-                    buffer.write(f"  {dl}\n")
-                buffer.write("\n")
+    def generate_report(self) -> str:
+        """
+        Genera el reporte completo de cambios.
+            Returns:
+                String con el reporte formateado
+        """
+        buffer = io.StringIO()
 
-            buffer.write("-" * 80 + "\n\n")
+        self.write_report_header(
+            buffer,
+            self.total_changes,
+            self.warnings,
+            self.truncation(),
+            len(self.changes) if self.dedup else None,
+        )
+
+        if not self.changes:
+            buffer.write("No se realizaron cambios.\n")
+            return buffer.getvalue()
+
+        for rec in self.records():
+            self.write_change_entry(
+                buffer,
+                rec.seq,
+                rec.line,
+                rec.rule,
+                rec.original,
+                rec.converted,
+                rec.occurrences if self.dedup else None,
+            )
 
         return buffer.getvalue()
 
@@ -383,9 +999,9 @@ class ConversionLogger:
         Esto permite inspección programática o visualizaciones externas.
         """
         out = []
-        for rec in self.changes:
-            orig_display = self._format_text(rec.get("original") or "")
-            conv_display = self._format_text(rec.get("converted") or "")
+        for rec in self.records():
+            orig_display = self._format_text(rec.original or "")
+            conv_display = self._format_text(rec.converted or "")
             diff = "\n".join(
                 difflib.unified_diff(
                     orig_display.splitlines(),
@@ -397,23 +1013,38 @@ class ConversionLogger:
                 )
             )
             out_rec = {
-                "line": rec.get("line"),
-                "rule": rec.get("rule"),
+                "seq": rec.seq,
+                "line": rec.line,
+                "paragraph": rec.paragraph,
+                "rule": rec.rule,
                 "original": orig_display,
                 "converted": conv_display,
                 "diff": diff,
-                "original_fragment": rec.get("original_fragment"),
-                "converted_fragment": rec.get("converted_fragment"),
-                "original_span": rec.get("original_span"),
-                "converted_span": rec.get("converted_span"),
-                "original_span_source": rec.get("original_span_source"),
-                "converted_span_source": rec.get("converted_span_source"),
+                "original_fragment": rec.original_fragment,
+                "converted_fragment": rec.converted_fragment,
+                "original_span": rec.original_span,
+                "converted_span": rec.converted_span,
+                "original_span_source": rec.original_span_source,
+                "converted_span_source": rec.converted_span_source,
             }
+            if self.dedup:
+                out_rec["occurrences"] = [
+                    {"seq": seq, "line": line, "paragraph": paragraph}
+                    for seq, line, paragraph in rec.occurrences
+                ]
             out.append(out_rec)
 
+        data = {"changes": out, "warnings": self.warnings}
+        truncated = self.truncation()
+        if truncated:
+            data["total_changes"] = self.total_changes
+            data["truncated"] = truncated
+        elif self.dedup:
+            data["total_changes"] = self.total_changes
+
         filepath.write_text(
             json.dumps(
-                {"changes": out, "warnings": self.warnings},
+                data,
                 ensure_ascii=False,
                 indent=2,
             ),
@@ -440,25 +1071,26 @@ class ConversionLogger:
         and not in the original; searching against the final converted
         line increases the likelihood of finding a converted_span.
         """
-        formatted_conv_full = self._format_text(converted_full_text or "")
-
-        for rec in self.changes:
-            if rec.get("line") != line_num:
-                continue
+        pending = self._unresolved.get(line_num)
+        if not pending:
+            return
 
-            if rec.get("converted_span") is not None:
-                continue
+        formatted_conv_full = self._format_text(converted_full_text or "")
+        table = self.changes
+        still_pending = []
 
-            formatted_conv_frag = rec.get("converted_fragment")
-            if not formatted_conv_frag:
-                continue
+        for idx in pending:
+            formatted_conv_frag = table.fragment(idx, 1)
 
             # Try direct find
             try:
                 jdx = formatted_conv_full.find(formatted_conv_frag)
                 if jdx != -1:
-                    rec["converted_span"] = [jdx, jdx + len(formatted_conv_frag)]
-                    rec["converted"] = formatted_conv_full
+                    table.set_converted(
+                        idx,
+                        (jdx, jdx + len(formatted_conv_frag)),
+                        formatted_conv_full,
+                    )
                     continue
             except Exception:
                 pass
@@ -470,7 +1102,7 @@ class ConversionLogger:
                 sm = SequenceMatcher(None, formatted_conv_full, formatted_conv_frag)
                 match = max(sm.get_matching_blocks(), key=lambda mb: mb.size)
                 if match.size > 3:
-                    rec["converted_span"] = [match.a, match.a + match.size]
+                    table.set_converted(idx, (match.a, match.a + match.size))
                     continue
             except Exception:
                 pass
@@ -489,6 +1121,7 @@ class ConversionLogger:
 
                 norm_frag = _normalize_punct(formatted_conv_frag)
 
+                found = False
                 for i in range(
                     max(1, len(formatted_conv_full) - len(formatted_conv_frag) + 1)
                 ):
@@ -498,12 +1131,243 @@ class ConversionLogger:
                         )
                         == norm_frag
                     ):
-                        rec["converted_span"] = [i, i + len(formatted_conv_frag)]
-                        rec["converted"] = formatted_conv_full
+                        table.set_converted(
+                            idx, (i, i + len(formatted_conv_frag)), formatted_conv_full
+                        )
+                        found = True
                         break
+                if found:
+                    continue
             except Exception:
                 pass
 
+            still_pending.append(idx)
+
+        if still_pending:
+            self._unresolved[line_num] = still_pending
+        else:
+            del self._unresolved[line_num]
+
+    def get_stats(self) -> dict:
+        """
+        Obtiene estadísticas de la conversión.
+            Returns:
+                Diccionario con estadísticas
+        """
+        stats = {
+            "total_changes": self.total_changes,
+            "total_warnings": len(self.warnings),
+            "rules_applied": list(self.rule_totals),
+        }
+        truncated = self.truncation()
+        if truncated:
+            stats["truncated"] = truncated
+        if self.dedup:
+            stats["distinct_changes"] = len(self.changes)
+        return stats
+
+
+class StatsConversionLogger(ConversionLogger):
+    """
+    Logger de solo contadores, pensado para paneles de lotes.
+
+    Ofrece la misma interfaz que `ConversionLogger` pero no guarda registros
+    individuales: acumula contadores por regla, por archivo (hasta
+    `max_file_stats` archivos; el resto, en una entrada común) y por tramo de
+    líneas en estructuras de tamaño acotado. La memoria se mantiene
+    constante sin importar cuántos cambios o archivos se registren. Un mismo logger puede
+    compartirse entre todos los archivos de un lote (ver `begin_file`).
+    """
+
+    # Archivos que se detallan en el resumen; los siguientes se acumulan en
+    # una única entrada OTHER_FILES
+    MAX_FILE_STATS = 1000
+    OTHER_FILES = "(otros archivos)"
+
+    def __init__(
+        self,
+        line_bucket_size: int = 100,
+        max_line_buckets: int = 50,
+        max_file_stats: Optional[int] = None,
+    ):
+        """
+        Args:
+            line_bucket_size: Cantidad de líneas por tramo del histograma
+            max_line_buckets: Número de tramos; el último acumula el resto
+            max_file_stats: Archivos detallados en el resumen (default:
+                MAX_FILE_STATS); el resto se suma en OTHER_FILES
+        """
+        # La tabla de cambios y la lista de avisos de la base quedan vacías:
+        # los métodos heredados (truncation, encabezados...) siguen valiendo
+        super().__init__()
+        self.line_bucket_size = max(1, line_bucket_size)
+        self.total_changes = 0
+        self.total_warnings = 0
+        self.rule_counts: Dict[str, int] = {}
+        self.warning_counts: Dict[str, int] = {}
+        self.line_buckets = array("Q", [0] * max(1, max_line_buckets))
+        self.max_file_stats = (
+            self.MAX_FILE_STATS if max_file_stats is None else max(0, max_file_stats)
+        )
+        self.file_stats: Dict[str, dict] = {}
+        self.current_file: Optional[str] = None
+        # Contadores del archivo en curso (aunque su entrada sea OTHER_FILES)
+        self.current_file_stats = {"changes": 0, "warnings": 0}
+        self._file_entry: Optional[dict] = None
+
+    def begin_file(self, name: str):
+        """
+        Indica el archivo al que se atribuyen los próximos cambios.
+
+        Pasado el límite de archivos detallados, los nuevos se suman a la
+        entrada OTHER_FILES (que cuenta además cuántos archivos reúne).
+        """
+        self.current_file = name
+        self.current_file_stats = {"changes": 0, "warnings": 0}
+        entry = self.file_stats.get(name)
+        if entry is None:
+            if len(self.file_stats) < self.max_file_stats:
+                entry = self.file_stats[name] = self._new_file_entry()
+            else:
+                entry = self.file_stats.get(self.OTHER_FILES)
+                if entry is None:
+                    entry = self.file_stats[self.OTHER_FILES] = self._new_file_entry()
+                    entry["files"] = 0
+                entry["files"] += 1
+        self._file_entry = entry
+
+    @staticmethod
+    def _new_file_entry() -> dict:
+        return {"changes": 0, "warnings": 0, "rules": {}}
+
+    def log_change(
+        self,
+        line_num: int,
+        original: str,
+        converted: str,
+        rule: str,
+        original_fragment: Optional[str] = None,
+        converted_fragment: Optional[str] = None,
+        full_text: Optional[str] = None,
+        full_converted: Optional[str] = None,
+    ):
+        """Cuenta un cambio (mismo criterio de descarte que ConversionLogger)."""
+        if (
+            rule.startswith("D1: Diálogo adicional")
+            and self._format_text(original or "").strip()
+            == self._format_text(converted or "").strip()
+        ):
+            return
+        self._count_change(line_num, rule)
+
+    def _count_change(self, line_num: int, rule: str):
+        self.total_changes += 1
+        self.rule_counts[rule] = self.rule_counts.get(rule, 0) + 1
+
+        bucket = min(
+            max(0, line_num) // self.line_bucket_size, len(self.line_buckets) - 1
+        )
+        self.line_buckets[bucket] += 1
+
+        if self._file_entry is not None:
+            self.current_file_stats["changes"] += 1
+            stats = self._file_entry
+            stats["changes"] += 1
+            stats["rules"][rule] = stats["rules"].get(rule, 0) + 1
+
+    def log_warning(self, line_num: int, text: str, message: str):
+        """Cuenta un aviso agrupándolo por mensaje."""
+        self.total_warnings += 1
+        self.warning_counts[message] = self.warning_counts.get(message, 0) + 1
+        if self._file_entry is not None:
+            self.current_file_stats["warnings"] += 1
+            self._file_entry["warnings"] += 1
+
+    def post_process_line_spans(self, line_num: int, converted_full_text: str):
+        """Sin registros no hay spans que enriquecer."""
+        return
+
+    def absorb(
+        self,
+        other: ConversionLogger,
+        paragraph_offset: int,
+        converted_lines: List[str],
+    ):
+        """Suma los cambios y avisos de un logger que convirtió un texto aparte."""
+        for rec in other.changes:
+            self._count_change(rec.line, rec.rule)
+        for warning in other.warnings:
+            self.log_warning(warning["line"], warning["text"], warning["message"])
+
+    def _bucket_label(self, idx: int) -> str:
+        start = idx * self.line_bucket_size
+        if idx == len(self.line_buckets) - 1:
+            return f"{start}+"
+        return f"{start}-{start + self.line_bucket_size - 1}"
+
+    def generate_report(self) -> str:
+        """
+        Genera un reporte con los contadores acumulados.
+            Returns:
+                String con el reporte formateado
+        """
+        buffer = io.StringIO()
+
+        buffer.write("\n")
+        buffer.write("RESUMEN DE CONVERSIÓN (solo estadísticas)\n")
+        buffer.write("=" * 80 + "\n\n")
+
+        buffer.write(f"Total de cambios realizados: {self.total_changes}\n")
+        buffer.write(f"Total de avisos: {self.total_warnings}\n\n")
+
+        if self.rule_counts:
+            buffer.write("CAMBIOS POR REGLA\n")
+            buffer.write("-" * 80 + "\n")
+            for rule, count in sorted(
+                self.rule_counts.items(), key=lambda item: (-item[1], item[0])
+            ):
+                buffer.write(f"  {count:>8}  {rule}\n")
+            buffer.write("\n")
+
+        if self.warning_counts:
+            buffer.write("AVISOS POR TIPO\n")
+            buffer.write("-" * 80 + "\n")
+            for message, count in self.warning_counts.items():
+                buffer.write(f"  {count:>8}  {message}\n")
+            buffer.write("\n")
+
+        if self.total_changes:
+            buffer.write("CAMBIOS POR TRAMO DE LÍNEAS\n")
+            buffer.write("-" * 80 + "\n")
+            for idx, count in enumerate(self.line_buckets):
+                if count:
+                    buffer.write(f"  {self._bucket_label(idx):>12}  {count}\n")
+            buffer.write("\n")
+
+        if self.file_stats:
+            buffer.write("CAMBIOS POR ARCHIVO\n")
+            buffer.write("-" * 80 + "\n")
+            for name, stats in self.file_stats.items():
+                if "files" in stats:
+                    name = f"{name} ({stats['files']})"
+                buffer.write(
+                    f"  {name:<40} {stats['changes']:>8} cambios"
+                    f" {stats['warnings']:>6} avisos\n"
+                )
+            buffer.write("\n")
+
+        if not self.total_changes:
+            buffer.write("No se realizaron cambios.\n")
+
+        return buffer.getvalue()
+
+    def save_structured_log(self, filepath: Path):
+        """Guarda los contadores en JSON."""
+        filepath.write_text(
+            json.dumps(self.get_stats(), ensure_ascii=False, indent=2),
+            encoding="utf-8",
+        )
+
     def get_stats(self) -> dict:
         """
         Obtiene estadísticas de la conversión.
@@ -511,6 +1375,39 @@ class ConversionLogger:
                 Diccionario con estadísticas
         """
         return {
-            "total_changes": len(self.changes),
-            "rules_applied": list({rec.get("rule") for rec in self.changes}),
+            "total_changes": self.total_changes,
+            "total_warnings": self.total_warnings,
+            "rules_applied": list(self.rule_counts),
+            "rule_counts": dict(self.rule_counts),
+            "warning_counts": dict(self.warning_counts),
+            "line_buckets": {
+                self._bucket_label(idx): count
+                for idx, count in enumerate(self.line_buckets)
+                if count
+            },
+            "files": {
+                name: {**stats, "rules": dict(stats["rules"])}
+                for name, stats in self.file_stats.items()
+            },
         }
+
+
+# Modos de log seleccionables desde BatchProcessor y la CLI
+LOG_MODES = ("full", "stats")
+
+
+def create_logger(log_mode: str = "full", **options) -> ConversionLogger:
+    """
+    Crea el logger correspondiente a un modo de log.
+
+    Args:
+        log_mode: "full" (registro completo) o "stats" (solo contadores)
+        **options: Opciones de `ConversionLogger` (max_records_per_rule,
+            sample_size, seed, dedup); el modo "stats" no guarda registros
+            y las ignora
+    """
+    if log_mode == "full":
+        return ConversionLogger(**options)
+    if log_mode == "stats":
+        return StatsConversionLogger()
+    raise ValueError(f"Modo de log desconocido: {log_mode}")
@@ -4,13 +4,20 @@ Soporta archivos individuales y procesamiento de carpetas.
 """
 
 import argparse
+import json
 import shutil
 import sys
 from pathlib import Path
 
 from .batch_processor import BatchProcessor
+from .change_store import ChangeStore, parse_range
 from .converter import DialogConverter
+from .docx_handler import DOCXProcessor, docx_options, is_docx_file
+from .epub_handler import EPUBProcessor, epub_options, is_epub_file
+from .logger import LOG_MODES, create_logger
+from .markup_handler import MarkupProcessor, is_markup_file
 from .odt_handler import ODTProcessor, is_odt_file
+from .patch_handler import apply_patch, patch_path_for, save_patch
 
 
 def create_parser():
@@ -36,12 +43,55 @@ Ejemplos de uso:
   # Incluir subcarpetas
   python -m src.main mi_novela/ --recursive
 
+  # Solo contadores (un resumen por lote, memoria constante)
+  python -m src.main mi_novela/ --log-mode stats
+
+  # Libros con cientos de miles de cambios repetidos: 200 por regla + muestra
+  python -m src.main libro.odt --max-log-per-rule 200 --log-sample 50
+
+  # Manuscritos repetitivos: cada transformación una vez, con sus líneas
+  python -m src.main libro.odt --dedup-log
+
+  # Un único libro muy largo: párrafos en 4 procesos
+  python -m src.main libro.odt --workers 4
+
+  # XML de salida idéntico al original salvo los párrafos convertidos
+  python -m src.main libro.odt --splice
+
+  # Sin tocar índices, tablas, código ni el apéndice técnico
+  python -m src.main libro.odt --exclude-element text:index-body \\
+      --exclude-element table:table --exclude-style "Preformatted Text" \\
+      --exclude-section Apendice
+
+  # Salida intermedia sin comprimir / compresión máxima en 4 hilos
+  python -m src.main libro.odt --compress-level 0
+  python -m src.main libro.odt --compress-level 9 --compress-threads 4
+
+  # ODT convertido + texto plano + estadísticas, en una sola pasada
+  python -m src.main libro.odt --export-text --export-stats
+
+  # Solo el parche de la conversión (para control de versiones) y aplicarlo
+  python -m src.main capitulo.md --patch
+  python -m src.main apply capitulo.md.patch
+
+  # Libro EPUB: capítulos convertidos en 4 procesos
+  python -m src.main libro.epub --workers 4
+
+  # Registrar los cambios del lote en SQLite y consultarlos
+  python -m src.main mi_novela/ --change-store cambios.sqlite
+  python -m src.main query cambios.sqlite --rule D3 --file "cap12*"
+
 Para más información, ver README.md
     """,
     )
 
     parser.add_argument(
-        "input", type=str, help="Archivo o carpeta a procesar (.txt, .odt)"
+        "input",
+        type=str,
+        help=(
+            "Archivo o carpeta a procesar "
+            "(.txt, .md, .html, .odt, .fodt, .docx, .epub)"
+        ),
     )
 
     parser.add_argument(
@@ -67,6 +117,161 @@ Para más información, ver README.md
         help="Procesar subcarpetas (solo en modo carpeta)",
     )
 
+    parser.add_argument(
+        "--log-mode",
+        choices=LOG_MODES,
+        default="full",
+        help=(
+            "Tipo de log: 'full' (detalle de cada cambio) o 'stats' "
+            "(solo contadores por regla, archivo y tramo de líneas)"
+        ),
+    )
+
+    parser.add_argument(
+        "--max-log-per-rule",
+        type=int,
+        metavar="N",
+        help=(
+            "Detallar solo los primeros N cambios de cada regla "
+            "(los totales siguen siendo exactos)"
+        ),
+    )
+
+    parser.add_argument(
+        "--log-sample",
+        type=int,
+        default=0,
+        metavar="N",
+        help=(
+            "Con --max-log-per-rule, conservar además una muestra aleatoria "
+            "de N cambios por regla entre los restantes"
+        ),
+    )
+
+    parser.add_argument(
+        "--dedup-log",
+        action="store_true",
+        help=(
+            "Registrar una sola vez cada transformación repetida, con la "
+            "lista de líneas donde aparece"
+        ),
+    )
+
+    parser.add_argument(
+        "--change-store",
+        type=str,
+        help=(
+            "Archivo SQLite donde registrar todos los cambios del lote "
+            "(consultable con el subcomando 'query')"
+        ),
+    )
+
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help=(
+            "Procesar el XML de los ODT en flujo, párrafo a párrafo "
+            "(memoria acotada en documentos muy largos)"
+        ),
+    )
+
+    parser.add_argument(
+        "--splice",
+        action="store_true",
+        help=(
+            "ODT: re-serializar solo los párrafos que cambian y copiar el "
+            "resto del XML byte a byte (no se combina con --streaming)"
+        ),
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        metavar="N",
+        help=(
+            "ODT: convertir los párrafos en N procesos en paralelo "
+            "(mismo resultado que en serie; no se combina con --streaming)"
+        ),
+    )
+
+    parser.add_argument(
+        "--compress-level",
+        type=int,
+        choices=range(10),
+        metavar="N",
+        help=(
+            "ODT: nivel de compresión de content.xml (1-9; 0 = sin comprimir, "
+            "para archivos intermedios)"
+        ),
+    )
+
+    parser.add_argument(
+        "--compress-threads",
+        type=int,
+        default=0,
+        metavar="N",
+        help="ODT: comprimir content.xml por bloques en N hilos",
+    )
+
+    parser.add_argument(
+        "--exclude-style",
+        action="append",
+        default=[],
+        metavar="NOMBRE",
+        help=(
+            "ODT: no convertir los párrafos con este estilo (o un estilo "
+            "derivado de él); se puede repetir"
+        ),
+    )
+
+    parser.add_argument(
+        "--exclude-section",
+        action="append",
+        default=[],
+        metavar="NOMBRE",
+        help="ODT: no convertir la sección con este nombre; se puede repetir",
+    )
+
+    parser.add_argument(
+        "--exclude-element",
+        action="append",
+        default=[],
+        metavar="ELEMENTO",
+        help=(
+            'ODT: no convertir este tipo de elemento (ej: "text:index-body", '
+            '"table:table"); se puede repetir'
+        ),
+    )
+
+    parser.add_argument(
+        "--export-text",
+        action="store_true",
+        help=(
+            "ODT: exportar también el texto convertido a .txt (un párrafo por "
+            "línea), en la misma pasada"
+        ),
+    )
+
+    parser.add_argument(
+        "--export-stats",
+        action="store_true",
+        help=(
+            "ODT: guardar estadísticas del texto convertido (palabras, "
+            "diálogo) en .stats.json, en la misma pasada"
+        ),
+    )
+
+    parser.add_argument(
+        "--patch",
+        action="store_true",
+        help=(
+            "Guardar solo un parche con los cambios (diff unificado en TXT, "
+            "Markdown y HTML; parche XML por párrafo en ODT), sin copia "
+            "convertida ni respaldo. Se aplica con el subcomando 'apply'"
+        ),
+    )
+
     parser.add_argument("-q", "--quiet", action="store_true", help="Modo silencioso")
 
     parser.add_argument(
@@ -76,11 +281,142 @@ Para más información, ver README.md
     return parser
 
 
+def create_query_parser():
+    """Crea el parser del subcomando 'query'."""
+    parser = argparse.ArgumentParser(
+        prog="python -m src.main query",
+        description="Consulta los cambios registrados en un almacén SQLite",
+    )
+
+    parser.add_argument("store", type=str, help="Archivo SQLite del lote")
+    parser.add_argument(
+        "--file", type=str, help='Archivo (nombre exacto o patrón, ej: "cap12*")'
+    )
+    parser.add_argument("--rule", type=str, help='Regla (ej: "D3")')
+    parser.add_argument("--line", type=str, help='Línea o rango (ej: "10-20")')
+    parser.add_argument(
+        "--paragraph", type=str, help='Párrafo o rango (ej: "5" o "5-9")'
+    )
+    parser.add_argument("--limit", type=int, help="Máximo de resultados")
+    parser.add_argument(
+        "--files", action="store_true", help="Listar archivos y totales"
+    )
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+
+    return parser
+
+
+def query_main(argv):
+    """Subcomando 'query': consulta un almacén de cambios."""
+    args = create_query_parser().parse_args(argv)
+
+    store_path = Path(args.store)
+    if not store_path.exists():
+        print(f"Error: No existe '{args.store}'")
+        sys.exit(1)
+
+    with ChangeStore(store_path) as store:
+        if args.files:
+            rows = [dict(r) for r in store.files()]
+            if args.json:
+                print(json.dumps(rows, ensure_ascii=False, indent=2))
+            else:
+                for r in rows:
+                    print(
+                        f"{r['name']:<40} {r['changes']:>6} cambios"
+                        f" {r['warnings']:>5} avisos"
+                    )
+            sys.exit(0)
+
+        rows = store.query(
+            file=args.file,
+            rule=args.rule,
+            lines=parse_range(args.line),
+            paragraphs=parse_range(args.paragraph),
+            limit=args.limit,
+        )
+
+    if args.json:
+        print(json.dumps([dict(r) for r in rows], ensure_ascii=False, indent=2))
+    else:
+        for r in rows:
+            print(
+                f"{r['file']} | línea ~{r['line']} | párrafo {r['paragraph']}"
+                f" | {r['rule']}"
+            )
+            print(f"  - {r['original']}")
+            print(f"  + {r['converted']}")
+        print(f"\n{len(rows)} cambio(s)")
+
+    sys.exit(0)
+
+
+def create_apply_parser():
+    """Crea el parser del subcomando 'apply'."""
+    parser = argparse.ArgumentParser(
+        prog="python -m src.main apply",
+        description="Aplica un parche generado con --patch al documento original",
+    )
+
+    parser.add_argument("patch", type=str, help="Archivo de parche")
+    parser.add_argument(
+        "target",
+        type=str,
+        nargs="?",
+        help="Documento original (default: el indicado en el parche)",
+    )
+    parser.add_argument(
+        "-o", "--output", type=str, help="Resultado (default: reescribir el original)"
+    )
+
+    return parser
+
+
+def apply_main(argv):
+    """Subcomando 'apply': aplica un parche de conversión."""
+    args = create_apply_parser().parse_args(argv)
+
+    patch_path = Path(args.patch)
+    if not patch_path.exists():
+        print(f"Error: No existe '{args.patch}'")
+        sys.exit(1)
+
+    try:
+        output_path = apply_patch(
+            patch_path,
+            target=Path(args.target) if args.target else None,
+            output=Path(args.output) if args.output else None,
+        )
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    print(f"Parche aplicado: {output_path}")
+    sys.exit(0)
+
+
 def main():
     """Función principal."""
+    # Subcomandos (se detectan antes para no chocar con el argumento 'input')
+    if len(sys.argv) > 1 and sys.argv[1] == "query":
+        query_main(sys.argv[2:])
+    if len(sys.argv) > 1 and sys.argv[1] == "apply":
+        apply_main(sys.argv[2:])
+
     parser = create_parser()
     args = parser.parse_args()
 
+    if args.change_store and args.log_mode != "full":
+        parser.error("--change-store requiere --log-mode full")
+    if args.dedup_log and args.max_log_per_rule is not None:
+        parser.error("--dedup-log no puede combinarse con --max-log-per-rule")
+    if args.streaming and args.workers > 1:
+        parser.error("--workers no puede combinarse con --streaming")
+    if args.streaming and args.splice:
+        parser.error("--splice no puede combinarse con --streaming")
+    if args.patch and (args.export_text or args.export_stats):
+        parser.error("--patch no puede combinarse con --export-text/--export-stats")
+
     # Validar entrada
     input_path = Path(args.input)
     if not input_path.exists():
@@ -94,12 +430,69 @@ def main():
         process_file(input_path, args)
 
 
+def log_options(args) -> dict:
+    """Opciones del log detallado a partir de los argumentos."""
+    options = {}
+    if args.max_log_per_rule is not None:
+        options["max_records_per_rule"] = args.max_log_per_rule
+        options["sample_size"] = args.log_sample
+    if args.dedup_log:
+        options["dedup"] = True
+    return options
+
+
+def odt_options(args) -> dict:
+    """Opciones de procesamiento ODT a partir de los argumentos."""
+    return {
+        "streaming": args.streaming,
+        "workers": args.workers,
+        "splice": args.splice,
+        "compress_level": args.compress_level,
+        "compress_threads": args.compress_threads,
+        "exclude_styles": args.exclude_style,
+        "exclude_sections": args.exclude_section,
+        "exclude_elements": args.exclude_element,
+    }
+
+
+def odt_exports(args, output_path: Path) -> dict:
+    """Salidas secundarias pedidas para un ODT, junto a `output_path`."""
+    exports = {}
+    if args.export_text:
+        exports["text_path"] = output_path.parent / f"{output_path.stem}.txt"
+    if args.export_stats:
+        exports["stats_path"] = output_path.parent / f"{output_path.stem}.stats.json"
+    return exports
+
+
+def detect_format(input_path: Path) -> str:
+    """Nombre del formato del archivo de entrada."""
+    if is_odt_file(input_path):
+        return "ODT"
+    if is_docx_file(input_path):
+        return "DOCX"
+    if is_epub_file(input_path):
+        return "EPUB"
+    if is_markup_file(input_path):
+        return MarkupProcessor(input_path).format
+    return "TXT"
+
+
 def process_directory(input_dir: Path, args):
     """Procesa una carpeta completa."""
     output_dir = Path(args.output) if args.output else input_dir / "convertidos"
 
     converter = DialogConverter()
-    batch = BatchProcessor(converter)
+    batch = BatchProcessor(
+        converter,
+        log_mode=args.log_mode,
+        change_store=Path(args.change_store) if args.change_store else None,
+        log_options=log_options(args),
+        odt_options=odt_options(args),
+        export_text=args.export_text,
+        export_stats=args.export_stats,
+        patch=args.patch,
+    )
 
     result = batch.process_directory(
         input_dir=input_dir,
@@ -113,6 +506,9 @@ def process_directory(input_dir: Path, args):
 
 def process_file(input_path: Path, args):
     """Procesa un archivo individual."""
+    if args.patch:
+        patch_file(input_path, args)
+
     # Salida
     if args.output:
         output_path = Path(args.output)
@@ -126,12 +522,15 @@ def process_file(input_path: Path, args):
     # Info
     if not args.quiet:
         print(f"Procesando: {input_path}")
-        print(f"Formato detectado: {'ODT' if is_odt_file(input_path) else 'TXT'}")
+        print(f"Formato detectado: {detect_format(input_path)}")
         print(f"Salida: {output_path}")
         print(f"Log: {log_path}\n")
 
     try:
-        converter = DialogConverter()
+        converter = DialogConverter(
+            logger=create_logger(args.log_mode, **log_options(args))
+        )
+        exports = {}
 
         # Copiar archivo original PRIMERO, antes de procesar
         original_copy_path = (
@@ -144,7 +543,35 @@ def process_file(input_path: Path, args):
             if not args.quiet:
                 print("Leyendo archivo de entrada...")
 
-            processor = ODTProcessor(input_path)
+            processor = ODTProcessor(input_path, **odt_options(args))
+            exports = odt_exports(args, output_path)
+            processor.process_and_save(output_path, converter.convert, **exports)
+            log_content = converter.logger.generate_report()
+
+        elif is_docx_file(input_path):
+            # DOCX
+            if not args.quiet:
+                print("Leyendo archivo de entrada...")
+
+            processor = DOCXProcessor(input_path, **docx_options(odt_options(args)))
+            processor.process_and_save(output_path, converter.convert)
+            log_content = converter.logger.generate_report()
+
+        elif is_epub_file(input_path):
+            # EPUB
+            if not args.quiet:
+                print("Leyendo archivo de entrada...")
+
+            processor = EPUBProcessor(input_path, **epub_options(odt_options(args)))
+            processor.process_and_save(output_path, converter.convert)
+            log_content = converter.logger.generate_report()
+
+        elif is_markup_file(input_path):
+            # Markdown / HTML
+            if not args.quiet:
+                print("Leyendo archivo de entrada...")
+
+            processor = MarkupProcessor(input_path)
             processor.process_and_save(output_path, converter.convert)
             log_content = converter.logger.generate_report()
 
@@ -174,22 +601,80 @@ def process_file(input_path: Path, args):
         with open(log_path, "w", encoding="utf-8") as f:
             f.write(log_content)
 
+        if args.change_store:
+            with ChangeStore(Path(args.change_store)) as store:
+                store.add_logger(input_path.name, converter.logger, input_path)
+
         # Resumen
         if not args.quiet:
-            if is_odt_file(input_path):
-                print("  Guardado como ODT (estructura y formato preservados)")
+            if detect_format(input_path) != "TXT":
+                print(
+                    f"  Guardado como {detect_format(input_path)} "
+                    "(estructura y formato preservados)"
+                )
 
             print("\n✓ Conversión completada exitosamente")
 
-            changes = converter.logger.changes
-            rules_applied = set(c[3] for c in changes) if changes else set()
+            stats = converter.logger.get_stats()
 
-            print(f"  Total de cambios: {len(changes)}")
-            print(f"  Reglas aplicadas: {len(rules_applied)}\n")
+            print(f"  Total de cambios: {stats['total_changes']}")
+            print(f"  Reglas aplicadas: {len(stats['rules_applied'])}\n")
             print("Archivos generados:")
             print(f"  - {output_path}")
             print(f"  - {log_path}")
             print(f"  - {original_copy_path}")
+            for export_path in exports.values():
+                print(f"  - {export_path}")
+
+        sys.exit(0)
+
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        import traceback
+
+        traceback.print_exc()
+        sys.exit(1)
+
+
+def patch_file(input_path: Path, args):
+    """Convierte un archivo individual guardando solo su parche y su log."""
+    if args.output:
+        patch_path = Path(args.output)
+    else:
+        patch_path = patch_path_for(input_path, input_path.parent)
+
+    log_path = patch_path.parent / f"{input_path.stem}_convertido.log.txt"
+
+    if not args.quiet:
+        print(f"Procesando: {input_path}")
+        print(f"Formato detectado: {detect_format(input_path)}")
+        print(f"Parche: {patch_path}")
+        print(f"Log: {log_path}\n")
+
+    try:
+        converter = DialogConverter(
+            logger=create_logger(args.log_mode, **log_options(args))
+        )
+        changed = save_patch(
+            input_path, patch_path, converter.convert, odt_options(args)
+        )
+
+        with open(log_path, "w", encoding="utf-8") as f:
+            f.write(converter.logger.generate_report())
+
+        if args.change_store:
+            with ChangeStore(Path(args.change_store)) as store:
+                store.add_logger(input_path.name, converter.logger, input_path)
+
+        if not args.quiet:
+            print("✓ Parche generado exitosamente")
+            stats = converter.logger.get_stats()
+            print(f"  Total de cambios: {stats['total_changes']}")
+            print(f"  Bloques del parche: {changed}\n")
+            print("Archivos generados:")
+            print(f"  - {patch_path}")
+            print(f"  - {log_path}")
+            print(f"\nPara aplicarlo: python -m src.main apply {patch_path}")
 
         sys.exit(0)
 
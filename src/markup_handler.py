@@ -0,0 +1,460 @@
+"""
+Módulo para trabajar con archivos Markdown y HTML.
+
+El documento se analiza una sola vez y se marcan las regiones que no son
+prosa (bloques y fragmentos de código, front matter, etiquetas con sus
+atributos, destinos de enlaces...). El conversor recibe solo la prosa, sobre
+el modelo de runs: cada región marcada es un ancla cuyo texto original se
+vuelve a escribir tal cual en su sitio.
+"""
+
+import html
+import re
+import shutil
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from .converter import DialogConverter
+from .odt_handler import _runs_converter
+
+MARKDOWN_SUFFIXES = (".md", ".markdown")
+HTML_SUFFIXES = (".html", ".htm")
+
+# Una región del documento: (inicio, fin, texto). El texto es None si la
+# región no es prosa, o el carácter que representa si es un escape o una
+# referencia de carácter (`\"`, `&quot;`)
+Token = Tuple[int, int, Optional[str]]
+
+# Etiqueta HTML de apertura o cierre (los atributos entre comillas pueden
+# contener '>')
+_TAG = r"</?[A-Za-z][\w:.-]*(?:\"[^\"]*\"|'[^']*'|[^'\">])*>"
+
+# Referencia de carácter (con nombre o numérica)
+_CHAR_REF = r"&(?:#[0-9]{1,7}|#[xX][0-9a-fA-F]{1,6}|[A-Za-z][A-Za-z0-9]{1,31});"
+
+# Elementos HTML cuyo contenido nunca es prosa
+_RAW_ELEMENTS = "script|style|pre|code|textarea|head"
+
+_HTML_TOKEN_RE = re.compile(
+    rf"<!--.*?-->|<!\[CDATA\[.*?\]\]>|<![^>]*>|<\?.*?\?>"
+    rf"|<({_RAW_ELEMENTS})\b(?:\"[^\"]*\"|'[^']*'|[^'\">])*>.*?</\1\s*>"
+    rf"|{_TAG}|(?P<ref>{_CHAR_REF})",
+    re.DOTALL | re.IGNORECASE,
+)
+
+# Markdown: bloques
+_FRONT_MATTER_RE = re.compile(r"(---|\+\+\+)[ \t]*\r?$")
+_FENCE_RE = re.compile(r" {0,3}(`{3,}|~{3,})")
+_HTML_BLOCK_RE = re.compile(
+    rf" {{0,3}}<({_RAW_ELEMENTS})(?:[\s>]|$)", re.IGNORECASE
+)
+_COMMENT_BLOCK_RE = re.compile(r" {0,3}<!--")
+_LINK_DEFINITION_RE = re.compile(r" {0,3}\[[^\]]+\]:[ \t]")
+_INDENTED_CODE_RE = re.compile(r"(?: {4}|\t)")
+_BLANK_RE = re.compile(r"[ \t]*\r?$")
+_LIST_ITEM_RE = re.compile(r" {0,3}(?:[-+*]|\d{1,9}[.)])[ \t]")
+
+# Prefijo de bloque de una línea de prosa: sangría, citas, viñetas o
+# numeración (con casilla de tarea) y marcas de título
+_BLOCK_PREFIX_RE = re.compile(
+    r"[ \t]*(?:>[ \t]?)*[ \t]*"
+    r"(?:(?:[-+*]|\d{1,9}[.)])[ \t]+(?:\[[ xX]\][ \t]+)?|#{1,6}[ \t]+)?"
+)
+
+# Markdown: elementos en línea
+_INLINE_RE = re.compile(
+    rf"(?P<code>`+)|(?P<link>\]\()|<!--.*?-->|{_TAG}"
+    rf"|<[A-Za-z][A-Za-z0-9+.-]*:[^\s<>]*>"
+    rf"|(?P<escape>\\[!-/:-@\[-`{{-~])|(?P<ref>{_CHAR_REF})"
+)
+
+
+def is_markup_file(filepath: Path) -> bool:
+    """
+    Verifica si un archivo es Markdown o HTML.
+
+    Args:
+        filepath: Ruta del archivo
+
+    Returns:
+        True si es Markdown o HTML
+    """
+    return filepath.exists() and filepath.suffix.lower() in (
+        MARKDOWN_SUFFIXES + HTML_SUFFIXES
+    )
+
+
+class MarkupProcessor:
+    """Procesa archivos Markdown y HTML sin tocar lo que no es prosa."""
+
+    def __init__(self, filepath: Path):
+        """
+        Inicializa el procesador.
+
+        Args:
+            filepath: Ruta al archivo (.md, .markdown, .html, .htm)
+        """
+        self.filepath = filepath
+        self.format = (
+            "HTML" if filepath.suffix.lower() in HTML_SUFFIXES else "Markdown"
+        )
+
+    def _read(self) -> str:
+        # newline="" conserva los finales de línea tal cual
+        with open(self.filepath, "r", encoding="utf-8", newline="") as f:
+            return f.read()
+
+    def _lex(self, text: str) -> List[Token]:
+        if self.format == "HTML":
+            return list(lex_html(text))
+        return list(lex_markdown(text))
+
+    def _runs(self) -> Tuple[str, list, list]:
+        """
+        Lee y analiza el documento una sola vez.
+
+        Returns:
+            Tupla (texto, runs, orígenes); ver `_build_runs`
+        """
+        text = self._read()
+        runs, sources = _build_runs(text, self._lex(text))
+        return text, runs, sources
+
+    def has_dialog(self) -> bool:
+        """Indica si la prosa del documento contiene comillas."""
+        _, runs, _ = self._runs()
+        return _prose_has_quotes(runs)
+
+    def process_and_save(
+        self, output_path: Path, text_converter_func, skip_without_dialog=True
+    ) -> bool:
+        """
+        Convierte la prosa del documento y lo guarda.
+
+        Todo el documento se convierte en una sola llamada (el log numera
+        las líneas como en el archivo); lo que no es prosa llega al conversor
+        como anclas y se copia sin cambios.
+
+        Args:
+            output_path: Ruta de salida
+            text_converter_func: Función que convierte el texto. Recibe str y
+                retorna tuple[str, logger]
+            skip_without_dialog: Si la prosa no tiene comillas, copiar el
+                archivo tal cual
+
+        Returns:
+            True si se procesó el documento, False si se copió sin cambios
+        """
+        try:
+            text, runs, sources = self._runs()
+            if skip_without_dialog and not _prose_has_quotes(runs):
+                shutil.copyfile(self.filepath, output_path)
+                return False
+
+            converted = _convert_runs(text, runs, sources, text_converter_func)
+            if converted is text:
+                shutil.copyfile(self.filepath, output_path)
+                return True
+
+            with open(output_path, "w", encoding="utf-8", newline="") as f:
+                f.write(converted)
+            return True
+
+        except Exception as e:
+            raise Exception(f"Error procesando {self.format}: {e}")
+
+    def convert_text(self, text_converter_func) -> Tuple[str, str]:
+        """
+        Convierte el documento sin escribir nada.
+
+        Returns:
+            Tupla (texto_original, texto_convertido); si nada cambió, el
+            convertido es el mismo objeto que el original
+        """
+        text, runs, sources = self._runs()
+        return text, _convert_runs(text, runs, sources, text_converter_func)
+
+
+def _prose_has_quotes(runs: list) -> bool:
+    """Indica si la prosa de unos runs contiene comillas."""
+    return DialogConverter.has_quotes("".join(run_text for run_text, _ in runs))
+
+
+def _convert_runs(text: str, runs: list, sources: list, text_converter_func) -> str:
+    """
+    Texto convertido de un documento ya analizado; si nada cambió, es el
+    mismo objeto que `text`.
+    """
+    if not _prose_has_quotes(runs):
+        return text
+    converted, _ = _runs_converter(text_converter_func)(runs)
+    if converted is runs:
+        return text
+    return _render_runs(converted, sources)
+
+
+def lex_html(text: str):
+    """
+    Regiones de un documento HTML que no son prosa: comentarios,
+    declaraciones, etiquetas con sus atributos y el contenido entero de
+    `<script>`, `<style>`, `<pre>`, `<code>`, `<textarea>` y `<head>`. Las
+    referencias de carácter se producen con el carácter que representan.
+
+    Yields:
+        Tokens (inicio, fin, texto) en orden
+    """
+    for match in _HTML_TOKEN_RE.finditer(text):
+        if match.group("ref"):
+            yield _char_ref(match)
+        else:
+            yield match.start(), match.end(), None
+
+
+def lex_markdown(text: str):
+    """
+    Regiones de un documento Markdown que no son prosa.
+
+    Por bloques: front matter (YAML o TOML) al inicio, bloques de código
+    delimitados o sangrados, bloques HTML de código o comentarios y
+    definiciones de enlaces. En las líneas de prosa, su prefijo de bloque
+    (citas, viñetas, numeración, marcas de título), fragmentos de código,
+    etiquetas HTML, autoenlaces y destinos de enlaces e imágenes (incluido
+    su título). Los escapes y referencias de carácter se producen con el
+    carácter que representan.
+
+    Yields:
+        Tokens (inicio, fin, texto) en orden
+    """
+    lines = re.findall(r"[^\n]*\n|[^\n]+", text)
+    pos = 0
+    idx = 0
+
+    def skip_lines_until(start_idx, closes):
+        """Marca desde la línea start_idx hasta la que cumple `closes`."""
+        end_idx = start_idx + 1
+        while end_idx < len(lines) and not closes(lines[end_idx]):
+            end_idx += 1
+        return min(end_idx + 1, len(lines))
+
+    if lines and _FRONT_MATTER_RE.match(lines[0]):
+        # Sin delimitador de cierre no es front matter (es una línea
+        # horizontal)
+        closing = ("---", "...") if lines[0].rstrip() == "---" else ("+++",)
+        end_idx = skip_lines_until(0, lambda line: line.rstrip() in closing)
+        if lines[end_idx - 1].rstrip() in closing and end_idx > 1:
+            idx = end_idx
+            pos = sum(len(line) for line in lines[:idx])
+            yield 0, pos, None
+
+    in_list = False
+    previous_blank = True
+    while idx < len(lines):
+        line = lines[idx]
+        block_end = None
+
+        fence = _FENCE_RE.match(line)
+        html_block = _HTML_BLOCK_RE.match(line)
+        if fence:
+            marker = fence.group(1)
+            closing_re = re.compile(
+                rf" {{0,3}}{re.escape(marker[0])}{{{len(marker)},}}[ \t]*\r?$"
+            )
+            block_end = skip_lines_until(idx, closing_re.match)
+        elif html_block:
+            closing_tag = f"</{html_block.group(1).lower()}"
+            block_end = (
+                idx + 1
+                if closing_tag in line.lower()
+                else skip_lines_until(idx, lambda line: closing_tag in line.lower())
+            )
+        elif _COMMENT_BLOCK_RE.match(line):
+            block_end = (
+                idx + 1
+                if "-->" in line
+                else skip_lines_until(idx, lambda line: "-->" in line)
+            )
+        elif _LINK_DEFINITION_RE.match(line):
+            block_end = idx + 1
+        elif previous_blank and not in_list and _INDENTED_CODE_RE.match(line):
+            block_end = idx + 1
+            while block_end < len(lines) and (
+                _INDENTED_CODE_RE.match(lines[block_end])
+                or _BLANK_RE.match(lines[block_end])
+            ):
+                block_end += 1
+
+        if block_end is not None:
+            end = pos + sum(len(line) for line in lines[idx:block_end])
+            yield pos, end, None
+            pos = end
+            idx = block_end
+            previous_blank = False
+            continue
+
+        if _BLANK_RE.match(line):
+            previous_blank = True
+        else:
+            if _LIST_ITEM_RE.match(line):
+                in_list = True
+            elif not line[:1].isspace():
+                in_list = False
+            previous_blank = False
+            yield from _lex_markdown_line(line, pos)
+
+        pos += len(line)
+        idx += 1
+
+
+def _lex_markdown_line(line: str, offset: int):
+    """Regiones que no son prosa dentro de una línea de prosa Markdown."""
+    prefix = _BLOCK_PREFIX_RE.match(line).end()
+    if prefix:
+        yield offset, offset + prefix, None
+
+    pos = prefix
+    while True:
+        match = _INLINE_RE.search(line, pos)
+        if match is None:
+            return
+        start, end = match.span()
+        if match.group("code"):
+            ticks = match.group("code")
+            closing = re.compile(rf"(?<!`){ticks}(?!`)").search(line, end)
+            if closing is None:
+                # Comillas invertidas sin cierre: son texto
+                pos = end
+                continue
+            end = closing.end()
+        elif match.group("link"):
+            start += 1
+            end = _closing_paren(line, start)
+            if end is None:
+                pos = match.end()
+                continue
+        elif match.group("escape"):
+            yield offset + start, offset + end, line[end - 1]
+            pos = end
+            continue
+        elif match.group("ref"):
+            token = _char_ref(match)
+            if token[2] is not None:
+                yield offset + start, offset + end, token[2]
+            pos = end
+            continue
+        yield offset + start, offset + end, None
+        pos = end
+
+
+def _closing_paren(line: str, start: int) -> Optional[int]:
+    """Fin del destino de un enlace que abre en `line[start]` ('(')."""
+    depth = 0
+    quote = None
+    for idx in range(start, len(line)):
+        char = line[idx]
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "\"'" and depth == 1 and line[idx - 1].isspace():
+            quote = char
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if not depth:
+                return idx + 1
+        elif char == "\n":
+            return None
+    return None
+
+
+def _char_ref(match) -> Token:
+    """Token de una referencia de carácter (solo si es válida)."""
+    ref = match.group()
+    char = html.unescape(ref)
+    return match.start(), match.end(), char if char != ref else None
+
+
+def _build_runs(text: str, tokens) -> Tuple[list, list]:
+    """
+    Runs (texto, estilo) del documento para el conversor.
+
+    Cada región que no es prosa es un ancla (run sin texto) y cada escape un
+    run con el carácter que representa. El estilo de todo run es su índice
+    en la lista de orígenes que se devuelve: el texto original de anclas y
+    escapes, None para la prosa. Los saltos de línea siempre son prosa (las
+    regiones se parten en ellos), así que el conversor ve las mismas líneas
+    que el archivo; los '\\r' de los finales de línea son anclas.
+
+    Returns:
+        Tupla (runs, orígenes)
+    """
+    runs = []
+    sources = []
+
+    def add(run_text, source):
+        runs.append((run_text, len(sources)))
+        sources.append(source)
+
+    def add_prose(piece):
+        for part in re.split(r"(\r(?=\n))", piece):
+            if part == "\r":
+                add("", part)
+            elif part:
+                add(part, None)
+
+    pos = 0
+    for start, end, char in tokens:
+        if start < pos:
+            continue
+        add_prose(text[pos:start])
+        source = text[start:end]
+        if char is not None:
+            add(char, source)
+        else:
+            for line_idx, line in enumerate(source.split("\n")):
+                if line_idx:
+                    add("\n", None)
+                if line:
+                    add("", line)
+        pos = end
+    add_prose(text[pos:])
+    return runs, sources
+
+
+def _render_runs(runs: list, sources: list) -> str:
+    """
+    Texto final a partir de los runs convertidos.
+
+    Los runs se reordenan según su posición original: así un carácter que
+    una regla inserta en lugar de otro (la raya que sustituye a una comilla)
+    queda del mismo lado de la etiqueta o el prefijo de bloque que el
+    carácter sustituido. Las anclas recuperan su texto original, y los
+    escapes también si su carácter no cambió.
+    """
+    keyed = []
+    key = 0
+    for run_text, style in runs:
+        if style is not None:
+            key = style
+        keyed.append((key, run_text, style))
+    keyed.sort(key=lambda item: item[0])
+
+    parts = []
+    for _, run_text, style in keyed:
+        source = None if style is None else sources[style]
+        if source is None:
+            parts.append(run_text)
+        elif not run_text:
+            parts.append(source)
+        elif len(run_text) == 1 and run_text == _decoded(source):
+            parts.append(source)
+        else:
+            parts.append(run_text)
+    return "".join(parts)
+
+
+def _decoded(source: str) -> str:
+    """Carácter que representa un escape o una referencia de carácter."""
+    if source.startswith("\\"):
+        return source[1:]
+    return html.unescape(source)
@@ -2,915 +2,1788 @@
 Módulo para trabajar con archivos ODT (OpenDocument Text).
 """
 
-import difflib
+import copy
+import io
+import json
 import re
+import shutil
+import struct
+import time
 import xml.etree.ElementTree as ET
 import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import BinaryIO, Iterable, Iterator, Optional, TextIO, Union
+from xml.parsers import expat
+
+# Tamaño de los bloques al copiar entradas del ZIP sin descomprimir
+RAW_COPY_CHUNK = 1 << 20
+
+# Texto (entre '>' y '<') que contiene alguna comilla que el conversor trata:
+# " ' « » ‘ ’ “ ” (y variantes „ ‟ ‹ ›) en UTF-8, o una referencia de
+# carácter que podría serlo (&quot;, &apos;, &#...;, y las entidades HTML
+# de comillas como &ldquo; o &laquo; de los capítulos XHTML)
+_DIALOG_TEXT_RE = re.compile(
+    rb">[^<]*?(?:[\"']|\xc2[\xab\xbb]|\xe2\x80[\x98\x99\x9c-\x9f\xb9\xba]"
+    rb"|&(?:quot|apos|#|[lr](?:d|s|a|sa)quo|bdquo|sbquo))"
+)
+
+# Id del campo extra ZIP64 (se regenera al escribir la cabecera)
+_ZIP64_EXTRA_ID = 0x0001
+
+# Prefijos habituales de los namespaces de ODF
+ODF_NAMESPACES = {
+    "office": "urn:oasis:names:tc:opendocument:xmlns:office:1.0",
+    "text": "urn:oasis:names:tc:opendocument:xmlns:text:1.0",
+    "style": "urn:oasis:names:tc:opendocument:xmlns:style:1.0",
+    "fo": "urn:oasis:names:tc:opendocument:xmlns:xsl-fo-compatible:1.0",
+    "svg": "urn:oasis:names:tc:opendocument:xmlns:svg-compatible:1.0",
+    "meta": "urn:oasis:names:tc:opendocument:xmlns:meta:1.0",
+    "dc": "http://purl.org/dc/elements/1.1/",
+    "table": "urn:oasis:names:tc:opendocument:xmlns:table:1.0",
+    "draw": "urn:oasis:names:tc:opendocument:xmlns:drawing:1.0",
+}
+
+# Namespace de texto ODF y atributo de estilo de los spans
+_TEXT_NS = "{urn:oasis:names:tc:opendocument:xmlns:text:1.0}"
+_TEXT_STYLE_NAME = f"{_TEXT_NS}style-name"
+_OFFICE_NS = "{urn:oasis:names:tc:opendocument:xmlns:office:1.0}"
+_STYLE_NAME = "{urn:oasis:names:tc:opendocument:xmlns:style:1.0}name"
+_STYLE_FAMILY = "{urn:oasis:names:tc:opendocument:xmlns:style:1.0}family"
+_STYLE_PARENT = "{urn:oasis:names:tc:opendocument:xmlns:style:1.0}parent-style-name"
+_TEXT_NAME = f"{_TEXT_NS}name"
+_TEXT_SPACE_COUNT = f"{_TEXT_NS}c"
+
+# Raya con la que empieza una línea de diálogo (ver `_count_paragraph`)
+_DIALOG_DASH = "\u2014"
+
+
+def _strip_zip64_extra(extra: bytes) -> bytes:
+    """Quita los campos extra ZIP64 de una entrada (FileHeader los recalcula)."""
+    kept = []
+    pos = 0
+    while pos + 4 <= len(extra):
+        header_id, size = struct.unpack("<HH", extra[pos : pos + 4])
+        if header_id != _ZIP64_EXTRA_ID:
+            kept.append(extra[pos : pos + 4 + size])
+        pos += 4 + size
+    return b"".join(kept)
+
+
+def content_may_have_dialog(content_xml: bytes) -> bool:
+    """
+    Prescan a nivel de bytes de content.xml: indica si algún nodo de texto
+    contiene comillas (y, por tanto, si hay algo que convertir).
 
+    Las comillas de los atributos no cuentan. Ante la duda (CDATA, otra
+    codificación) devuelve True para que el documento se procese.
+    """
+    return stream_may_have_dialog(io.BytesIO(content_xml))
 
-class ODTProcessor:
-    """Procesa archivos ODT preservando estilos y estructura."""
 
-    def __init__(self, filepath: Path):
-        """Inicializa el procesador de ODT."""
-        self.filepath = filepath
-        # Registrar namespaces para preservarlos en el XML
-        ET.register_namespace(
-            "office", "urn:oasis:names:tc:opendocument:xmlns:office:1.0"
-        )
-        ET.register_namespace("text", "urn:oasis:names:tc:opendocument:xmlns:text:1.0")
-        ET.register_namespace(
-            "style", "urn:oasis:names:tc:opendocument:xmlns:style:1.0"
-        )
-        ET.register_namespace(
-            "fo", "urn:oasis:names:tc:opendocument:xmlns:xsl-fo-compatible:1.0"
+def stream_may_have_dialog(
+    stream: BinaryIO, chunk_size: int = RAW_COPY_CHUNK
+) -> bool:
+    """
+    Igual que `content_may_have_dialog`, leyendo el XML por bloques.
+
+    Cada bloque se corta justo antes de su último '<', de modo que ningún
+    texto entre etiquetas queda partido entre dos búsquedas.
+    """
+    carry = b""
+    first = True
+    while True:
+        chunk = stream.read(chunk_size)
+        data = carry + chunk
+        if first:
+            head = data[:200].lower()
+            if b"encoding=" in head and b"utf-8" not in head:
+                return True
+            first = False
+        if not chunk:
+            piece, carry = data, b""
+        else:
+            cut = data.rfind(b"<")
+            if cut <= 0:
+                carry = data
+                continue
+            piece, carry = data[:cut], data[cut:]
+        if b"<![CDATA[" in piece or _DIALOG_TEXT_RE.search(piece):
+            return True
+        if not chunk:
+            return False
+
+
+# Internos de `zipfile` que usa `copy_raw_entry` (probados con CPython 3.11
+# y 3.13). Si una versión futura los cambia, la copia pasa a la API pública
+# y recomprime la entrada; `open_compressed_entry` hace lo mismo con el
+# compresor del manejador (ver su docstring).
+_ZIP_HEADER_INTERNALS = (
+    "structFileHeader",
+    "sizeFileHeader",
+    "stringFileHeader",
+    "_FH_SIGNATURE",
+    "_FH_FILENAME_LENGTH",
+    "_FH_EXTRA_FIELD_LENGTH",
+)
+_ZIP_WRITER_INTERNALS = ("_lock", "_seekable", "start_dir", "_writecheck", "_didModify")
+
+
+def _can_copy_raw(output_zip: zipfile.ZipFile) -> bool:
+    """Indica si `zipfile` expone lo necesario para copiar entradas en crudo."""
+    return all(hasattr(zipfile, name) for name in _ZIP_HEADER_INTERNALS) and all(
+        hasattr(output_zip, name) for name in _ZIP_WRITER_INTERNALS
+    )
+
+
+def _copy_zipinfo(info: zipfile.ZipInfo) -> zipfile.ZipInfo:
+    """Nueva ZipInfo con los metadatos de `info` (para el ZIP de salida)."""
+    zinfo = zipfile.ZipInfo(info.filename, info.date_time)
+    zinfo.compress_type = info.compress_type
+    zinfo.comment = info.comment
+    zinfo.extra = _strip_zip64_extra(info.extra)
+    zinfo.create_system = info.create_system
+    zinfo.create_version = info.create_version
+    zinfo.extract_version = info.extract_version
+    # Sin data descriptor: CRC y tamaños van ya en la cabecera local
+    zinfo.flag_bits = info.flag_bits & ~0x08
+    zinfo.internal_attr = info.internal_attr
+    zinfo.external_attr = info.external_attr
+    zinfo.CRC = info.CRC
+    zinfo.compress_size = info.compress_size
+    zinfo.file_size = info.file_size
+    return zinfo
+
+
+def copy_raw_entry(
+    source: BinaryIO,
+    output_zip: zipfile.ZipFile,
+    info: zipfile.ZipInfo,
+    chunk_size: int = RAW_COPY_CHUNK,
+):
+    """
+    Copia una entrada de un ZIP a otro sin descomprimirla ni recomprimirla.
+
+    Los bytes comprimidos se transfieren tal cual, por bloques de tamaño
+    fijo; el CRC, los tamaños, la fecha y el método de compresión se
+    conservan. `zipfile` no ofrece una API pública para esto, así que se
+    escribe la cabecera local y se registra la entrada en el directorio
+    central igual que hace `ZipFile.write`. Si esos internos no están (ver
+    `_can_copy_raw`), la entrada se descomprime y se vuelve a comprimir.
+
+    Args:
+        source: Archivo ZIP de origen abierto en modo binario
+        output_zip: ZipFile de destino abierto en modo escritura
+        info: Entrada a copiar (de `ZipFile.infolist()` del origen)
+        chunk_size: Bytes por bloque de copia
+    """
+    if not _can_copy_raw(output_zip):
+        _copy_entry_recompressed(source, output_zip, info, chunk_size)
+        return
+
+    # Localizar los datos comprimidos saltando la cabecera local
+    source.seek(info.header_offset)
+    header = struct.unpack(
+        zipfile.structFileHeader, source.read(zipfile.sizeFileHeader)
+    )
+    if header[zipfile._FH_SIGNATURE] != zipfile.stringFileHeader:
+        raise zipfile.BadZipFile(f"Cabecera local inválida: {info.filename}")
+    source.seek(
+        header[zipfile._FH_FILENAME_LENGTH] + header[zipfile._FH_EXTRA_FIELD_LENGTH],
+        1,
+    )
+
+    zinfo = _copy_zipinfo(info)
+    with output_zip._lock:
+        if output_zip._seekable:
+            output_zip.fp.seek(output_zip.start_dir)
+        zinfo.header_offset = output_zip.fp.tell()
+        output_zip._writecheck(zinfo)
+        output_zip._didModify = True
+
+        output_zip.fp.write(zinfo.FileHeader())
+        remaining = info.compress_size
+        while remaining > 0:
+            chunk = source.read(min(chunk_size, remaining))
+            if not chunk:
+                raise zipfile.BadZipFile(f"Entrada truncada: {info.filename}")
+            output_zip.fp.write(chunk)
+            remaining -= len(chunk)
+
+        output_zip.start_dir = output_zip.fp.tell()
+        output_zip.filelist.append(zinfo)
+        output_zip.NameToInfo[zinfo.filename] = zinfo
+
+
+def _copy_entry_recompressed(
+    source: BinaryIO,
+    output_zip: zipfile.ZipFile,
+    info: zipfile.ZipInfo,
+    chunk_size: int,
+):
+    """Alternativa de `copy_raw_entry` con la API pública de `zipfile`."""
+    zinfo = _copy_zipinfo(info)
+    if info.is_dir():
+        output_zip.writestr(zinfo, b"")
+        return
+    source.seek(0)
+    with zipfile.ZipFile(source, "r") as input_zip, input_zip.open(info) as data:
+        with output_zip.open(zinfo, "w") as out:
+            shutil.copyfileobj(data, out, chunk_size)
+
+
+# Bytes de content.xml que se comprimen como un bloque independiente
+DEFLATE_CHUNK = 1 << 20
+
+# Ventana de deflate: cada bloque usa como diccionario los últimos 32 KiB del
+# anterior, de modo que la compresión apenas empeora al partir el flujo
+_DEFLATE_WINDOW = 1 << 15
+
+
+def _deflate_chunk(data: bytes, level: int, window: bytes, final: bool) -> bytes:
+    """
+    Comprime un bloque como deflate crudo. Los bloques que no son el último
+    terminan con Z_SYNC_FLUSH (alineados a byte y sin marca de fin), así que
+    sus salidas concatenadas forman un único flujo deflate válido.
+    """
+    if window:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15, zdict=window)
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush(
+        zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH
+    )
+
+
+class _ParallelDeflater:
+    """
+    Sustituto de `zlib.compressobj` (métodos compress/flush) que reparte la
+    compresión en bloques de `DEFLATE_CHUNK` bytes entre varios hilos; zlib
+    libera el GIL mientras comprime. La salida se entrega en orden.
+    """
+
+    def __init__(self, level: int, threads: int):
+        self._level = level
+        self._pool = ThreadPoolExecutor(max_workers=threads)
+        self._max_pending = 2 * threads
+        self._pending = deque()
+        self._buffer = bytearray()
+        self._window = b""
+
+    def _submit(self, data: bytes, final: bool):
+        self._pending.append(
+            self._pool.submit(_deflate_chunk, data, self._level, self._window, final)
         )
-        ET.register_namespace(
-            "svg", "urn:oasis:names:tc:opendocument:xmlns:svg-compatible:1.0"
+        self._window = data[-_DEFLATE_WINDOW:]
+
+    def _collect(self, wait: bool) -> bytes:
+        """Entrega los bloques ya comprimidos, en orden."""
+        done = []
+        while self._pending and (
+            wait
+            or self._pending[0].done()
+            or len(self._pending) > self._max_pending
+        ):
+            done.append(self._pending.popleft().result())
+        return b"".join(done)
+
+    def compress(self, data) -> bytes:
+        self._buffer += data
+        while len(self._buffer) >= DEFLATE_CHUNK:
+            self._submit(bytes(self._buffer[:DEFLATE_CHUNK]), final=False)
+            del self._buffer[:DEFLATE_CHUNK]
+        return self._collect(wait=False)
+
+    def flush(self) -> bytes:
+        try:
+            self._submit(bytes(self._buffer), final=True)
+            self._buffer.clear()
+            return self._collect(wait=True)
+        finally:
+            self._pool.shutdown()
+
+
+def open_compressed_entry(
+    output_zip: zipfile.ZipFile,
+    entry: Union[str, zipfile.ZipInfo],
+    threads: int = 0,
+) -> BinaryIO:
+    """
+    Abre una entrada del ZIP para escritura con la compresión y el nivel
+    del propio `output_zip`.
+
+    `entry` es el nombre de una entrada nueva o la ZipInfo de la entrada de
+    origen que se reescribe: entonces conserva sus metadatos (fecha,
+    permisos, comentario...) y solo cambian los bytes.
+
+    Con `threads` > 1 y deflate, los datos se comprimen por bloques en un
+    pool de hilos (ver `_ParallelDeflater`); `zipfile` sigue calculando el
+    CRC y los tamaños y escribiendo las cabeceras. Si el manejador de
+    `zipfile` no expone su compresor (`_compressor`, probado con CPython
+    3.11 y 3.13), se usa el suyo: un solo hilo y, desde 3.13, el nivel del
+    ZIP.
+    """
+    if isinstance(entry, zipfile.ZipInfo):
+        zinfo = _copy_zipinfo(entry)
+    else:
+        # Misma fecha y permisos que pondría `writestr`
+        zinfo = zipfile.ZipInfo(entry, time.localtime(time.time())[:6])
+        zinfo.external_attr = 0o600 << 16
+    zinfo.compress_type = output_zip.compression
+    # Atributo público desde Python 3.13
+    if hasattr(zinfo, "compress_level"):
+        zinfo.compress_level = output_zip.compresslevel
+    handle = output_zip.open(zinfo, "w")
+    if output_zip.compression == zipfile.ZIP_DEFLATED and hasattr(
+        handle, "_compressor"
+    ):
+        level = output_zip.compresslevel
+        if level is None:
+            level = zlib.Z_DEFAULT_COMPRESSION
+        if threads > 1:
+            handle._compressor = _ParallelDeflater(level, threads)
+        else:
+            handle._compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return handle
+
+
+# Párrafos distintos que se recuerdan para reutilizar los repetidos
+PARAGRAPH_MEMO_SIZE = 4096
+
+# Elementos que el modo streaming acumula completos antes de procesarlos
+_STREAM_UNITS = ("p", "h", "style")
+
+
+def _local_name(tag: str) -> str:
+    return tag.split("}")[-1] if "}" in tag else tag
+
+
+def _escape_text(text: str) -> str:
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _escape_attrib(text: str) -> str:
+    return (
+        _escape_text(text)
+        .replace('"', "&quot;")
+        .replace("\r", "&#13;")
+        .replace("\n", "&#10;")
+        .replace("\t", "&#09;")
+    )
+
+
+class _OpenElement:
+    """Elemento cuya etiqueta de apertura ya se escribió (modo streaming)."""
+
+    __slots__ = ("elem", "pending", "last")
+
+    def __init__(self, elem):
+        self.elem = elem
+        # True mientras falte cerrar la etiqueta de apertura ('>' o ' />')
+        self.pending = True
+        # Último hijo escrito, cuya cola (tail) aún no se escribió
+        self.last = None
+
+
+class _XMLStreamWriter:
+    """
+    Serializador incremental de XML que conserva los prefijos originales.
+
+    Las declaraciones de namespace recibidas (eventos start-ns) se escriben
+    en el siguiente elemento, igual que en el documento de entrada.
+    """
+
+    def __init__(self, out):
+        self.write = out.write
+        # El prefijo xml está siempre ligado y no se declara
+        self._prefixes = {"http://www.w3.org/XML/1998/namespace": "xml"}
+        self._pending_ns = []
+        # Declaraciones xmlns que corresponden a cada elemento
+        self._declarations = {}
+
+    def declare(self, prefix: str, uri: str):
+        self._pending_ns.append((prefix, uri))
+        self._prefixes.setdefault(uri, prefix)
+
+    def bind(self, elem):
+        """Asocia al elemento las declaraciones recibidas antes de él."""
+        if self._pending_ns:
+            self._declarations[elem] = self._pending_ns
+            self._pending_ns = []
+
+    def skip(self):
+        """Descarta las declaraciones pendientes (ya escritas tal cual)."""
+        self._pending_ns = []
+
+    def _qname(self, name: str, extra_ns: list) -> str:
+        if name[:1] != "{":
+            return name
+        uri, local = name[1:].split("}", 1)
+        prefix = self._prefixes.get(uri)
+        if prefix is None:
+            # Namespace sin declarar en el original: declararlo aquí
+            prefix = f"ns{len(self._prefixes)}"
+            self._prefixes[uri] = prefix
+            extra_ns.append((prefix, uri))
+        return f"{prefix}:{local}" if prefix else local
+
+    def _start(self, elem):
+        extra_ns = list(self._declarations.pop(elem, ()))
+        tag = self._qname(elem.tag, extra_ns)
+        attrs = [
+            f' {self._qname(key, extra_ns)}="{_escape_attrib(value)}"'
+            for key, value in elem.attrib.items()
+        ]
+        self.write("<" + tag)
+        for prefix, uri in extra_ns:
+            name = f"xmlns:{prefix}" if prefix else "xmlns"
+            self.write(f' {name}="{_escape_attrib(uri)}"')
+        self.write("".join(attrs))
+        return tag
+
+    def open_tag(self, elem):
+        """Escribe la apertura de un elemento (sin cerrarla con '>')."""
+        self._start(elem)
+
+    def before_child(self, frame: _OpenElement):
+        """Escribe lo que precede a un nuevo hijo y libera el anterior."""
+        if frame.pending:
+            self.write(">")
+            frame.pending = False
+            if frame.elem.text:
+                self.write(_escape_text(frame.elem.text))
+        elif frame.last is not None:
+            if frame.last.tail:
+                self.write(_escape_text(frame.last.tail))
+            frame.elem.remove(frame.last)
+            frame.last = None
+
+    def close_tag(self, frame: _OpenElement):
+        elem = frame.elem
+        tag = self._qname(elem.tag, [])
+        if frame.pending:
+            if elem.text:
+                self.write(">" + _escape_text(elem.text) + f"</{tag}>")
+            else:
+                self.write(" />")
+            return
+        if frame.last is not None:
+            if frame.last.tail:
+                self.write(_escape_text(frame.last.tail))
+            elem.remove(frame.last)
+            frame.last = None
+        self.write(f"</{tag}>")
+
+    def element(self, elem):
+        """Serializa un subárbol completo (sin su tail)."""
+        tag = self._start(elem)
+        if elem.text or len(elem):
+            self.write(">")
+            if elem.text:
+                self.write(_escape_text(elem.text))
+            for child in elem:
+                self.element(child)
+                if child.tail:
+                    self.write(_escape_text(child.tail))
+            self.write(f"</{tag}>")
+        else:
+            self.write(" />")
+
+
+# Bytes del XML que se entregan al parser en cada llamada (modo splice)
+SPLICE_PARSE_CHUNK = 1 << 16
+
+
+def _iter_spliced_units(
+    raw: bytes,
+    writer: _XMLStreamWriter,
+    excluded=None,
+    units=_STREAM_UNITS,
+    entities: Optional[dict] = None,
+):
+    """
+    Recorre content.xml con expat y produce, en orden de documento, cada
+    unidad (elemento con nombre local en `units`, por defecto `text:p` /
+    `text:h` / `style:style`, fuera de otra unidad) como
+    `(inicio, fin, elemento)`, donde inicio y fin delimitan sus bytes en
+    `raw`. Solo se construyen los árboles de las unidades; el resto del
+    documento no se materializa.
+
+    Las declaraciones de namespace se pasan a `writer` para que un párrafo
+    re-serializado use los prefijos del documento. Si `excluded(tag,
+    attrib)` devuelve True para un elemento, su región entera se salta (sus
+    bytes quedan tal cual). `entities` resuelve las referencias a entidades
+    que el parser no conoce (las de un DTD externo, p. ej. `&nbsp;` en
+    XHTML), con claves como 'nbsp;'.
+    """
+    parser = expat.ParserCreate(namespace_separator="}")
+    parser.buffer_text = True
+    ready = []
+    # Estado de la unidad en curso: [builder, inicio, profundidad]
+    unit = [None, 0, 0]
+    # Profundidad dentro de una región excluida
+    skipped = [0]
+
+    def qualify(name):
+        return "{" + name if "}" in name else name
+
+    def start_ns(prefix, uri):
+        writer.declare(prefix or "", uri)
+
+    def start(name, attrs):
+        if skipped[0]:
+            skipped[0] += 1
+            writer.skip()
+            return
+        builder = unit[0]
+        if builder is None:
+            if excluded is not None and excluded(
+                qualify(name), {qualify(key): value for key, value in attrs.items()}
+            ):
+                skipped[0] = 1
+                writer.skip()
+                return
+            if name.rsplit("}", 1)[-1] not in units:
+                writer.skip()
+                return
+            builder = unit[0] = ET.TreeBuilder()
+            unit[1] = parser.CurrentByteIndex
+        unit[2] += 1
+        elem = builder.start(
+            qualify(name), {qualify(key): value for key, value in attrs.items()}
         )
-        ET.register_namespace("meta", "urn:oasis:names:tc:opendocument:xmlns:meta:1.0")
-        ET.register_namespace("dc", "http://purl.org/dc/elements/1.1/")
-        ET.register_namespace(
-            "table", "urn:oasis:names:tc:opendocument:xmlns:table:1.0"
+        writer.bind(elem)
+
+    def end(name):
+        if skipped[0]:
+            skipped[0] -= 1
+            return
+        builder = unit[0]
+        if builder is None:
+            return
+        builder.end(qualify(name))
+        unit[2] -= 1
+        if unit[2]:
+            return
+        begin = unit[1]
+        index = parser.CurrentByteIndex
+        # Si la etiqueta de cierre es la misma de apertura (<text:p/>), la
+        # unidad no tiene texto: nunca cambia y su fin no hace falta
+        stop = raw.index(b">", index) + 1 if index != begin else begin
+        ready.append((begin, stop, builder.close()))
+        unit[0] = None
+
+    def data(text):
+        if unit[0] is not None:
+            unit[0].data(text)
+
+    parser.StartNamespaceDeclHandler = start_ns
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    parser.CharacterDataHandler = data
+    if entities is not None:
+        # Con un DTD externo "ajeno" expat no falla ante entidades que no
+        # conoce: las notifica como saltadas
+        parser.UseForeignDTD(True)
+        parser.SkippedEntityHandler = lambda name, is_parameter: data(
+            entities.get(name + ";", "")
         )
-        ET.register_namespace(
-            "draw", "urn:oasis:names:tc:opendocument:xmlns:drawing:1.0"
+
+    view = memoryview(raw)
+    for offset in range(0, len(raw), SPLICE_PARSE_CHUNK):
+        parser.Parse(view[offset : offset + SPLICE_PARSE_CHUNK], False)
+        yield from ready
+        ready.clear()
+    parser.Parse(b"", True)
+    yield from ready
+
+
+def _style_key(elem) -> tuple:
+    """
+    Firma de las propiedades de un elemento de estilo: familia, estilo padre
+    y el contenido (hijos y atributos), sin el nombre ni los atributos rsid
+    (marcas de revisión que no afectan al formato).
+    """
+
+    def node_key(node):
+        attrs = tuple(
+            sorted(
+                (k, v)
+                for k, v in node.attrib.items()
+                if k != _STYLE_NAME and not _local_name(k).endswith("rsid")
+            )
         )
+        return (node.tag, attrs, tuple(node_key(child) for child in node))
 
-    def process_and_save(self, output_path: Path, text_converter_func):
-        """
-        Procesa el ODT aplicando conversiones y guarda preservando estructura completa.
+    return node_key(elem)
 
-        Args:
-            output_path: Ruta de salida
-            text_converter_func: Función que convierte el texto. Recibe str y
-                retorna tuple[str, logger]
-        """
-        try:
-            with zipfile.ZipFile(self.filepath, "r") as input_zip:
-                with zipfile.ZipFile(
-                    output_path, "w", zipfile.ZIP_DEFLATED
-                ) as output_zip:
-                    # Copiar TODOS los archivos excepto content.xml
-                    for item in input_zip.namelist():
-                        if item != "content.xml":
-                            data = input_zip.read(item)
-                            # mimetype debe ir sin comprimir
-                            if item == "mimetype":
-                                output_zip.writestr(
-                                    item, data, compress_type=zipfile.ZIP_STORED
-                                )
-                            else:
-                                output_zip.writestr(item, data)
 
-                    # Procesar content.xml preservando estructura
-                    content_xml = input_zip.read("content.xml")
-                    root = ET.fromstring(content_xml)
+# Firma de un estilo de texto automático sin ninguna propiedad
+_EMPTY_TEXT_STYLE_KEY = (
+    "{urn:oasis:names:tc:opendocument:xmlns:style:1.0}style",
+    (("{urn:oasis:names:tc:opendocument:xmlns:style:1.0}family", "text"),),
+    (("{urn:oasis:names:tc:opendocument:xmlns:style:1.0}text-properties", (), ()),),
+)
 
-                    # Construir mapa de propiedades de estilos (italic, bold...)
-                    # Esto nos permitirá normalizar estilos y evitar crear
-                    # cientos de spans distintos que representan lo mismo.
-                    self._build_style_properties(root)
 
-                    # Convertir textos párrafo por párrafo
-                    self._convert_paragraphs_in_tree(root, text_converter_func)
+def _is_plain_span(elem) -> bool:
+    """Indica si es un `text:span` sin más atributo que su estilo."""
+    return elem.tag == f"{_TEXT_NS}span" and all(
+        attr == _TEXT_STYLE_NAME for attr in elem.attrib
+    )
 
-                    # Guardar content.xml modificado
-                    modified_content = ET.tostring(
-                        root, encoding="utf-8", xml_declaration=True
-                    )
-                    output_zip.writestr("content.xml", modified_content)
 
-        except Exception as e:
-            raise Exception(f"Error procesando ODT: {e}")
+def _append_text(parent, last, text):
+    """Añade texto tras `last` (o al texto de `parent` si es None)."""
+    if not text:
+        return
+    if last is None:
+        parent.text = (parent.text or "") + text
+    else:
+        last.tail = (last.tail or "") + text
 
-    def _convert_paragraphs_in_tree(self, element, converter_func):
-        """Convierte textos párrafo por párrafo preservando estructura."""
-        tag = element.tag.split("}")[-1] if "}" in element.tag else element.tag
 
-        # Solo procesar párrafos y encabezados
-        if tag in ("p", "h"):
-            # Verificar si tiene line-breaks internos
-            if self._has_line_breaks(element):
-                # Procesar preservando line-breaks Y formato inline
-                self._convert_with_line_breaks(element, converter_func)
-            else:
-                # Párrafo simple: preservar formato inline sin line-breaks
-                text = self._get_full_text(element)
-                if text.strip():
-                    converted, _ = converter_func(text)
-                    if converted != text:
-                        # Reconstruir preservando formato inline
-                        self._rebuild_simple_paragraph(element, text, converted)
-
-        # Procesar hijos recursivamente
-        for child in element:
-            self._convert_paragraphs_in_tree(child, converter_func)
-
-    def _get_full_text(self, element) -> str:
-        """Obtiene todo el texto de un párrafo incluyendo spans."""
-        parts = []
-        if element.text:
-            parts.append(element.text)
-        for child in element:
-            if child.text:
-                parts.append(child.text)
-            if child.tail:
-                parts.append(child.tail)
-        return "".join(parts)
+def _merge_into(target, span):
+    """Mueve al final de `target` el contenido y la cola de `span`."""
+    _append_text(target, target[-1] if len(target) else None, span.text)
+    for child in list(span):
+        target.append(child)
+    target.tail = span.tail
 
-    def _set_paragraph_text(self, element, new_text: str):
-        """Reemplaza el texto de un párrafo manteniendo la estructura simple."""
-        # Guardar los atributos del elemento
-        attribs = element.attrib.copy()
 
-        # Limpiar el elemento
-        element.clear()
+def _unwrap(parent, idx):
+    """Sustituye el hijo `idx` de `parent` por su contenido."""
+    span = parent[idx]
+    prev = parent[idx - 1] if idx else None
+    _append_text(parent, prev, span.text)
+    children = list(span)
+    for offset, child in enumerate(children):
+        parent.insert(idx + offset, child)
+    parent.remove(span)
+    _append_text(parent, children[-1] if children else prev, span.tail)
 
-        # Restaurar atributos
-        element.attrib.update(attribs)
 
-        # Establecer nuevo texto
-        element.text = new_text
+def _paragraph_key(segments: list) -> tuple:
+    """
+    Firma del contenido de un párrafo a partir de sus runs (ver
+    _process_paragraph). No incluye la etiqueta ni los atributos del
+    párrafo, que la conversión no toca.
+    """
+    return tuple(
+        tuple((run_text, _style_ref(style)) for run_text, style in runs)
+        for runs in segments
+    )
 
-    def _rebuild_simple_paragraph(
-        self, element, original_text: str, converted_text: str
-    ):
-        """
-        Reconstruye un párrafo simple preservando formato inline.
 
-        Args:
-            element: Elemento XML del párrafo
-            original_text: Texto original completo
-            converted_text: Texto convertido completo
-        """
-        # Extraer mapa de formato del original
-        format_map = self._extract_format_map(element)
+def _style_ref(style):
+    """Forma comparable entre párrafos del estilo de un run."""
+    if isinstance(style, tuple):
+        wrapper, inner = style
+        return (wrapper.tag, tuple(sorted(wrapper.attrib.items())), _style_ref(inner))
+    if isinstance(style, str) or style is None:
+        return style
+    return _anchor_key(style)
 
-        # Si no hay formato especial, usar método simple
-        if not format_map or all(not v for v in format_map.values()):
-            self._set_paragraph_text(element, converted_text)
-            return
 
-        # Aplicar formato usando el mapa
-        ns_text = "{urn:oasis:names:tc:opendocument:xmlns:text:1.0}"
+def _in_link(style, leaf):
+    """Estilo `leaf` dentro de los contenedores de `style`, si los hay."""
+    if isinstance(style, tuple):
+        return (style[0], _in_link(style[1], leaf))
+    return leaf
 
-        def normalize_word(word: str) -> str:
-            """Normaliza palabra para matching."""
-            # Quitar puntuación incluyendo TODAS las comillas (ASCII + tipográficas)
-            cleaned = re.sub(
-                r'[.,;:!?¿¡"\u2018\u2019\u201C\u201D\'—()\[\]{}]', "", word
-            )
-            return cleaned.lower().strip()
 
-        def get_word_style(word: str) -> Optional[str]:
-            """Obtiene el estilo de una palabra desde el mapa."""
-            norm_word = normalize_word(word)
-            if norm_word in format_map and format_map[norm_word]:
-                return format_map[norm_word][0]["style"]
-            return None
+def _wrap(style, wrapper):
+    """Estilo de lo que hay dentro de `wrapper`, anidado en `style`."""
+    if isinstance(style, tuple):
+        return (style[0], _wrap(style[1], wrapper))
+    return (wrapper, style)
 
-        # Guardar atributos
-        attribs = element.attrib.copy()
-        element.clear()
-        element.attrib.update(attribs)
 
-        # Dividir en palabras preservando espacios
-        words = re.split(r"(\s+)", converted_text)
+def _leaf_style(style):
+    """Estilo de un run sin sus contenedores: nombre de estilo, None o elemento."""
+    while isinstance(style, tuple):
+        style = style[1]
+    return style
 
-        # Reconstruir con formato
-        for i, word in enumerate(words):
-            if not word:
-                continue
 
-            style_name = get_word_style(word) if not word.isspace() else None
+def _wrappers(style) -> list:
+    """Contenedores (enlaces, spans) de un run, del más externo al más interno."""
+    chain = []
+    while isinstance(style, tuple):
+        chain.append(style[0])
+        style = style[1]
+    return chain
 
-            if i == 0:
-                # Primera palabra/espacio va en element.text
-                if style_name:
-                    span = ET.SubElement(element, f"{ns_text}span")
-                    span.set(f"{ns_text}style-name", style_name)
-                    span.text = word
-                else:
-                    element.text = word
+
+def _is_wrapper_span(elem) -> bool:
+    """
+    Indica si un `text:span` no cabe en un nombre de estilo: tiene más
+    atributos que su estilo (`xml:id`, `text:class-names`...) o contiene
+    otros spans.
+    """
+    if not _is_plain_span(elem):
+        return True
+    return any(
+        child.tag == f"{_TEXT_NS}span" for child in elem.iter() if child is not elem
+    )
+
+
+def _anchor_key(elem) -> bytes:
+    """Serialización de un ancla sin su cola (que ya está en los runs)."""
+    tail = elem.tail
+    elem.tail = None
+    try:
+        return ET.tostring(elem)
+    finally:
+        elem.tail = tail
+
+
+def _remember(cache: dict, key, value):
+    """Guarda en una memoria acotada, descartando la entrada más antigua."""
+    if len(cache) >= PARAGRAPH_MEMO_SIZE:
+        del cache[next(iter(cache))]
+    cache[key] = value
+
+
+def _referenced_styles(elem) -> Iterator[str]:
+    """Nombres de estilo que usa un elemento (`*style-name`, `class-names`)."""
+    for attr, value in elem.attrib.items():
+        if attr.endswith("style-name"):
+            yield value
+        elif attr.endswith("class-names"):
+            yield from value.split()
+
+
+def _iter_preorder(root, skip=None):
+    """
+    Recorre un árbol en preorden con una pila explícita (sin límite de
+    profundidad). Los hijos de cada elemento se leen después de entregarlo,
+    así que ven los cambios que se le hayan hecho.
+
+    Si se indica `skip(elem)`, los elementos para los que devuelve True no
+    se entregan ni se recorren sus descendientes.
+    """
+    stack = [root]
+    while stack:
+        elem = stack.pop()
+        if skip is not None and skip(elem):
+            continue
+        yield elem
+        stack.extend(reversed(elem))
+
+
+def _parse_element_name(name: str) -> str:
+    """
+    Convierte un nombre de elemento con prefijo ODF ('text:index-body') en
+    la forma `{uri}local` de ElementTree.
+    """
+    if name.startswith("{"):
+        return name
+    prefix, sep, local = name.partition(":")
+    if not sep or prefix not in ODF_NAMESPACES:
+        raise ValueError(f"Elemento desconocido: {name}")
+    return f"{{{ODF_NAMESPACES[prefix]}}}{local}"
+
+
+def _encode_style_name(name: str) -> str:
+    """
+    Nombre interno de un estilo a partir del visible: ODF codifica los
+    caracteres no válidos en un nombre XML como `_xx_` ('Contents 1' ->
+    'Contents_20_1').
+    """
+    return re.sub(r"[^\w.-]", lambda m: f"_{ord(m.group()):x}_", name)
+
+
+def _anchor_text(elem) -> str:
+    """Espacio que representa un elemento (text:s, text:tab) en el texto."""
+    local = _local_name(elem.tag)
+    if local == "s":
+        return " " * int(elem.get(_TEXT_SPACE_COUNT, "1"))
+    if local == "tab":
+        return "\t"
+    return ""
+
+
+def _new_document_stats() -> dict:
+    """Contadores vacíos de `_count_paragraph`."""
+    return {
+        "paragraphs": 0,
+        "words": 0,
+        "characters": 0,
+        "dialog_paragraphs": 0,
+        "dialog_lines": 0,
+        "dialog_words": 0,
+    }
+
+
+def _count_paragraph(stats: dict, text: str):
+    """
+    Suma un párrafo (ya convertido) a las estadísticas del documento.
+
+    Una línea de diálogo es la que empieza con raya; sus palabras (incisos
+    del narrador incluidos) cuentan como palabras de diálogo.
+    """
+    stats["paragraphs"] += 1
+    stats["words"] += len(text.split())
+    stats["characters"] += len(text)
+    dialog = [
+        line for line in text.split("\n") if line.lstrip().startswith(_DIALOG_DASH)
+    ]
+    if dialog:
+        stats["dialog_paragraphs"] += 1
+        stats["dialog_lines"] += len(dialog)
+        stats["dialog_words"] += sum(len(line.split()) for line in dialog)
+
+
+def _extract_runs(element) -> list:
+    """
+    Modelo de runs de un párrafo: una lista de runs (texto, estilo) por
+    cada tramo entre `text:line-break`.
+
+    El estilo es el `text:style-name` del span (None fuera de spans).
+    Dentro de un contenedor es el par (contenedor, estilo interior): lo son
+    los `text:a` (su texto se convierte como el resto) y los spans que no se
+    reducen a su estilo (ver `_is_wrapper_span`), que se reconstruyen
+    anidados y con todos sus atributos. `text:s` y `text:tab` son
+    runs de solo lectura: el conversor ve su espacio, pero su estilo es
+    el propio elemento, que se conserva intacto. Cualquier otro hijo
+    (notas, marcos, marcadores...) es un ancla: un run sin texto cuyo
+    estilo es el propio elemento.
+    """
+    segments = [[]]
+    # Pila explícita de nodos por visitar y colas de texto pendientes,
+    # cada uno con el estilo vigente
+    stack = [(element, None)]
+    while stack:
+        item, style = stack.pop()
+        if isinstance(item, str):
+            segments[-1].append((item, style))
+            continue
+
+        if item is not element:
+            local = _local_name(item.tag)
+            if local == "line-break":
+                segments.append([])
+                continue
+            if local == "span" and not _is_wrapper_span(item):
+                leaf = item.get(_TEXT_STYLE_NAME, _leaf_style(style))
+                style = _in_link(style, leaf)
+            elif local in ("span", "a"):
+                style = _wrap(style, item)
             else:
-                # Resto va en tails o spans
-                if style_name:
-                    span = ET.SubElement(element, f"{ns_text}span")
-                    span.set(f"{ns_text}style-name", style_name)
-                    span.text = word
-                else:
-                    # Agregar al tail del último elemento
-                    if len(element) > 0:
-                        if element[-1].tail:
-                            element[-1].tail += word
-                        else:
-                            element[-1].tail = word
-                    else:
-                        if element.text:
-                            element.text += word
-                        else:
-                            element.text = word
-
-    def _has_line_breaks(self, element) -> bool:
-        """Verifica si un párrafo tiene saltos de línea internos."""
-        for child in element.iter():
-            tag = child.tag.split("}")[-1] if "}" in child.tag else child.tag
-            if tag == "line-break":
-                return True
-        return False
+                segments[-1].append((_anchor_text(item), _in_link(style, item)))
+                continue
+
+        if item.text:
+            segments[-1].append((item.text, style))
+        for child in reversed(item):
+            if child.tail:
+                stack.append((child.tail, style))
+            stack.append((child, style))
+
+    return segments
+
+
+def _paragraph_text(element) -> str:
+    """
+    Texto de un párrafo según su modelo de runs: los line-breaks como \\n,
+    `text:s` y `text:tab` como espacios y tabuladores. El contenido de las
+    anclas (p. ej. los párrafos de las notas) no forma parte de él.
+    """
+    return "\n".join(
+        "".join(run_text for run_text, _ in runs) for runs in _extract_runs(element)
+    )
+
 
-    def _convert_with_line_breaks(self, element, converter_func):
+def _runs_converter(text_converter_func):
+    """
+    Función que convierte runs (texto, estilo) a partir de la función de
+    conversión de texto recibida.
+
+    Con `DialogConverter.convert` se usa `convert_runs` del mismo conversor
+    (el formato sigue a los caracteres). Con cualquier otra función de texto
+    no hay procedencia: si el texto cambia, queda en un único run con el
+    estilo del primero y las anclas al final.
+    """
+    converter = getattr(text_converter_func, "__self__", None)
+    if hasattr(converter, "convert_runs"):
+        return converter.convert_runs
+
+    def convert_runs(runs):
+        text = "".join(run_text for run_text, _ in runs)
+        converted, logger = text_converter_func(text)
+        if converted == text:
+            return runs, logger
+        anchors = [run for run in runs if not run[0]]
+        styles = [style for run_text, style in runs if run_text]
+        return [(converted, styles[0] if styles else None)] + anchors, logger
+
+    return convert_runs
+
+
+def _split_by_slot(slots: list, converted: list) -> Optional[list]:
+    """
+    Reparte el texto de unos runs convertidos entre los huecos de origen
+    (los estilos de los runs originales, comparados por identidad).
+
+    Los caracteres que el conversor inserta entre dos huecos distintos
+    (estilo None, p. ej. la raya que cierra un inciso) van con el hueco que
+    los sigue, o con el anterior al final del tramo. Las anclas (runs sin
+    texto) se ignoran.
+
+    Returns:
+        Lista con los textos de cada hueco, o None si algún run viene de
+        otro estilo o el orden del resultado no respeta el de los huecos
+    """
+    order = {id(slot): idx for idx, slot in enumerate(slots)}
+    pieces = [[] for _ in slots]
+    pending = []
+    last = 0
+    for text, style in converted:
+        if not text:
+            continue
+        if style is None:
+            pending.append(text)
+            continue
+        idx = order.get(id(style))
+        if idx is None or idx < last:
+            return None
+        pieces[idx].extend(pending)
+        pieces[idx].append(text)
+        pending = []
+        last = idx
+    if pending:
+        if not slots:
+            return None
+        pieces[last].extend(pending)
+    return pieces
+
+
+class ODTProcessor:
+    """Procesa archivos ODT preservando estilos y estructura."""
+
+    def __init__(
+        self,
+        filepath: Path,
+        streaming: bool = False,
+        workers: int = 0,
+        splice: bool = False,
+        compress_level: Optional[int] = None,
+        compress_threads: int = 0,
+        exclude_styles: Iterable[str] = (),
+        exclude_sections: Iterable[str] = (),
+        exclude_elements: Iterable[str] = (),
+    ):
         """
-        Convierte texto preservando line-breaks Y formato (spans, bold, italic).
+        Inicializa el procesador de ODT.
 
-        NUEVA ESTRATEGIA: Mapeo de formato palabra por palabra
-        1. Extraer mapa de formato del original (palabra → estilo)
-        2. Convertir el texto
-        3. Reconstruir aplicando el formato según el mapa
+        Args:
+            filepath: Ruta al archivo .odt (o Flat ODT .fodt, que se procesa
+                sin capa ZIP y, por defecto, en flujo)
+            streaming: Procesar content.xml en flujo (iterparse) un párrafo
+                a la vez, con memoria acotada sin importar la longitud
+            workers: Si es mayor que 1, convertir los párrafos en un pool de
+                procesos (requiere que la función de conversión sea
+                `DialogConverter.convert`); no se combina con streaming
+            splice: Copiar tal cual los bytes de content.xml y re-serializar
+                solo los párrafos que cambian; no se combina con streaming
+            compress_level: Nivel de deflate de content.xml (1-9, None = el
+                de zlib); 0 lo guarda sin comprimir (archivos intermedios)
+            compress_threads: Si es mayor que 1, comprimir content.xml por
+                bloques en ese número de hilos
+            exclude_styles: Estilos de párrafo que no se convierten (nombre
+                visible o interno; también cuenta el estilo padre de un
+                estilo automático)
+            exclude_sections: Nombres de secciones (`text:section`) que no se
+                convierten
+            exclude_elements: Elementos que no se convierten, con prefijo
+                ODF (p. ej. 'text:index-body', 'table:table')
+        """
+        if streaming and workers > 1:
+            raise ValueError("El modo streaming no admite workers")
+        if streaming and splice:
+            raise ValueError("El modo streaming no admite splice")
+        if compress_level is not None and not 0 <= compress_level <= 9:
+            raise ValueError(f"Nivel de compresión inválido: {compress_level}")
+        self.filepath = filepath
+        self.streaming = streaming
+        self.workers = workers
+        self.splice = splice
+        self.flat = filepath.suffix.lower() == ".fodt"
+        self.compress_level = compress_level
+        self.compress_threads = compress_threads
+        # Regiones excluidas: no se recorren (ver _is_excluded)
+        self._exclude_styles = set(exclude_styles) | {
+            _encode_style_name(name) for name in exclude_styles
+        }
+        self._exclude_sections = set(exclude_sections)
+        self._exclude_elements = {_parse_element_name(n) for n in exclude_elements}
+        self._skip = (
+            self._skip_excluded
+            if self._exclude_styles or self._exclude_sections or self._exclude_elements
+            else None
+        )
+        self._excluded_count = 0
+        # Runs ya extraídos por párrafo (ver _collect_paragraph_texts)
+        self._paragraph_runs = {}
+        # Salidas secundarias del recorrido (ver process_and_save)
+        self._text_export: Optional[TextIO] = None
+        self._stats: Optional[dict] = None
+        # Firma de cada párrafo ya convertido -> conversiones grabadas y
+        # contenido convertido (ver _process_paragraph)
+        self._paragraph_memo = {}
+        # Registrar namespaces para preservarlos en el XML
+        for prefix, uri in ODF_NAMESPACES.items():
+            ET.register_namespace(prefix, uri)
+
+    def has_dialog(self) -> bool:
+        """Indica si el content.xml del documento contiene comillas en su texto."""
+        if self.flat:
+            with open(self.filepath, "rb") as content:
+                return stream_may_have_dialog(content)
+        with zipfile.ZipFile(self.filepath, "r") as odt_zip:
+            with odt_zip.open("content.xml") as content:
+                return stream_may_have_dialog(content)
+
+    def process_and_save(
+        self,
+        output_path: Path,
+        text_converter_func,
+        skip_without_dialog=True,
+        text_path: Optional[Path] = None,
+        stats_path: Optional[Path] = None,
+    ) -> bool:
         """
-        # 1. Extraer mapa de formato ANTES de modificar
-        format_map = self._extract_format_map(element)
+        Procesa el ODT aplicando conversiones y guarda preservando estructura completa.
 
-        # 2. Extraer segmentos de texto entre line-breaks Y estilos por token
-        segments, token_styles_seq = self._extract_text_segments_and_styles(element)
+        Las salidas secundarias se obtienen del mismo recorrido que convierte
+        el documento (se parsea una sola vez): el texto de cada párrafo se
+        toma ya convertido, en orden de documento. Las regiones excluidas no
+        aparecen en ellas.
 
-        # 3. Convertir cada segmento
-        converted_segments = []
-        for seg in segments:
-            if seg.strip():
-                converted, _ = converter_func(seg)
-                converted_segments.append(converted)
-            else:
-                converted_segments.append(seg)
-
-        # 4. Reconstruir preservando formato: preferir estilos por índice
-        # (token_styles_seq)
-        #    y usar format_map consumiendo entradas (pop) como fallback.
-        # Pasar además los segmentos originales para permitir alineado token->token
-        self._rebuild_with_format_map(
-            element,
-            converted_segments,
-            format_map,
-            token_styles_seq=token_styles_seq,
-            original_segments=segments,
-        )
+        Args:
+            output_path: Ruta de salida
+            text_converter_func: Función que convierte el texto. Recibe str y
+                retorna tuple[str, logger]
+            skip_without_dialog: Si content.xml no tiene comillas en ningún
+                texto, copiar el archivo tal cual sin parsear ni recomprimir
+                (no se aplica si se pide alguna salida secundaria)
+            text_path: Si se indica, exportar ahí el texto convertido (un
+                párrafo por línea, los line-breaks como saltos de línea)
+            stats_path: Si se indica, guardar ahí las estadísticas del texto
+                convertido en JSON (ver `_count_paragraph`)
 
-    def _extract_text_segments_smart(self, element) -> list:
-        """
-        Extrae segmentos de texto entre line-breaks para saber qué convertir.
-        No modifica la estructura, solo lee.
+        Returns:
+            True si se procesó el documento, False si se copió sin cambios
         """
-        segments = []
-        current_text = []
+        try:
+            exports = text_path is not None or stats_path is not None
+            if skip_without_dialog and not exports and not self.has_dialog():
+                shutil.copyfile(self.filepath, output_path)
+                return False
 
-        def extract_recursive(elem):
-            if elem.text:
-                current_text.append(elem.text)
+            if not exports:
+                self._process_document(output_path, text_converter_func)
+                return True
 
-            for child in elem:
-                child_tag = child.tag.split("}")[-1] if "}" in child.tag else child.tag
-
-                if child_tag == "line-break":
-                    # Guardar segmento actual
-                    segments.append("".join(current_text))
-                    current_text.clear()
-                    if child.tail:
-                        current_text.append(child.tail)
-                else:
-                    # Continuar acumulando (recursivo para hijos)
-                    extract_recursive(child)
-                    if child.tail:
-                        current_text.append(child.tail)
+            logger = getattr(
+                getattr(text_converter_func, "__self__", None), "logger", None
+            )
+            changes_before = getattr(logger, "total_changes", 0)
+            self._stats = _new_document_stats() if stats_path is not None else None
+            try:
+                if text_path is not None:
+                    self._text_export = open(text_path, "w", encoding="utf-8")
+                self._process_document(output_path, text_converter_func)
+            finally:
+                if self._text_export is not None:
+                    self._text_export.close()
+                    self._text_export = None
+
+            if stats_path is not None:
+                stats = {"file": self.filepath.name, **self._stats}
+                stats["changes"] = getattr(logger, "total_changes", 0) - changes_before
+                self._stats = None
+                with open(stats_path, "w", encoding="utf-8") as f:
+                    json.dump(stats, f, ensure_ascii=False, indent=2)
+            return True
 
-        extract_recursive(element)
+        except Exception as e:
+            raise Exception(f"Error procesando ODT: {e}")
 
-        # Guardar último segmento
-        if current_text:
-            segments.append("".join(current_text))
+    def _process_document(self, output_path: Path, text_converter_func):
+        """Convierte el documento y escribe el ODT (o Flat ODT) de salida."""
+        # Flat ODT: el documento entero es el XML, sin capa ZIP
+        if self.flat:
+            with open(self.filepath, "rb") as source, open(
+                output_path, "wb"
+            ) as raw_out:
+                self._process_content(source, raw_out, text_converter_func)
+            return
 
-        return segments
+        with zipfile.ZipFile(self.filepath, "r") as input_zip, open(
+            self.filepath, "rb"
+        ) as raw_input:
+            with zipfile.ZipFile(output_path, "w", **self._zip_options()) as output_zip:
+                # Copiar TODOS los archivos excepto content.xml, tal cual
+                # (sin descomprimir imágenes, fuentes, estilos...)
+                for info in input_zip.infolist():
+                    if info.filename == "content.xml":
+                        continue
+                    # mimetype debe ir sin comprimir
+                    if (
+                        info.filename == "mimetype"
+                        and info.compress_type != zipfile.ZIP_STORED
+                    ):
+                        output_zip.writestr(
+                            info.filename,
+                            input_zip.read(info),
+                            compress_type=zipfile.ZIP_STORED,
+                        )
+                    else:
+                        copy_raw_entry(raw_input, output_zip, info)
+
+                # Procesar content.xml preservando estructura
+                content_info = input_zip.getinfo("content.xml")
+                with input_zip.open(content_info) as source, self._open_content(
+                    output_zip, content_info
+                ) as raw_out:
+                    self._process_content(source, raw_out, text_converter_func)
+
+    def _zip_options(self) -> dict:
+        """Compresión del ZIP de salida (la usa solo content.xml)."""
+        if self.compress_level == 0:
+            return {"compression": zipfile.ZIP_STORED}
+        return {
+            "compression": zipfile.ZIP_DEFLATED,
+            "compresslevel": self.compress_level,
+        }
 
-    def _split_preserving_spaces(self, text: str) -> list:
+    def _open_content(
+        self, output_zip: zipfile.ZipFile, info: zipfile.ZipInfo
+    ) -> BinaryIO:
+        """Abre content.xml en el ZIP de salida, con los metadatos de `info`."""
+        return open_compressed_entry(output_zip, info, threads=self.compress_threads)
+
+    def _process_content(
+        self, source: BinaryIO, raw_out: BinaryIO, text_converter_func
+    ):
         """
-        Divide texto en tokens preservando espacios similares a la versión anterior.
-        Retorna una lista de tokens donde las palabras y los espacios adyacentes
-        se mantienen juntos cuando sea apropiado.
+        Convierte el XML del documento de `source` a `raw_out` en el modo
+        elegido. Un Flat ODT va en flujo salvo que se pida splice o workers.
         """
-        parts = []
-        current_pos = 0
+        if self.splice:
+            self._process_content_splice(source, raw_out, text_converter_func)
+        elif self.streaming or (self.flat and self.workers <= 1):
+            self._process_content_streaming(source, raw_out, text_converter_func)
+        else:
+            self._process_content_tree(source, raw_out, text_converter_func)
+
+    def _process_content_tree(self, source, raw_out, text_converter_func):
+        """Convierte content.xml cargando el árbol completo en memoria."""
+        root = ET.fromstring(source.read())
+
+        # El mapa de propiedades de estilos (italic, bold...) se construye
+        # durante el mismo recorrido que convierte: automatic-styles precede
+        # al cuerpo del documento
+        self._reset_style_properties()
+        self._reset_paragraph_memo()
+        self._excluded_count = 0
+
+        # Convertir en paralelo de antemano (si se pidió); el recorrido de
+        # abajo reutiliza esos resultados en el mismo orden que en serie
+        converter = getattr(text_converter_func, "__self__", None)
+        parallel = self.workers > 1 and hasattr(converter, "prefetch")
+        if parallel:
+            texts = []
+            self._collect_paragraph_texts(root, texts)
+            converter.prefetch(texts, workers=self.workers)
+
+        # Convertir textos párrafo por párrafo
+        referenced = set()
+        try:
+            self._convert_paragraphs_in_tree(root, text_converter_func, referenced)
+        finally:
+            if parallel:
+                converter.clear_prefetched()
+            self._paragraph_runs.clear()
+            self._reset_paragraph_memo()
 
-        word_pattern = re.compile(r"\S+")
+        self._drop_folded_styles(root, referenced)
 
-        for match in word_pattern.finditer(text):
-            start, end = match.span()
+        # Guardar content.xml modificado
+        raw_out.write(ET.tostring(root, encoding="utf-8", xml_declaration=True))
 
-            # Añadir espacios previos si los hay
-            if start > current_pos:
-                spaces_before = text[current_pos:start]
-                if parts:
-                    parts[-1] = parts[-1] + spaces_before
+    def _process_content_streaming(self, source, raw_out, text_converter_func):
+        """
+        Convierte content.xml en flujo, con memoria acotada.
+
+        Lee el XML con `iterparse` y escribe directamente en la salida (la
+        entrada del ZIP o el archivo Flat ODT). Los elementos fuera de los
+        párrafos se serializan a medida que llegan y se descartan. Cada
+        `text:p` / `text:h` (y cada `style:style`) se acumula completo, se
+        convierte con la misma lógica que el modo árbol y se serializa. Los
+        prefijos de namespace son los del documento original (eventos
+        start-ns).
+        """
+        self._reset_style_properties()
+        self._reset_paragraph_memo()
+        self._excluded_count = 0
+
+        out = io.TextIOWrapper(raw_out, encoding="utf-8")
+        writer = _XMLStreamWriter(out)
+        writer.write("<?xml version='1.0' encoding='utf-8'?>\n")
+
+        # Pila de elementos abiertos y ya escritos (fuera de unidades)
+        stack = []
+        # Profundidad dentro de la unidad (párrafo/estilo) en curso
+        unit_depth = 0
+
+        events = ("start-ns", "start", "end")
+        for event, item in ET.iterparse(source, events=events):
+            if event == "start-ns":
+                writer.declare(*item)
+                continue
+
+            if event == "start":
+                writer.bind(item)
+                if unit_depth:
+                    unit_depth += 1
+                    continue
+                if stack:
+                    writer.before_child(stack[-1])
+                # Una región excluida se acumula como unidad y se
+                # escribe sin convertir
+                if _local_name(item.tag) in _STREAM_UNITS or (
+                    self._skip is not None
+                    and self._is_excluded(item.tag, item.attrib)
+                ):
+                    unit_depth = 1
                 else:
-                    parts.append(spaces_before)
+                    writer.open_tag(item)
+                    stack.append(_OpenElement(item))
+                continue
 
-            # Añadir la palabra
-            word = text[start:end]
-            parts.append(word)
-            current_pos = end
+            # event == "end"
+            if unit_depth:
+                unit_depth -= 1
+                if unit_depth:
+                    continue
+                self._convert_paragraphs_in_tree(item, text_converter_func)
+                writer.element(item)
+                stack[-1].last = item
+                continue
 
-        # Añadir espacios finales si los hay
-        if current_pos < len(text):
-            if parts:
-                parts[-1] = parts[-1] + text[current_pos:]
-            else:
-                parts.append(text[current_pos:])
+            frame = stack.pop()
+            writer.close_tag(frame)
+            if stack:
+                stack[-1].last = item
 
-        return parts
+        out.flush()
+        out.detach()
 
-    def _align_token_styles(
-        self,
-        orig_tokens: list[str],
-        orig_styles: list[Optional[str]],
-        conv_tokens: list[str],
-        unset_value=None,
-    ) -> list:
-        """Alinea estilos de tokens originales a tokens convertidos.
-
-        Usa SequenceMatcher para encontrar bloques iguales y asigna estilos
-        de tokens originales a tokens convertidos. Para bloques reemplazados
-        mapea por proporción de índices.
+    def _process_content_splice(self, source, raw_out, text_converter_func):
         """
-        # Normalizar tokens (strip) para comparar
-        orig_norm = [t.strip() for t in orig_tokens]
-        conv_norm = [t.strip() for t in conv_tokens]
-
-        matcher = difflib.SequenceMatcher(None, orig_norm, conv_norm)
-        result_styles = [unset_value for _ in range(len(conv_tokens))]
-
-        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
-            if tag == "equal":
-                # Copiar estilos directamente
-                for o_idx, c_idx in zip(range(i1, i2), range(j1, j2)):
-                    if o_idx < len(orig_styles):
-                        result_styles[c_idx] = orig_styles[o_idx]
-            else:
-                len_orig = i2 - i1
-                len_conv = j2 - j1
-                if len_conv <= 0:
-                    continue
-                if len_orig <= 0:
-                    # No hay tokens originales correspondentes
-                    for c_idx in range(j1, j2):
-                        result_styles[c_idx] = None
-                    continue
-                # Mapear por proporción
-                for offset in range(len_conv):
-                    # calcular índice proporcional
-                    mapped = i1 + int(offset * len_orig / len_conv)
-                    if mapped >= i2:
-                        mapped = i2 - 1
-                    if mapped < len(orig_styles):
-                        result_styles[j1 + offset] = orig_styles[mapped]
-
-        return result_styles
-
-    def _extract_text_segments_and_styles(
-        self, element
-    ) -> tuple[list[str], list[list[Optional[str]]]]:
+        Convierte content.xml copiando sus bytes originales y re-serializando
+        solo los párrafos que cambian (ver `iter_content_changes`). El XML
+        sin cambios queda idéntico byte a byte al de entrada.
         """
-        Extrae segmentos de texto entre line-breaks y, para cada segmento,
-        devuelve la lista de tokens (manteniendo espacios) y una lista de estilos
-        por token (None si no hay estilo).
+        content_xml = source.read()
+        view = memoryview(content_xml)
+        # Agrupar las escrituras: el compresor rinde poco con trozos pequeños
+        out = io.BufferedWriter(raw_out, RAW_COPY_CHUNK)
+        copied = 0
+        for begin, stop, unit_xml in self.iter_content_changes(
+            content_xml, text_converter_func
+        ):
+            out.write(view[copied:begin])
+            out.write(unit_xml.encode("utf-8"))
+            copied = stop
+        out.write(view[copied:])
+        out.flush()
+        out.detach()
+
+    def read_content(self) -> bytes:
+        """XML del documento: content.xml, o el archivo entero si es Flat ODT."""
+        if self.flat:
+            return self.filepath.read_bytes()
+        with zipfile.ZipFile(self.filepath, "r") as odt_zip:
+            return odt_zip.read("content.xml")
+
+    def iter_content_changes(self, content_xml: bytes, text_converter_func):
+        """
+        Convierte el XML del documento y produce, en orden, cada unidad
+        (párrafo, encabezado o estilo de `_iter_spliced_units`) que cambió.
 
-        Returns:
-            (segments_texts, segments_token_styles) donde ambos son listas paralelas.
+        Cada unidad se convierte con la misma lógica que el modo árbol; las
+        que no cambian no se re-serializan. Las definiciones de estilos
+        plegados se conservan (como en streaming).
+
+        Yields:
+            (inicio, fin, xml): bytes de la unidad original en `content_xml`
+            y su XML convertido
         """
-        segments = []
-        segments_token_styles = []
+        self._reset_style_properties()
+        self._reset_paragraph_memo()
+        self._excluded_count = 0
+
+        buffer = io.StringIO()
+        writer = _XMLStreamWriter(buffer)
+        # Durante el parseo solo se saltan tipos y secciones: los estilos
+        # aún no están registrados. Los párrafos excluidos por estilo se
+        # saltan al convertir (y, sin cambios, se copian igual)
+        units = _iter_spliced_units(
+            content_xml, writer, self._is_excluded_region if self._skip else None
+        )
 
-        current_chars = []
-        current_char_styles = []
+        converter = getattr(text_converter_func, "__self__", None)
+        parallel = self.workers > 1 and hasattr(converter, "prefetch")
+        if parallel:
+            units = list(units)
+            texts = []
+            for _, _, unit in units:
+                self._collect_paragraph_texts(unit, texts)
+            converter.prefetch(texts, workers=self.workers)
 
-        ns_text = "{urn:oasis:names:tc:opendocument:xmlns:text:1.0}"
+        try:
+            for begin, stop, unit in units:
+                if not self._convert_paragraphs_in_tree(unit, text_converter_func):
+                    continue
+                writer.element(unit)
+                yield begin, stop, buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        finally:
+            if parallel:
+                converter.clear_prefetched()
+            self._paragraph_runs.clear()
+            self._reset_paragraph_memo()
+
+    def _convert_paragraphs_in_tree(
+        self, element, converter_func, referenced: Optional[set] = None
+    ) -> bool:
+        """
+        Recorre el subárbol una sola vez, en preorden y sin recursión,
+        registrando los estilos y convirtiendo párrafo por párrafo.
 
-        def extract_recursive(elem, current_style=None):
-            # Actualizar estilo si el elemento es span
-            tag = elem.tag.split("}")[-1] if "}" in elem.tag else elem.tag
-            if tag == "span":
-                style_attr = f"{ns_text}style-name"
-                current_style = elem.attrib.get(style_attr, current_style)
+        Args:
+            element: Raíz del subárbol
+            converter_func: Función de conversión de texto
+            referenced: Si se indica, se le añaden los nombres de estilo
+                referenciados por el resultado (ver `_drop_folded_styles`)
 
-            # Texto directo
-            if elem.text:
-                txt = elem.text
-                current_chars.append(txt)
-                # Marcar estilo por carácter
-                current_char_styles.extend([current_style] * len(txt))
+        Returns:
+            True si cambió algún párrafo del subárbol
+        """
+        skip = self._skip
+        if referenced is not None and skip is not None:
+            # Las regiones excluidas no se recorren, pero los estilos que
+            # usan siguen referenciados
+            def skip(elem):
+                if not self._skip(elem):
+                    return False
+                for node in elem.iter():
+                    referenced.update(_referenced_styles(node))
+                return True
 
-            for child in elem:
-                child_tag = child.tag.split("}")[-1] if "}" in child.tag else child.tag
-
-                if child_tag == "line-break":
-                    # Guardar segmento actual
-                    segments.append("".join(current_chars))
-                    segments_token_styles.append([])  # placeholder, rellenaremos luego
-                    # Guardar char style snapshot
-                    # Convertir current_char_styles a lista y añadir a auxiliar
-                    # (almacenaremos el arreglo en paralelo en otra lista)
-                    # Para simplificar, almacenamos temporalmente en
-                    # segments_token_styles[-1]
-                    segments_token_styles[-1] = current_char_styles.copy()
-
-                    # Limpiar acumuladores para el siguiente segmento
-                    current_chars.clear()
-                    current_char_styles.clear()
-
-                    if child.tail:
-                        txt_tail = child.tail
-                        current_chars.append(txt_tail)
-                        current_char_styles.extend([current_style] * len(txt_tail))
-                else:
-                    extract_recursive(child, current_style)
-                    if child.tail:
-                        txt_tail = child.tail
-                        current_chars.append(txt_tail)
-                        current_char_styles.extend([current_style] * len(txt_tail))
-
-        extract_recursive(element)
-
-        # Guardar último segmento
-        if current_chars:
-            segments.append("".join(current_chars))
-            segments_token_styles.append(current_char_styles.copy())
-
-        # Ahora convertir char-styles en estilos por token para cada segmento
-        segments_token_styles_by_token = []
-        for seg_text, char_styles in zip(segments, segments_token_styles):
-            tokens = self._split_preserving_spaces(seg_text)
-            token_styles = []
-            pos = 0
-            for token in tokens:
-                length = len(token)
-                # Extraer estilos de los caracteres cubiertos por este token
-                slice_styles = char_styles[pos : pos + length]
-                # Elegir primer estilo no-None si existe, sino None
-                token_style = None
-                for s in slice_styles:
-                    if s is not None:
-                        token_style = s
-                        break
-                token_styles.append(token_style)
-                pos += length
+        changed = False
+        for elem in _iter_preorder(element, skip):
+            self._register_style(elem)
 
-            segments_token_styles_by_token.append(token_styles)
+            # Solo procesar párrafos y encabezados
+            if _local_name(elem.tag) in ("p", "h"):
+                if self._process_paragraph(elem, converter_func):
+                    changed = True
+                if self._text_export is not None or self._stats is not None:
+                    self._export_paragraph(elem)
 
-        return segments, segments_token_styles_by_token
+            if referenced is not None:
+                referenced.update(_referenced_styles(elem))
+        return changed
 
-    def _build_style_properties(self, root):
+    def _export_paragraph(self, element):
         """
-        Construye un mapa de propiedades para cada style-name definido en
-        automatic-styles del documento. Guarda en `self._style_props` un dict
-        style-name -> { 'italic': bool, 'bold': bool }
+        Lleva el texto ya convertido de un párrafo a las salidas secundarias.
 
-        También selecciona un style-name canónico para italic si encuentra uno,
-        y lo guarda en `self._canonical_style_for`.
+        El texto es el de `_paragraph_text` (los párrafos anidados, p. ej.
+        de notas, se exportan aparte cuando el recorrido llega a ellos).
         """
-        self._style_props = {}
-        self._canonical_style_for = {"italic": None, "bold": None}
+        text = _paragraph_text(element)
+        if not text.strip():
+            return
+        if self._text_export is not None:
+            self._text_export.write(text + "\n")
+        if self._stats is not None:
+            _count_paragraph(self._stats, text)
+
+    def _is_excluded_region(self, tag: str, attrib: dict) -> bool:
+        """Indica si un elemento es de un tipo o una sección excluidos."""
+        if tag in self._exclude_elements:
+            return True
+        return (
+            _local_name(tag) == "section"
+            and attrib.get(_TEXT_NAME) in self._exclude_sections
+        )
 
-        # namespaces declared above; no need to reassign here
-
-        # Buscar estilos dentro de automatic-styles
-        for elem in root.iter():
-            # tag completo como '{ns}style'
-            if isinstance(elem.tag, str) and elem.tag.endswith("}style"):
-                # Obtener el nombre del estilo
-                style_name = None
-                for k, v in elem.attrib.items():
-                    if k.endswith("}name") or k == "name" or k.endswith(":name"):
-                        style_name = v
-                        break
+    def _is_excluded(self, tag: str, attrib: dict) -> bool:
+        """
+        Indica si un elemento abre una región que no se convierte: un tipo de
+        elemento excluido, una sección excluida por nombre o un párrafo cuyo
+        estilo (o alguno de sus padres registrados) está excluido.
+        """
+        if self._is_excluded_region(tag, attrib):
+            return True
+        if _local_name(tag) in ("p", "h") and self._exclude_styles:
+            style = attrib.get(_TEXT_STYLE_NAME)
+            seen = set()
+            while style and style not in seen:
+                if style in self._exclude_styles:
+                    return True
+                seen.add(style)
+                style = self._style_props.get(style, {}).get("parent")
+        return False
 
-                if not style_name:
-                    continue
+    def _skip_excluded(self, elem) -> bool:
+        """Predicado `skip` de `_iter_preorder` para las regiones excluidas."""
+        if self._is_excluded(elem.tag, elem.attrib):
+            self._excluded_count += 1
+            return True
+        return False
 
-                # Buscar child text:properties dentro de este style
-                italic = False
-                bold = False
-                for child in elem:
-                    # child tag localname
-                    local = child.tag.split("}")[-1] if "}" in child.tag else child.tag
-                    if local == "text-properties":
-                        # Revisar atributos fo:font-style y fo:font-weight
-                        for ak, av in child.attrib.items():
-                            if ak.endswith("}font-style") and av == "italic":
-                                italic = True
-                            if ak.endswith("}font-weight") and av in ("bold", "700"):
-                                bold = True
-
-                self._style_props[style_name] = {"italic": italic, "bold": bold}
-
-                if italic and not self._canonical_style_for["italic"]:
-                    self._canonical_style_for["italic"] = style_name
-                if bold and not self._canonical_style_for["bold"]:
-                    self._canonical_style_for["bold"] = style_name
-
-        # If no canonical italic found, leave None; downstream we skip creating
-        # spans for non-meaningful styles.
-
-    def _extract_format_map(self, element) -> dict:
+    def _collect_paragraph_texts(self, element, texts: list):
         """
-        Extrae un mapa de palabra normalizada → estilo de span.
+        Recoge, sin modificar el árbol, los textos que
+        `_convert_paragraphs_in_tree` pasará al conversor, en el mismo orden.
 
-        Returns:
-            Dict con estructura:
-            {
-                'palabra_normalizada': [
-                    {'style': 'T1', 'original': 'Palabra'},
-                    ...
-                ]
-            }
+        Guarda los runs extraídos de cada párrafo para que la conversión no
+        vuelva a recorrerlos.
         """
-        format_map = {}
-
-        def normalize_word(word: str) -> str:
-            """Normaliza palabra para matching (lowercase, sin puntuación)."""
-            # Quitar puntuación incluyendo TODAS las comillas (ASCII + tipográficas)
-            # U+0022: " | U+0027: ' | U+2018: ' | U+2019: ' | U+201C: " | U+201D: "
-            cleaned = re.sub(
-                r'[.,;:!?¿¡"\u2018\u2019\u201C\u201D\'—()\[\]{}]', "", word
-            )
-            return cleaned.lower().strip()
-
-        def extract_words_with_format(elem, current_style=None):
-            """Extrae palabras con su estilo asociado."""
-            tag = elem.tag.split("}")[-1] if "}" in elem.tag else elem.tag
-
-            # Si es un span, capturar el estilo
-            if tag == "span":
-                ns_text = "{urn:oasis:names:tc:opendocument:xmlns:text:1.0}"
-                style_attr = f"{ns_text}style-name"
-                current_style = elem.attrib.get(style_attr, None)
-
-            # Procesar texto del elemento
-            if elem.text and current_style:
-                words = elem.text.split()
-                for word in words:
-                    norm_word = normalize_word(word)
-                    if norm_word:  # Solo si queda algo después de normalizar
-                        if norm_word not in format_map:
-                            format_map[norm_word] = []
-                        format_map[norm_word].append(
-                            {"style": current_style, "original": word}
-                        )
-
-            # Procesar hijos recursivamente
-            for child in elem:
-                extract_words_with_format(child, current_style)
-
-                # Procesar tail (texto después del hijo)
-                if child.tail and current_style:
-                    words = child.tail.split()
-                    for word in words:
-                        norm_word = normalize_word(word)
-                        if norm_word:
-                            if norm_word not in format_map:
-                                format_map[norm_word] = []
-                            format_map[norm_word].append(
-                                {"style": current_style, "original": word}
-                            )
-
-        extract_words_with_format(element)
-        return format_map
-
-    def _rebuild_with_format_map(
-        self,
-        element,
-        segments: list,
-        format_map: dict,
-        token_styles_seq: Optional[list] = None,
-        original_segments: Optional[list] = None,
-    ):
+        for elem in _iter_preorder(element, self._skip):
+            if _local_name(elem.tag) in ("p", "h"):
+                segments = _extract_runs(elem)
+                self._paragraph_runs[elem] = segments
+                for runs in segments:
+                    text = "".join(run_text for run_text, _ in runs)
+                    if text.strip():
+                        texts.append(text)
+
+    def _process_paragraph(self, element, converter_func) -> bool:
         """
-        Reconstruye el párrafo con line-breaks Y formato aplicado según mapa.
+        Convierte un párrafo y, si cambió, normaliza sus spans, reutilizando
+        el resultado de párrafos idénticos anteriores del documento.
 
-        Args:
-            element: Elemento XML del párrafo
-            segments: Lista de segmentos de texto convertido
-            format_map: Mapa de palabra normalizada → estilo
-            token_styles_seq: (opcional) lista paralela a segments con listas de
-                              estilos por token (None donde no había estilo).
+        La firma de un párrafo son sus runs (con las anclas serializadas),
+        así que vale también entre párrafos de distinto estilo. La primera aparición se convierte
+        grabando sus conversiones (ver `DialogConverter.recording`); en las
+        siguientes no se convierte nada: se copia el contenido convertido y
+        se repite lo grabado, para que el log quede igual que sin la memoria.
+        Con una función de conversión sin grabación no hay memoria.
+
+        Returns:
+            True si el párrafo cambió
+        """
+        segments = self._paragraph_runs.pop(element, None)
+        if segments is None:
+            segments = _extract_runs(element)
+
+        converter = getattr(converter_func, "__self__", None)
+        if not hasattr(converter, "recording"):
+            return self._convert_and_coalesce(element, converter_func, segments)
+
+        key = _paragraph_key(segments)
+        memoized = self._paragraph_memo.get(key)
+        if memoized is not None:
+            entries, content = memoized
+            converter.replay(entries)
+            if content is None:
+                return False
+            text, children = content
+            del element[:]
+            element.text = text
+            element.extend(copy.deepcopy(child) for child in children)
+            return True
+
+        with converter.recording() as entries:
+            changed = self._convert_and_coalesce(element, converter_func, segments)
+        content = None
+        if changed:
+            content = (element.text, [copy.deepcopy(child) for child in element])
+        _remember(self._paragraph_memo, key, (entries, content))
+        return changed
+
+    def _convert_and_coalesce(self, element, converter_func, segments: list) -> bool:
+        """Convierte un párrafo y, si cambió, normaliza sus spans."""
+        changed = self._convert_paragraph(element, converter_func, segments)
+        # Solo se normalizan los spans de los párrafos reescritos: los demás
+        # quedan intactos (y, con splice, idénticos byte a byte)
+        if changed:
+            self._coalesce_spans(element)
+        return changed
+
+    def _convert_paragraph(self, element, converter_func, segments: list) -> bool:
         """
+        Convierte un párrafo sobre su modelo de runs (texto, estilo).
 
-        def normalize_word(word: str) -> str:
-            """Normaliza palabra para matching."""
-            # Quitar puntuación incluyendo TODAS las comillas (ASCII + tipográficas)
-            cleaned = re.sub(
-                r'[.,;:!?¿¡"\u2018\u2019\u201C\u201D\'—()\[\]{}]', "", word
-            )
-            return cleaned.lower().strip()
-
-        def get_word_style_from_map_consume(word: str) -> Optional[str]:
-            """Obtiene el estilo de una palabra desde el mapa y lo consume (pop).
-
-            Esto ayuda a aplicar estilos repetidos en orden de aparición en el
-            documento original, evitando que siempre se use la primera entrada.
-            """
-            norm_word = normalize_word(word)
-            if norm_word in format_map and format_map[norm_word]:
-                entry = format_map[norm_word].pop(0)
-                return entry.get("style")
-            return None
+        Cada tramo entre line-breaks se convierte por separado; el conversor
+        aplica sus reglas sobre los runs, de modo que el formato inline sigue
+        a los caracteres. Si ningún tramo cambia, el párrafo queda intacto.
 
-        # Guardar atributos del párrafo
-        attribs = element.attrib.copy()
+        Returns:
+            True si el párrafo cambió
+        """
+        convert_runs = _runs_converter(converter_func)
+        converted_segments = []
+        changed = False
+        for runs in segments:
+            if "".join(run_text for run_text, _ in runs).strip():
+                converted, _ = convert_runs(runs)
+                changed = changed or converted is not runs
+                converted_segments.append(converted)
+            else:
+                converted_segments.append(runs)
 
-        # Limpiar elemento
-        # Antes de limpiar el elemento, hacemos una copia NO consumible del
-        # format_map para que podamos tomar decisiones basadas en el mapa
-        # original (sin alterar) más abajo en heurísticas de corrección.
-        original_format_map = {
-            k: [entry.copy() for entry in v] for k, v in format_map.items()
-        }
+        if changed:
+            self._rebuild_from_runs(element, converted_segments)
+        return changed
 
+    def _rebuild_from_runs(self, element, segments: list):
+        """
+        Reescribe el contenido de un párrafo a partir de sus runs: un
+        `text:span` por run con estilo, texto suelto para los runs sin estilo,
+        las anclas en su lugar y un `text:line-break` entre tramos. Los runs
+        seguidos de unos mismos contenedores (enlaces, spans con atributos o
+        anidados) van en una copia de cada uno, anidadas como en el original.
+
+        El texto sin estilo que inserta el conversor y los line-breaks quedan
+        dentro de los contenedores comunes al run anterior y al siguiente,
+        así que ningún contenedor se abre dos veces (ni repite su `xml:id`).
+
+        Un `text:s` o `text:tab` se conserva tal cual donde queda su espacio
+        (una sola vez); si el conversor lo eliminó, desaparece, y si le
+        atribuyó otros caracteres, estos van como texto suelto.
+        """
+        tail = element.tail
+        attribs = element.attrib.copy()
         element.clear()
         element.attrib.update(attribs)
+        element.tail = tail
 
-        # Namespaces
-        ns_text = "{urn:oasis:names:tc:opendocument:xmlns:text:1.0}"
-        
-        # Sentinel for unknown style
-        UNSET = object()
-
-        # Procesar cada segmento
-        for seg_idx, segment_text in enumerate(segments):
+        # Runs del párrafo en orden, con None como line-break
+        items = []
+        for seg_idx, runs in enumerate(segments):
             if seg_idx > 0:
-                # Añadir line-break entre segmentos
-                # (se añade automáticamente al elemento)
-                ET.SubElement(element, f"{ns_text}line-break")
-
-            # Dividir el segmento en tokens (palabras y espacios)
-            words = self._split_preserving_spaces(segment_text)
-
-            # Separar puntuación inicial (comillas de apertura, rayas) de la
-            # palabra para evitar que un carácter de puntuación que llevaba
-            # el estilo en el documento original se propague al resto de la
-            # palabra cuando la tokenización cambia (p.ej. " → —).
-            expanded_words = []
-            punct_re = re.compile(
-                r'^([\"\u201C\u201E\u2018\u201B\u00AB\u00BB\u2018\u2019\u201D\'"«»—-]+)(.*)$'
-            )
-            for w in words:
-                m = punct_re.match(w)
-                if m and m.group(2):
-                    # Mantener los espacios/colas en la segunda parte
-                    expanded_words.append(m.group(1))
-                    expanded_words.append(m.group(2))
-                else:
-                    expanded_words.append(w)
-            words = expanded_words
-
-            # Determinar estilo por token: preferir estilos por token y, si la
-            # tokenización cambió entre original y convertido, usar un
-            # alineador para mapear estilos desde tokens originales a tokens
-            # convertidos. Si aún así no hay estilo, caer al format_map.
-            ts_for_segment = None
-            if token_styles_seq and seg_idx < len(token_styles_seq):
-                ts_for_segment = token_styles_seq[seg_idx]
-
-            # Obtener estilos iniciales para los tokens convertidos
-            if (
-                ts_for_segment is not None
-                and original_segments
-                and seg_idx < len(original_segments)
-            ):
-                # Alinear tokens: tomar tokens del segmento original
-                orig_seg_text = original_segments[seg_idx]
-                orig_tokens = self._split_preserving_spaces(orig_seg_text)
-                converted_tokens = words
-                styles_for_tokens = self._align_token_styles(
-                    orig_tokens, ts_for_segment, converted_tokens, unset_value=UNSET
-                )
-            elif ts_for_segment is not None:
-                # Sin segmentos originales, intentar usar estilos por índice
-                styles_for_tokens = [
-                    ts_for_segment[i] if i < len(ts_for_segment) else UNSET
-                    for i in range(len(words))
-                ]
+                items.append(None)
+            items.extend(runs)
+
+        # Contenedores de cada elemento: los de su estilo o, para el texto
+        # sin estilo y los line-breaks, los comunes a sus vecinos con estilo
+        chains = [None] * len(items)
+        following = []
+        for idx in range(len(items) - 1, -1, -1):
+            chains[idx] = following
+            item = items[idx]
+            if item is not None and item[1] is not None:
+                following = _wrappers(item[1])
+        previous = []
+        for idx, item in enumerate(items):
+            if item is not None and item[1] is not None:
+                chains[idx] = previous = _wrappers(item[1])
             else:
-                styles_for_tokens = [UNSET for _ in range(len(words))]
-
-            # Para tokens, aplicar FORCED NORMALIZATION para marcadores de diálogo
-            # y luego, si no hay estilo asignado,
-            # intentar consumir del mapa por palabra.
-            for i, token in enumerate(words):
-                token_stripped = token.strip()
-
-                # Si no se asignó estilo aún, intentar consumir del mapa por palabra
-                # Intentamos esto antes de la "forced normalization" que limpia
-                # estilos en tokens seguidores de una raya. De esta forma, si
-                # la palabra realmente tenía estilo en el original (mapa), lo
-                # conservamos, evitando quitarlo por error (caso "Uno studio...").
-                if styles_for_tokens[i] is UNSET:
-                    if token_stripped:
-                        styles_for_tokens[i] = get_word_style_from_map_consume(
-                            token_stripped
-                        )
-                    else:
-                        styles_for_tokens[i] = None
-
-                # FORCED NORMALIZATION: if the previous token is a dash/hyphen
-                # (we split leading punctuation earlier), then this token is
-                # likely the speaker label (e.g. "Me") and we should not
-                # apply the previous span's formatting to it either. Only clear
-                # the style if we still don't have one (map or alignment).
-                prev_stripped = words[i - 1].strip() if i > 0 else None
-                if prev_stripped and (
-                    prev_stripped.startswith("—") or prev_stripped.startswith("-")
-                ):
-                    if styles_for_tokens[i] is UNSET or styles_for_tokens[i] is None:
-                        # leave as None (explicit) and continue
-                        # Ensure it's None and not UNSET for final processing
-                        styles_for_tokens[i] = None
-                        continue
+                common = 0
+                for outer, inner in zip(previous, chains[idx]):
+                    if outer is not inner:
+                        break
+                    common += 1
+                chains[idx] = previous[:common]
+
+        # Último hijo de cada contenedor (el párrafo o una copia)
+        last = {element: None}
+        # (contenedor original, copia) abiertos, del más externo al interno
+        opened = []
+        placed = set()
+
+        def append(parent, child):
+            child.tail = None
+            parent.append(child)
+            last[parent] = child
+
+        for item, chain in zip(items, chains):
+            common = 0
+            for (wrapper, _), target in zip(opened, chain):
+                if wrapper is not target:
+                    break
+                common += 1
+            del opened[common:]
+            for wrapper in chain[common:]:
+                copy_ = ET.Element(wrapper.tag, wrapper.attrib)
+                append(opened[-1][1] if opened else element, copy_)
+                last[copy_] = None
+                opened.append((wrapper, copy_))
+            parent = opened[-1][1] if opened else element
+
+            if item is None:
+                append(parent, ET.Element(f"{_TEXT_NS}line-break"))
+                continue
 
-                # FORCED NORMALIZATION: si el token empieza con raya (—) o guion (-),
-                # no aplicar formato inline bajo ninguna circunstancia.
-                if token_stripped and (
-                    token_stripped.startswith("—") or token_stripped.startswith("-")
-                ):
-                    if styles_for_tokens[i] is UNSET or styles_for_tokens[i] is None:
-                         styles_for_tokens[i] = None
-                         continue
-
-            # Agrupar tokens consecutivos con el mismo estilo
-            groups = []
-            current_group_style = None
-            current_group_tokens = []
-
-            # Heurística adicional: si un token quedó sin estilo y está
-            # inmediatamente después de una raya/guion, pero el token
-            # siguiente sí tiene estilo, heredamos ese estilo. Esto ayuda
-            # a preservar casos como "—Uno studio sui draghi" donde el
-            # original tenía la frase completa en un mismo span.
-            for idx in range(len(words)):
-                prev_str = words[idx - 1].strip() if idx > 0 else None
-                if (
-                    styles_for_tokens[idx] is None
-                    and prev_str
-                    and (prev_str.startswith("—") or prev_str.startswith("-"))
-                ):
-                    # Buscar adelante el primer token con estilo no-None en una
-                    # ventana pequeña. Si lo encontramos, heredamos ese estilo.
-                    found = None
-                    for j in range(idx + 1, min(len(words), idx + 7)):
-                        if styles_for_tokens[j] is not None:
-                            found = styles_for_tokens[j]
-                            break
-                    if found:
-                        styles_for_tokens[idx] = found
-
-            # Heurística de corrección: en algunos casos el alineador puede
-            # asignar un estilo distinto al token inmediatamente después de
-            # una puntuación transformada (p.ej. comilla → raya). Si vemos
-            # que el token siguiente tiene estilo Y y el token actual tiene
-            # estilo X distinto, pero en el mapa original la palabra
-            # normalizada del token actual aparece asociada a Y, corregimos
-            # el estilo del token actual para coincidir con el siguiente.
-            def normalize_word_lookup(w: str) -> str:
-                cleaned = re.sub(
-                    r'[.,;:!?¿¡"\u2018\u2019\u201C\u201D\'"—()\[\]{}]',
-                    "",
-                    w,
-                )
-                return cleaned.lower().strip()
-
-            for idx in range(len(words) - 1):
-                prev_str = words[idx - 1].strip() if idx > 0 else None
-                if prev_str and (prev_str.startswith("—") or prev_str.startswith("-")):
-                    cur_style = styles_for_tokens[idx]
-                    next_style = styles_for_tokens[idx + 1]
-                    if cur_style != next_style and next_style is not None:
-                        # comprobar en el mapa original si la entrada normalizada
-                        # del token actual tenía el estilo next_style
-                        norm = normalize_word_lookup(words[idx])
-                        if norm and norm in original_format_map:
-                            styles_list = [
-                                e["style"] for e in original_format_map[norm]
-                            ]
-                            if next_style in styles_list:
-                                styles_for_tokens[idx] = next_style
-
-            for token, style in zip(words, styles_for_tokens):
-                if style == current_group_style:
-                    current_group_tokens.append(token)
-                else:
-                    if current_group_tokens:
-                        groups.append(
-                            (current_group_style, "".join(current_group_tokens))
-                        )
-                    current_group_style = style
-                    current_group_tokens = [token]
-
-            if current_group_tokens:
-                groups.append((current_group_style, "".join(current_group_tokens)))
-
-            # Crear spans para cada grupo
-            for group_idx, (style, text_content) in enumerate(groups):
-                if seg_idx == 0 and group_idx == 0:
-                    # Primer texto del párrafo
-                    if style:
-                        span = ET.SubElement(element, f"{ns_text}span")
-                        span.attrib[f"{ns_text}style-name"] = style
-                        span.text = text_content
-                    else:
-                        element.text = text_content
-                else:
-                    # Resto del contenido
-                    if style:
-                        span = ET.SubElement(element, f"{ns_text}span")
-                        span.attrib[f"{ns_text}style-name"] = style
-                        span.text = text_content
+            text, style = item
+            leaf = _leaf_style(style)
+            if isinstance(leaf, str):
+                span = ET.Element(f"{_TEXT_NS}span", {_TEXT_STYLE_NAME: leaf})
+                span.text = text
+                append(parent, span)
+            elif leaf is None:
+                _append_text(parent, last[parent], text)
+            elif not text:
+                append(parent, leaf)
+            else:
+                for piece in re.split(r"(\s+)", text):
+                    if piece.isspace():
+                        if id(leaf) not in placed:
+                            placed.add(id(leaf))
+                            append(parent, leaf)
                     else:
-                        # Texto sin estilo - añadir al tail del último elemento
-                        if len(element) > 0:
-                            last_elem = element[-1]
-                            if last_elem.tail:
-                                last_elem.tail += text_content
-                            else:
-                                last_elem.tail = text_content
-                        else:
-                            if element.text:
-                                element.text += text_content
-                            else:
-                                element.text = text_content
+                        _append_text(parent, last[parent], piece)
 
-    def _apply_text_changes_inplace(self, element, originals: list, converted: list):
-        """
-        Aplica cambios de texto preservando estructura.
+    def _reset_paragraph_memo(self):
+        self._paragraph_memo.clear()
 
-        NOTA: Por ahora usa el método de reconstrucción que pierde formato inline
-        en párrafos con line-breaks. Es una limitación conocida que se mejorará
-        en futuras versiones.
+    def _reset_style_properties(self):
         """
-        # Usar el método que funciona (aunque pierde formato inline)
-        self._rebuild_with_line_breaks(element, converted)
-
-    def _extract_text_segments(self, element) -> list:
-        """Extrae segmentos de texto separados por line-breaks."""
-        segments = []
-        current_segment = []
+        Vacía el mapa de propiedades de estilos, que `_register_style` va
+        llenando: `self._style_props` guarda style-name ->
+        { 'italic': bool, 'bold': bool, 'key': firma, 'parent': nombre },
+        `self._canonical_style_for` el primer estilo italic / bold y
+        `self._equivalent_style` el estilo de texto equivalente de cada uno
+        (ver `_coalesce_spans`).
+        """
+        self._style_props = {}
+        self._canonical_style_for = {"italic": None, "bold": None}
+        # Firma de propiedades -> primer estilo de texto registrado con ella
+        self._style_by_key = {}
+        # Estilo de texto -> estilo equivalente a usar (None: sin formato)
+        self._equivalent_style = {}
+
+    def _register_style(self, elem):
+        """Añade al mapa de propiedades un elemento de estilo (si lo es)."""
+        # tag completo como '{ns}style'
+        if not (isinstance(elem.tag, str) and elem.tag.endswith("}style")):
+            return
 
-        # Función recursiva para extraer
-        def extract_from_element(elem):
-            if elem.text:
-                current_segment.append(elem.text)
+        # Obtener el nombre del estilo
+        style_name = None
+        for k, v in elem.attrib.items():
+            if k.endswith("}name") or k == "name" or k.endswith(":name"):
+                style_name = v
+                break
 
-            for child in elem:
-                child_tag = child.tag.split("}")[-1] if "}" in child.tag else child.tag
-
-                if child_tag == "line-break":
-                    # Guardar segmento actual y empezar uno nuevo
-                    segments.append("".join(current_segment))
-                    current_segment.clear()
-                    if child.tail:
-                        current_segment.append(child.tail)
-                else:
-                    # Seguir acumulando texto
-                    extract_from_element(child)
-                    if child.tail:
-                        current_segment.append(child.tail)
+        if not style_name:
+            return
 
-        extract_from_element(element)
+        # Buscar child text:properties dentro de este style
+        italic = False
+        bold = False
+        for child in elem:
+            # child tag localname
+            local = child.tag.split("}")[-1] if "}" in child.tag else child.tag
+            if local == "text-properties":
+                # Revisar atributos fo:font-style y fo:font-weight
+                for ak, av in child.attrib.items():
+                    if ak.endswith("}font-style") and av == "italic":
+                        italic = True
+                    if ak.endswith("}font-weight") and av in ("bold", "700"):
+                        bold = True
+
+        key = _style_key(elem)
+        self._style_props[style_name] = {
+            "italic": italic,
+            "bold": bold,
+            "key": key,
+            "parent": elem.get(_STYLE_PARENT),
+        }
 
-        # Guardar último segmento
-        if current_segment:
-            segments.append("".join(current_segment))
+        if italic and not self._canonical_style_for["italic"]:
+            self._canonical_style_for["italic"] = style_name
+        if bold and not self._canonical_style_for["bold"]:
+            self._canonical_style_for["bold"] = style_name
+
+        # Estilos de texto automáticos equivalentes (mismas propiedades salvo
+        # officeooo:rsid): todos se reemplazan por el primero; uno sin
+        # ninguna propiedad equivale a no tener span
+        if elem.get(_STYLE_FAMILY) == "text":
+            if key == _EMPTY_TEXT_STYLE_KEY:
+                self._equivalent_style[style_name] = None
+            else:
+                canonical = self._style_by_key.setdefault(key, style_name)
+                self._equivalent_style[style_name] = canonical
 
-        return segments
+    def _coalesce_spans(self, element):
+        """
+        Normaliza los spans de un párrafo: cada `text:span` pasa a usar el
+        estilo equivalente canónico, los que quedan sin formato se disuelven
+        en el texto del párrafo y los adyacentes con el mismo estilo (sin
+        texto entre ellos) se funden en uno.
 
-    def _rebuild_with_line_breaks(self, element, segments: list):
-        """Reconstruye el párrafo con line-breaks entre segmentos."""
-        # Guardar atributos
-        attribs = element.attrib.copy()
+        Returns:
+            True si el párrafo cambió
+        """
+        changed = False
+        prev = None
+        idx = 0
+        while idx < len(element):
+            child = element[idx]
+            if not _is_plain_span(child):
+                prev = None
+                idx += 1
+                continue
 
-        # Limpiar elemento
-        element.clear()
-        element.attrib.update(attribs)
+            style = child.get(_TEXT_STYLE_NAME)
+            style = self._equivalent_style.get(style, style)
+            if style is None:
+                _unwrap(element, idx)
+                changed = True
+                prev = None
+                continue
+            if style != child.get(_TEXT_STYLE_NAME):
+                child.set(_TEXT_STYLE_NAME, style)
+                changed = True
 
-        # Namespace para line-break
-        ns_text = "{urn:oasis:names:tc:opendocument:xmlns:text:1.0}"
+            if (
+                prev is not None
+                and not prev.tail
+                and prev.get(_TEXT_STYLE_NAME) == style
+            ):
+                _merge_into(prev, child)
+                element.remove(child)
+                changed = True
+                continue
 
-        # Reconstruir con line-breaks
-        if segments:
-            element.text = segments[0]
+            prev = child
+            idx += 1
+        return changed
 
-            for i in range(1, len(segments)):
-                # Añadir line-break
-                lb = ET.SubElement(element, f"{ns_text}line-break")
-                lb.tail = segments[i]
+    def _drop_folded_styles(self, root, referenced: set):
+        """
+        Quita de automatic-styles los estilos de texto reemplazados por un
+        equivalente que ya no se referencian en ninguna parte del documento
+        (`referenced`, reunido al convertir, regiones excluidas incluidas).
+
+        Solo en modo árbol (también con workers): en flujo automatic-styles
+        ya se escribió cuando se conocen las referencias, y con splice se
+        copia tal cual. Los párrafos que el conversor no cambió conservan sus
+        spans (ver `_process_paragraph`), así que sus estilos siguen
+        referenciados.
+        """
+        for styles in root.iter(f"{_OFFICE_NS}automatic-styles"):
+            for style in list(styles):
+                name = style.get(_STYLE_NAME)
+                if (
+                    name in self._equivalent_style
+                    and self._equivalent_style[name] != name
+                    and name not in referenced
+                ):
+                    styles.remove(style)
 
 
 class ODTReader:
@@ -937,7 +1810,25 @@ class ODTReader:
         Extrae el texto del archivo ODT.
 
         Returns:
-            Texto completo del documento
+            Texto completo del documento (un párrafo por línea)
+
+        Raises:
+            ValueError: Si el archivo no es un ODT válido
+        """
+        return "\n".join(self.iter_paragraphs())
+
+    def iter_paragraphs(self) -> Iterator[str]:
+        """
+        Recorre los párrafos y encabezados no vacíos del documento, en orden.
+
+        Lee content.xml en flujo (iterparse): cada párrafo se descarta en
+        cuanto se entrega, así que la memoria no depende de la longitud del
+        documento. Los line-breaks internos se entregan como \\n; los
+        párrafos anidados (p. ej. en notas) se entregan además por separado,
+        después del que los contiene.
+
+        Yields:
+            Texto de cada párrafo
 
         Raises:
             ValueError: Si el archivo no es un ODT válido
@@ -950,52 +1841,50 @@ class ODTReader:
                         f"{self.filepath} no parece ser un archivo ODT válido"
                     )
 
-                # Leer el XML
-                content_xml = odt_zip.read("content.xml")
-
-                # Parsear XML
-                root = ET.fromstring(content_xml)
-
-                # Extraer texto
-                text_parts = []
-                self._extract_text_recursive(root, text_parts)
-
-                return "\n".join(text_parts)
+                with odt_zip.open("content.xml") as content:
+                    # Elementos abiertos; los párrafos se procesan completos
+                    stack = []
+                    unit_depth = 0
+                    for event, elem in ET.iterparse(content, events=("start", "end")):
+                        if event == "start":
+                            if unit_depth:
+                                unit_depth += 1
+                            elif _local_name(elem.tag) in ("p", "h"):
+                                unit_depth = 1
+                            else:
+                                stack.append(elem)
+                            continue
+
+                        if not unit_depth:
+                            stack.pop()
+                            if stack:
+                                stack[-1].remove(elem)
+                            continue
+
+                        unit_depth -= 1
+                        if unit_depth:
+                            continue
+
+                        for node in _iter_preorder(elem):
+                            if _local_name(node.tag) in ("p", "h"):
+                                para_text = self._get_paragraph_text(node)
+                                if para_text.strip():
+                                    yield para_text
+                        if stack:
+                            stack[-1].remove(elem)
 
         except zipfile.BadZipFile:
             raise ValueError(f"{self.filepath} no es un archivo ZIP válido")
 
-    def _extract_text_recursive(self, element, text_parts: list):
-        """
-        Extrae texto recursivamente del XML.
-
-        Args:
-            element: Elemento XML
-            text_parts: Lista para acumular partes de texto
-        """
-        # Obtener el tag sin namespace
-        tag = element.tag.split("}")[-1] if "}" in element.tag else element.tag
-
-        # Si es un párrafo, añadir su texto
-        if tag == "p":
-            para_text = self._get_paragraph_text(element)
-            if para_text.strip():
-                text_parts.append(para_text)
-
-        # Si es un encabezado
-        elif tag == "h":
-            heading_text = self._get_paragraph_text(element)
-            if heading_text.strip():
-                text_parts.append(heading_text)
-
-        # Procesar hijos recursivamente
-        for child in element:
-            self._extract_text_recursive(child, text_parts)
-
     def _get_paragraph_text(self, element) -> str:
         """
-        Obtiene el texto de un párrafo, incluyendo spans y otros elementos inline.
-        PRESERVA line-breaks internos como saltos de línea (recursivamente).
+        Obtiene el texto de un párrafo, incluyendo spans y otros elementos
+        inline (también el texto de las notas). Los line-breaks internos se
+        convierten en saltos de línea; `text:s` y `text:tab` no aportan
+        texto. Recorre el párrafo con una pila explícita, sin recursión.
+
+        No es el texto que ve el conversor (`_paragraph_text`): se mantiene
+        el de siempre para quien ya lee archivos con `extract_text`.
 
         Args:
             element: Elemento de párrafo
@@ -1003,33 +1892,24 @@ class ODTReader:
         Returns:
             Texto del párrafo con line-breaks convertidos a \n
         """
-
-        def extract_text_recursive(elem):
-            """Extrae texto recursivamente preservando line-breaks."""
-            parts = []
-
-            # Texto directo del elemento
-            if elem.text:
-                parts.append(elem.text)
-
-            # Procesar hijos
-            for child in elem:
-                child_tag = child.tag.split("}")[-1] if "}" in child.tag else child.tag
-
-                # Si es line-break, agregar salto de línea
-                if child_tag == "line-break":
-                    parts.append("\n")
-                else:
-                    # Recursivo para procesar spans que pueden contener line-breaks
-                    parts.extend(extract_text_recursive(child))
-
-                # Texto después del elemento (tail)
+        parts = []
+        # Nodos por visitar y colas de texto pendientes, en orden inverso
+        stack = [element]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                parts.append(item)
+                continue
+            if item is not element and _local_name(item.tag) == "line-break":
+                parts.append("\n")
+                continue
+            if item.text:
+                parts.append(item.text)
+            for child in reversed(item):
                 if child.tail:
-                    parts.append(child.tail)
-
-            return parts
-
-        return "".join(extract_text_recursive(element))
+                    stack.append(child.tail)
+                stack.append(child)
+        return "".join(parts)
 
 
 class ODTWriter:
@@ -1044,12 +1924,41 @@ class ODTWriter:
         """
         self.filepath = filepath
 
+    # content.xml: antes y después de los párrafos
+    CONTENT_HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<office:document-content xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0"
+                         xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0"
+                         xmlns:style="urn:oasis:names:tc:opendocument:xmlns:style:1.0">
+  <office:automatic-styles>
+    <style:style style:name="Standard" style:family="paragraph"/>
+  </office:automatic-styles>
+  <office:body>
+    <office:text>
+"""
+    CONTENT_FOOTER = """
+    </office:text>
+  </office:body>
+</office:document-content>"""
+
     def write_text(self, text: str):
         """
         Escribe texto a un archivo ODT.
 
         Args:
-            text: Texto a escribir
+            text: Texto a escribir (un párrafo por línea)
+        """
+        self.write_paragraphs(text.split("\n"))
+
+    def write_paragraphs(self, paragraphs: Iterable[str]):
+        """
+        Escribe un ODT con un párrafo por cada texto recibido.
+
+        Los párrafos se escriben en flujo en la entrada content.xml del ZIP:
+        admite cualquier iterable (p. ej. un generador que lee un archivo
+        línea a línea) sin cargar el documento entero en memoria.
+
+        Args:
+            paragraphs: Textos de los párrafos, en orden
         """
         # Template mínimo de ODT
         mimetype = "application/vnd.oasis.opendocument.text"
@@ -1081,28 +1990,6 @@ class ODTWriter:
   <office:master-styles/>
 </office:document-styles>"""
 
-        # content.xml con el texto
-        paragraphs = []
-        for line in text.split("\n"):
-            escaped_line = self._escape_xml(line)
-            paragraphs.append(
-                f'    <text:p text:style-name="Standard">{escaped_line}</text:p>'
-            )
-
-        content = f"""<?xml version="1.0" encoding="UTF-8"?>
-<office:document-content xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0"
-                         xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0"
-                         xmlns:style="urn:oasis:names:tc:opendocument:xmlns:style:1.0">
-  <office:automatic-styles>
-    <style:style style:name="Standard" style:family="paragraph"/>
-  </office:automatic-styles>
-  <office:body>
-    <office:text>
-{chr(10).join(paragraphs)}
-    </office:text>
-  </office:body>
-</office:document-content>"""
-
         # Crear archivo ZIP (ODT)
         with zipfile.ZipFile(self.filepath, "w", zipfile.ZIP_DEFLATED) as odt_zip:
             # mimetype debe ser el primer archivo, sin comprimir
@@ -1114,7 +2001,21 @@ class ODTWriter:
             # Añadir archivos XML
             odt_zip.writestr("meta.xml", meta)
             odt_zip.writestr("styles.xml", styles)
-            odt_zip.writestr("content.xml", content)
+
+            # content.xml con el texto, escrito en flujo
+            with odt_zip.open("content.xml", "w") as raw_out:
+                out = io.TextIOWrapper(raw_out, encoding="utf-8")
+                out.write(self.CONTENT_HEADER)
+                for idx, paragraph in enumerate(paragraphs):
+                    if idx:
+                        out.write("\n")
+                    escaped_line = self._escape_xml(paragraph)
+                    out.write(
+                        f'    <text:p text:style-name="Standard">{escaped_line}</text:p>'
+                    )
+                out.write(self.CONTENT_FOOTER)
+                out.flush()
+                out.detach()
 
     def _escape_xml(self, text: str) -> str:
         """
@@ -1137,7 +2038,7 @@ class ODTWriter:
 
 def is_odt_file(filepath: Path) -> bool:
     """
-    Verifica si un archivo es ODT.
+    Verifica si un archivo es ODT (comprimido o Flat ODT).
 
     Args:
         filepath: Ruta del archivo
@@ -1148,6 +2049,9 @@ def is_odt_file(filepath: Path) -> bool:
     if not filepath.exists():
         return False
 
+    if filepath.suffix.lower() == ".fodt":
+        return is_flat_odt_file(filepath)
+
     # Verificar extensión
     if filepath.suffix.lower() != ".odt":
         return False
@@ -1158,3 +2062,25 @@ def is_odt_file(filepath: Path) -> bool:
             return "content.xml" in z.namelist()
     except Exception:
         return False
+
+
+def is_flat_odt_file(filepath: Path) -> bool:
+    """
+    Verifica si un archivo es Flat ODT (.fodt): un único XML cuya raíz es
+    `office:document`.
+
+    Args:
+        filepath: Ruta del archivo
+
+    Returns:
+        True si es Flat ODT
+    """
+    if not filepath.exists() or filepath.suffix.lower() != ".fodt":
+        return False
+
+    try:
+        with open(filepath, "rb") as f:
+            head = f.read(4096)
+    except OSError:
+        return False
+    return re.search(rb"<office:document[\s>]", head) is not None
@@ -0,0 +1,337 @@
+"""
+Módulo de parches: en lugar de una copia convertida del documento (y su
+respaldo `_original`) se guarda solo lo que cambia, y `apply_patch` lo
+reproduce sobre el original.
+
+- TXT, Markdown y HTML: diff unificado, línea a línea.
+- ODT / Flat ODT: parche XML por párrafo. Cada párrafo que cambia se guarda
+  con su posición (bytes) en content.xml, su XML original y el convertido
+  (en base64, para que el parser no normalice sus finales de línea);
+  aplicarlo da exactamente el mismo content.xml que `--splice`.
+"""
+
+import base64
+import difflib
+import hashlib
+import itertools
+import os
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Optional
+
+from .markup_handler import MarkupProcessor, is_markup_file
+from .odt_handler import (
+    ODTProcessor,
+    copy_raw_entry,
+    is_odt_file,
+    open_compressed_entry,
+)
+
+# Elemento raíz de un parche de ODT
+ODT_PATCH_ROOT = "odt-patch"
+
+_HUNK_RE = re.compile(r"@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+_NO_NEWLINE = "\\ No newline at end of file\n"
+
+
+def patch_path_for(input_path: Path, output_dir: Path) -> Path:
+    """Ruta del parche de un documento: `<nombre>.patch` o `.patch.xml` (ODT)."""
+    suffix = ".patch.xml" if _is_odt_like(input_path) else ".patch"
+    return output_dir / f"{input_path.name}{suffix}"
+
+
+def _is_odt_like(filepath: Path) -> bool:
+    return filepath.suffix.lower() in (".odt", ".fodt")
+
+
+def _split_lines(text: str) -> list:
+    """Líneas con su final (solo '\\n' separa; '\\r' queda en la línea)."""
+    return re.findall(r"[^\n]*\n|[^\n]+", text)
+
+
+def make_text_patch(original: str, converted: str, name: str) -> str:
+    """
+    Diff unificado entre dos textos.
+
+    Las cabeceras (a/nombre, b/nombre) se escriben aunque los textos sean
+    iguales: así el parche sin bloques sigue indicando su documento.
+
+    Args:
+        original: Texto original
+        converted: Texto convertido
+        name: Nombre del archivo para las cabeceras
+    """
+    parts = [f"--- a/{name}\n", f"+++ b/{name}\n"]
+    diff = difflib.unified_diff(_split_lines(original), _split_lines(converted))
+    for line in itertools.islice(diff, 2, None):
+        if line.endswith("\n"):
+            parts.append(line)
+        else:
+            parts.append(line + "\n")
+            parts.append(_NO_NEWLINE)
+    return "".join(parts)
+
+
+def apply_text_patch(original: str, patch: str) -> str:
+    """
+    Aplica un diff unificado a un texto.
+
+    El contexto y las líneas eliminadas de cada bloque deben coincidir
+    exactamente en la posición indicada.
+
+    Raises:
+        ValueError: Si el parche está mal formado o no corresponde al texto
+    """
+    lines = _split_lines(original)
+    patch_lines = _split_lines(patch)
+    result = []
+    pos = 0
+    idx = 0
+    while idx < len(patch_lines) and not patch_lines[idx].startswith("@@"):
+        idx += 1
+
+    while idx < len(patch_lines):
+        match = _HUNK_RE.match(patch_lines[idx])
+        if match is None:
+            raise ValueError(f"Bloque de diff inválido: {patch_lines[idx]!r}")
+        start = int(match.group(1))
+        # Con 0 líneas, la posición es la de la línea anterior
+        start = start if match.group(2) == "0" else start - 1
+        if start < pos:
+            raise ValueError("Bloques de diff desordenados")
+        result.extend(lines[pos:start])
+        pos = start
+
+        # Líneas del bloque; "\ No newline" quita el salto de la anterior
+        hunk = []
+        idx += 1
+        while idx < len(patch_lines) and not patch_lines[idx].startswith("@@"):
+            line = patch_lines[idx]
+            if line.startswith("\\"):
+                if hunk and hunk[-1][1].endswith("\n"):
+                    tag, content = hunk[-1]
+                    hunk[-1] = (tag, content[:-1])
+            elif line[:1] in (" ", "-", "+"):
+                hunk.append((line[0], line[1:]))
+            else:
+                raise ValueError(f"Línea de diff inválida: {line!r}")
+            idx += 1
+
+        for tag, content in hunk:
+            if tag in (" ", "-"):
+                if pos >= len(lines) or lines[pos] != content:
+                    raise ValueError(f"El parche no coincide en la línea {pos + 1}")
+                pos += 1
+            if tag in (" ", "+"):
+                result.append(content)
+
+    result.extend(lines[pos:])
+    return "".join(result)
+
+
+def save_text_patch(
+    input_path: Path, patch_path: Path, original: str, converted: str
+) -> int:
+    """
+    Guarda el diff unificado de un documento de texto.
+
+    Returns:
+        Número de bloques del diff
+    """
+    patch = make_text_patch(original, converted, input_path.name)
+    with open(patch_path, "w", encoding="utf-8", newline="") as f:
+        f.write(patch)
+    return len(_HUNK_RE.findall(patch))
+
+
+def save_odt_patch(
+    processor: ODTProcessor, patch_path: Path, text_converter_func
+) -> int:
+    """
+    Convierte un ODT (como `--splice`) y guarda solo sus párrafos cambiados.
+
+    El parche registra el nombre del documento, la entrada que modifica
+    (content.xml; ninguna en un Flat ODT) y el SHA-256 de su XML original,
+    que `apply_patch` comprueba antes de aplicarlo.
+
+    Returns:
+        Número de párrafos (unidades) cambiados
+    """
+    content_xml = processor.read_content()
+    root = ET.Element(
+        ODT_PATCH_ROOT,
+        {
+            "source": processor.filepath.name,
+            "sha256": hashlib.sha256(content_xml).hexdigest(),
+        },
+    )
+    if not processor.flat:
+        root.set("entry", "content.xml")
+    root.text = "\n"
+
+    count = 0
+    for begin, stop, unit_xml in processor.iter_content_changes(
+        content_xml, text_converter_func
+    ):
+        change = ET.SubElement(root, "replace", {"begin": str(begin), "end": str(stop)})
+        original = ET.SubElement(change, "original", {"encoding": "base64"})
+        original.text = base64.b64encode(content_xml[begin:stop]).decode("ascii")
+        converted = ET.SubElement(change, "converted", {"encoding": "base64"})
+        converted.text = base64.b64encode(unit_xml.encode("utf-8")).decode("ascii")
+        change.text = "\n  "
+        original.tail = "\n  "
+        converted.tail = "\n"
+        change.tail = "\n"
+        count += 1
+
+    ET.ElementTree(root).write(patch_path, encoding="utf-8", xml_declaration=True)
+    return count
+
+
+def apply_patch(
+    patch_path: Path, target: Optional[Path] = None, output: Optional[Path] = None
+) -> Path:
+    """
+    Aplica un parche de `save_text_patch` o `save_odt_patch`.
+
+    Args:
+        patch_path: Archivo del parche
+        target: Documento original (default: el nombrado en el parche, en la
+            carpeta del parche)
+        output: Ruta del resultado (default: se reescribe `target`)
+
+    Returns:
+        Ruta del documento resultante
+
+    Raises:
+        ValueError: Si el parche no corresponde al documento
+    """
+    with open(patch_path, "r", encoding="utf-8", newline="") as f:
+        patch = f.read()
+
+    if patch.lstrip().startswith("<"):
+        root = ET.fromstring(patch.encode("utf-8"))
+        if root.tag != ODT_PATCH_ROOT:
+            raise ValueError(f"{patch_path} no es un parche de ODT")
+        target = target or patch_path.parent / root.get("source")
+        output = output or target
+        _write_atomically(output, lambda path: _apply_odt_patch(root, target, path))
+        return output
+
+    if target is None:
+        header = re.search(r"^--- a/(.+)$", patch, re.MULTILINE)
+        if header is None:
+            raise ValueError(f"{patch_path} no indica el documento al que se aplica")
+        target = patch_path.parent / header.group(1).rstrip("\r")
+    output = output or target
+    with open(target, "r", encoding="utf-8", newline="") as f:
+        result = apply_text_patch(f.read(), patch)
+
+    def write(path: Path):
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write(result)
+
+    _write_atomically(output, write)
+    return output
+
+
+def _payload(change, tag: str) -> bytes:
+    """Bytes de `<original>` o `<converted>` (base64, o texto en parches antiguos)."""
+    elem = change.find(tag)
+    if elem is None:
+        return b""
+    if elem.get("encoding") == "base64":
+        return base64.b64decode(elem.text or "")
+    return (elem.text or "").encode("utf-8")
+
+
+def _apply_odt_patch(root, target: Path, output: Path):
+    """Escribe en `output` el ODT `target` con los párrafos del parche."""
+    entry = root.get("entry")
+    if entry is None:
+        content_xml = target.read_bytes()
+    else:
+        with zipfile.ZipFile(target, "r") as odt_zip:
+            content_xml = odt_zip.read(entry)
+    if hashlib.sha256(content_xml).hexdigest() != root.get("sha256"):
+        raise ValueError(f"{target} cambió desde que se generó el parche")
+
+    parts = []
+    copied = 0
+    for change in root.iter("replace"):
+        begin, stop = int(change.get("begin")), int(change.get("end"))
+        if begin < copied or content_xml[begin:stop] != _payload(change, "original"):
+            raise ValueError(f"El parche no coincide en el byte {begin}")
+        parts.append(content_xml[copied:begin])
+        parts.append(_payload(change, "converted"))
+        copied = stop
+    parts.append(content_xml[copied:])
+    patched = b"".join(parts)
+
+    if entry is None:
+        output.write_bytes(patched)
+        return
+
+    with zipfile.ZipFile(target, "r") as input_zip, open(target, "rb") as raw_input:
+        with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as output_zip:
+            for info in input_zip.infolist():
+                if info.filename != entry:
+                    copy_raw_entry(raw_input, output_zip, info)
+                    continue
+                with open_compressed_entry(output_zip, info) as out:
+                    out.write(patched)
+
+
+def _write_atomically(output: Path, write):
+    """Escribe con `write(ruta)` en un temporal y lo mueve a `output`."""
+    tmp_path = output.with_name(f".{output.name}.tmp")
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, output)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def save_patch(
+    input_path: Path,
+    patch_path: Path,
+    text_converter_func,
+    odt_options: Optional[dict] = None,
+) -> int:
+    """
+    Convierte un documento y guarda solo su parche (ver el docstring del
+    módulo). Admite TXT, Markdown, HTML, ODT y Flat ODT.
+
+    Args:
+        input_path: Documento a convertir (no se modifica)
+        patch_path: Ruta del parche
+        text_converter_func: Función que convierte el texto. Recibe str y
+            retorna tuple[str, logger]
+        odt_options: Opciones de `ODTProcessor` (para ODT)
+
+    Returns:
+        Número de bloques (texto) o párrafos (ODT) cambiados
+
+    Raises:
+        ValueError: Si el formato no admite parches
+    """
+    if is_odt_file(input_path):
+        processor = ODTProcessor(input_path, **(odt_options or {}))
+        return save_odt_patch(processor, patch_path, text_converter_func)
+
+    if is_markup_file(input_path):
+        original, converted = MarkupProcessor(input_path).convert_text(
+            text_converter_func
+        )
+    elif input_path.suffix.lower() in (".docx", ".epub"):
+        raise ValueError(
+            f"{input_path.name}: el modo parche admite TXT, Markdown, HTML y ODT"
+        )
+    else:
+        with open(input_path, "r", encoding="utf-8", newline="") as f:
+            original = f.read()
+        converted, _ = text_converter_func(original)
+    return save_text_patch(input_path, patch_path, original, converted)
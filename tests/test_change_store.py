@@ -0,0 +1,61 @@
+"""
+Pruebas del almacén SQLite de cambios de un lote.
+
+Ejecutar desde la raíz del repositorio: python -m unittest discover tests
+"""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.batch_processor import BatchProcessor
+from src.change_store import ChangeStore
+from src.converter import DialogConverter
+
+DIALOGS = '"Hola", dijo.\n"Sí", dijo.\n"No", dijo.\n"Bien", dijo.\n'
+
+
+class TestChangeStoreBatch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.input_dir = self.dir / "entrada"
+        self.store_path = self.dir / "cambios.sqlite"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name: str, text: str):
+        path = self.input_dir / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+
+    def test_mismo_nombre_en_subcarpetas(self):
+        self.write("a/cap1.txt", '"Hola", dijo.\n')
+        self.write("b/cap1.txt", DIALOGS)
+        batch = BatchProcessor(DialogConverter(), change_store=self.store_path)
+        batch.process_directory(self.input_dir, self.dir / "salida", recursive=True)
+
+        with ChangeStore(self.store_path) as store:
+            files = {row["name"]: row["changes"] for row in store.files()}
+            self.assertEqual(files, {"a/cap1.txt": 1, "b/cap1.txt": 4})
+            self.assertEqual(len(store.query(file="a/cap1.txt")), 1)
+            self.assertEqual(len(store.query(file="b/cap1.txt")), 4)
+
+    def test_reporte_con_registro_recortado(self):
+        self.write("cap1.txt", DIALOGS)
+        batch = BatchProcessor(
+            DialogConverter(),
+            change_store=self.store_path,
+            log_options={"max_records_per_rule": 1, "sample_size": 0},
+        )
+        batch.process_directory(self.input_dir, self.dir / "salida")
+
+        with ChangeStore(self.store_path) as store:
+            self.assertLess(len(store.query(file="cap1.txt")), 4)
+            report = store.generate_report("cap1.txt")
+        self.assertIn("Total de cambios realizados: 4\n", report)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+"""
+Pruebas del procesador DOCX sobre el modelo de runs.
+
+Ejecutar desde la raíz del repositorio: python -m unittest discover tests
+"""
+
+import tempfile
+import unittest
+import zipfile
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+from src.converter import DialogConverter
+from src.docx_handler import DOCXProcessor
+
+W = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    "</Types>"
+)
+
+
+# Fecha y permisos de las entradas de `make_docx`
+ENTRY_DATE = (2020, 1, 2, 3, 4, 6)
+ENTRY_ATTR = 0o100644 << 16
+
+
+def make_docx(path: Path, body: str):
+    """Escribe un DOCX mínimo con `body` como contenido de w:body."""
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        f'<w:document xmlns:w="{W}"><w:body>{body}</w:body></w:document>'
+    )
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as docx:
+        docx.writestr("[Content_Types].xml", CONTENT_TYPES)
+        info = zipfile.ZipInfo("word/document.xml", ENTRY_DATE)
+        info.external_attr = ENTRY_ATTR
+        docx.writestr(info, document, zipfile.ZIP_DEFLATED)
+
+
+class TestDOCXRuns(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def convert(self, body: str):
+        """Convierte un DOCX con `body` y devuelve los `w:r` de su párrafo."""
+        source = self.dir / "entrada.docx"
+        output = self.dir / "salida.docx"
+        make_docx(source, body)
+        DOCXProcessor(source).process_and_save(output, DialogConverter().convert)
+        with zipfile.ZipFile(output) as docx:
+            root = ET.fromstring(docx.read("word/document.xml"))
+        return root.findall(f".//{{{W}}}r")
+
+    def test_raya_insertada_junto_a_run_con_formato(self):
+        runs = self.convert(
+            "<w:p>"
+            '<w:r><w:t xml:space="preserve">"Hola", dijo </w:t></w:r>'
+            "<w:r><w:rPr><w:b/></w:rPr><w:t>Juan</w:t></w:r>"
+            '<w:r><w:t xml:space="preserve">. "¿Vienes?"</w:t></w:r>'
+            "</w:p>"
+        )
+        texts = [run.findtext(f"{{{W}}}t") for run in runs]
+
+        self.assertEqual("".join(texts), "—Hola —dijo Juan—. ¿Vienes?")
+        # El run en negrita conserva exactamente su texto
+        self.assertIsNotNone(runs[1].find(f"{{{W}}}rPr/{{{W}}}b"))
+        self.assertEqual(texts[1], "Juan")
+        # La raya insertada va con el texto que la sigue, sin formato
+        self.assertTrue(texts[2].startswith("—."))
+
+    def test_document_xml_conserva_sus_metadatos(self):
+        self.convert('<w:p><w:r><w:t>"Hola", dijo.</w:t></w:r></w:p>')
+        with zipfile.ZipFile(self.dir / "salida.docx") as docx:
+            info = docx.getinfo("word/document.xml")
+
+        self.assertEqual(info.date_time, ENTRY_DATE)
+        self.assertEqual(info.external_attr, ENTRY_ATTR)
+
+
+if __name__ == "__main__":
+    unittest.main()
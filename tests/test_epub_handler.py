@@ -0,0 +1,74 @@
+"""
+Pruebas del procesador EPUB.
+
+Ejecutar desde la raíz del repositorio: python -m unittest discover tests
+"""
+
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+
+from src.converter import DialogConverter
+from src.epub_handler import EPUBProcessor
+
+CONTAINER = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">'
+    '<rootfiles><rootfile full-path="OEBPS/content.opf"'
+    ' media-type="application/oebps-package+xml"/></rootfiles></container>'
+)
+
+OPF = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<package xmlns="http://www.idpf.org/2007/opf" version="3.0">'
+    "<manifest>"
+    '<item id="nav" href="nav.xhtml" media-type="application/xhtml+xml"'
+    ' properties="nav"/>'
+    '<item id="cap1" href="cap1.xhtml" media-type="application/xhtml+xml"/>'
+    "</manifest>"
+    '<spine><itemref idref="cap1"/></spine>'
+    "</package>"
+)
+
+
+def make_xhtml(body: str) -> bytes:
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<html xmlns="http://www.w3.org/1999/xhtml"><head><title>t</title></head>'
+        f"<body>{body}</body></html>\n"
+    ).encode("utf-8")
+
+
+class TestEPUBSpine(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_solo_se_convierten_los_documentos_del_spine(self):
+        source = self.dir / "libro.epub"
+        output = self.dir / "salida.epub"
+        nav = make_xhtml('<nav><p>"Índice", dijo.</p></nav>')
+        with zipfile.ZipFile(source, "w", zipfile.ZIP_DEFLATED) as epub:
+            epub.writestr("mimetype", "application/epub+zip", zipfile.ZIP_STORED)
+            epub.writestr("META-INF/container.xml", CONTAINER)
+            epub.writestr("OEBPS/content.opf", OPF)
+            epub.writestr("OEBPS/nav.xhtml", nav)
+            epub.writestr("OEBPS/cap1.xhtml", make_xhtml('<p>"Hola", dijo Juan.</p>'))
+
+        EPUBProcessor(source).process_and_save(output, DialogConverter().convert)
+
+        with zipfile.ZipFile(output) as epub:
+            self.assertEqual(epub.namelist()[0], "mimetype")
+            self.assertEqual(
+                epub.read("OEBPS/cap1.xhtml"), make_xhtml("<p>—Hola, dijo Juan.</p>")
+            )
+            # nav.xhtml no está en el spine: se copia sin tocar
+            self.assertEqual(epub.read("OEBPS/nav.xhtml"), nav)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+"""
+Pruebas del logger de solo contadores en el recorrido de un lote.
+
+Ejecutar desde la raíz del repositorio: python -m unittest discover tests
+"""
+
+import io
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.batch_processor import BatchProcessor
+from src.converter import DialogConverter
+from src.logger import StatsConversionLogger
+
+
+class TestStatsLoggerBatch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.input_dir = self.dir / "entrada"
+        self.input_dir.mkdir()
+        for idx in range(5):
+            (self.input_dir / f"cap{idx}.txt").write_text(
+                f'"Hola {idx}", dijo Juan.\nNarración.\n"Adiós", dijo.\n',
+                encoding="utf-8",
+            )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_lote_en_modo_stats(self):
+        output_dir = self.dir / "salida"
+        batch = BatchProcessor(DialogConverter(), log_mode="stats")
+        result = batch.process_directory(self.input_dir, output_dir)
+
+        self.assertEqual(result["files_processed"], 5)
+        self.assertTrue(all(r["changes"] == 2 for r in result["results"]))
+        summary = json.loads(
+            (output_dir / "resumen_lote.log.json").read_text(encoding="utf-8")
+        )
+        self.assertEqual(summary["total_changes"], 10)
+        self.assertEqual(len(summary["files"]), 5)
+        self.assertIn("CAMBIOS POR ARCHIVO", (output_dir / "resumen_lote.log.txt")
+                      .read_text(encoding="utf-8"))
+
+    def test_metodos_heredados(self):
+        logger = StatsConversionLogger()
+        DialogConverter(logger=logger).convert('"Hola", dijo.')
+
+        self.assertEqual(logger.truncation(), {})
+        self.assertEqual(list(logger.records()), [])
+        buffer = io.StringIO()
+        logger.write_report_header(buffer, logger.total_changes, logger.warnings)
+        logger.write_change_entry(buffer, 1, 1, "D1", '"Hola"', "—Hola")
+        self.assertIn("CAMBIO #1", buffer.getvalue())
+
+    def test_archivos_acotados(self):
+        logger = StatsConversionLogger(max_file_stats=2)
+        converter = DialogConverter(logger=logger)
+        for idx in range(6):
+            logger.begin_file(f"cap{idx}.txt")
+            converter.convert('"Hola", dijo.')
+            self.assertEqual(logger.current_file_stats["changes"], 1)
+
+        self.assertEqual(len(logger.file_stats), 3)
+        other = logger.file_stats[StatsConversionLogger.OTHER_FILES]
+        self.assertEqual(other["files"], 4)
+        self.assertEqual(other["changes"], 4)
+        self.assertEqual(logger.get_stats()["total_changes"], 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
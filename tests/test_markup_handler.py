@@ -0,0 +1,71 @@
+"""
+Pruebas del procesador de Markdown y HTML.
+
+Ejecutar desde la raíz del repositorio: python -m unittest discover tests
+"""
+
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from src.converter import DialogConverter
+from src.markup_handler import MarkupProcessor
+
+
+class TestMarkup(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def convert(self, name: str, text: str) -> str:
+        """Convierte un archivo `name` con `text` y devuelve el resultado."""
+        source = self.dir / name
+        output = self.dir / f"salida{source.suffix}"
+        source.write_text(text, encoding="utf-8", newline="")
+        MarkupProcessor(source).process_and_save(output, DialogConverter().convert)
+        return output.read_text(encoding="utf-8", newline="")
+
+    def test_fragmento_de_codigo_intacto(self):
+        converted = self.convert(
+            "capitulo.md",
+            '"Usa `print("hola")`", dijo Ana.\n\n```\n"Hola", dijo.\n```\n',
+        )
+
+        self.assertEqual(
+            converted, '—Usa `print("hola")`, dijo Ana.\n\n```\n"Hola", dijo.\n```\n'
+        )
+
+    def test_entidades_html(self):
+        converted = self.convert(
+            "capitulo.html",
+            "<p>&quot;Hola&quot;, dijo Juan &amp; Ana.</p>\r\n"
+            '<p title="&quot;no&quot;">&laquo;Vale&raquo;, dijo.</p>\r\n',
+        )
+
+        # Las entidades que no cambian se conservan tal cual, igual que
+        # los atributos y los finales de línea
+        self.assertEqual(
+            converted,
+            "<p>—Hola, dijo Juan &amp; Ana.</p>\r\n"
+            '<p title="&quot;no&quot;">—Vale, dijo.</p>\r\n',
+        )
+
+    def test_el_documento_se_analiza_una_vez(self):
+        source = self.dir / "capitulo.md"
+        source.write_text('"Hola", dijo.\n', encoding="utf-8")
+        processor = MarkupProcessor(source)
+
+        with mock.patch.object(processor, "_lex", wraps=processor._lex) as lex:
+            processor.process_and_save(
+                self.dir / "salida.md", DialogConverter().convert
+            )
+
+        self.assertEqual(lex.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
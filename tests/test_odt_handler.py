@@ -0,0 +1,246 @@
+"""
+Pruebas del procesador ODT sobre el modelo de runs.
+
+Ejecutar desde la raíz del repositorio: python -m unittest discover tests
+"""
+
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+from src import converter as converter_module
+from src.converter import DialogConverter
+from src.odt_handler import ODF_NAMESPACES, ODTProcessor, ODTReader
+
+T = ODF_NAMESPACES["text"]
+XML_ID = "{http://www.w3.org/XML/1998/namespace}id"
+
+# Fecha y permisos de content.xml en `make_odt`
+ENTRY_DATE = (2020, 1, 2, 3, 4, 6)
+ENTRY_ATTR = 0o100644 << 16
+
+
+def make_odt(path: Path, body: str, automatic_styles: str = ""):
+    """Escribe un ODT mínimo con `body` como contenido de office:text."""
+    content = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        "<office:document-content"
+        f' xmlns:office="{ODF_NAMESPACES["office"]}"'
+        f' xmlns:style="{ODF_NAMESPACES["style"]}"'
+        f' xmlns:text="{T}"'
+        f' xmlns:fo="{ODF_NAMESPACES["fo"]}"'
+        ' office:version="1.3">'
+        f"<office:automatic-styles>{automatic_styles}</office:automatic-styles>"
+        f"<office:body><office:text>{body}</office:text></office:body>"
+        "</office:document-content>"
+    )
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as odt:
+        odt.writestr(
+            zipfile.ZipInfo("mimetype"), "application/vnd.oasis.opendocument.text"
+        )
+        info = zipfile.ZipInfo("content.xml", ENTRY_DATE)
+        info.external_attr = ENTRY_ATTR
+        odt.writestr(info, content, zipfile.ZIP_DEFLATED)
+
+
+class TestODTSpans(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def convert(self, body: str):
+        """Convierte un ODT con `body` y devuelve su primer párrafo."""
+        source = self.dir / "entrada.odt"
+        output = self.dir / "salida.odt"
+        make_odt(source, body)
+        ODTProcessor(source).process_and_save(output, DialogConverter().convert)
+        with zipfile.ZipFile(output) as odt:
+            root = ET.fromstring(odt.read("content.xml"))
+        return root.find(f".//{{{T}}}p")
+
+    def test_spans_anidados_se_conservan(self):
+        paragraph = self.convert(
+            '<text:p><text:span text:style-name="A">"Hola", dijo '
+            '<text:span text:style-name="B">Juan</text:span>. "¿Vienes?"'
+            "</text:span></text:p>"
+        )
+
+        self.assertEqual("".join(paragraph.itertext()), "—Hola —dijo Juan—. ¿Vienes?")
+        (outer,) = paragraph
+        self.assertEqual(outer.get(f"{{{T}}}style-name"), "A")
+        (inner,) = outer
+        self.assertEqual(inner.get(f"{{{T}}}style-name"), "B")
+        self.assertEqual(inner.text, "Juan")
+
+    def test_atributos_del_span_se_conservan(self):
+        paragraph = self.convert(
+            '<text:p>"Hola", dijo <text:span text:style-name="A" xml:id="s1" '
+            'text:class-names="c1">Juan</text:span>. "¿Vienes?"</text:p>'
+        )
+
+        self.assertEqual("".join(paragraph.itertext()), "—Hola —dijo Juan—. ¿Vienes?")
+        (span,) = paragraph
+        self.assertEqual(span.get(XML_ID), "s1")
+        self.assertEqual(span.get(f"{{{T}}}class-names"), "c1")
+        self.assertEqual(span.text, "Juan")
+
+    def test_span_con_id_no_se_duplica_en_line_break(self):
+        paragraph = self.convert(
+            '<text:p><text:span xml:id="s1">"Hola", dijo Juan.'
+            '<text:line-break/>"¿Vienes?"</text:span></text:p>'
+        )
+
+        (span,) = paragraph
+        self.assertEqual(span.get(XML_ID), "s1")
+        self.assertEqual([child.tag for child in span], [f"{{{T}}}line-break"])
+        self.assertEqual(span.text, "—Hola, dijo Juan.")
+        self.assertEqual(span[0].tail, "—¿Vienes?")
+
+    def test_content_xml_conserva_sus_metadatos(self):
+        self.convert('<text:p>"Hola", dijo.</text:p>')
+        with zipfile.ZipFile(self.dir / "salida.odt") as odt:
+            info = odt.getinfo("content.xml")
+
+        self.assertEqual(info.date_time, ENTRY_DATE)
+        self.assertEqual(info.external_attr, ENTRY_ATTR)
+
+
+class TestODTParagraphMemo(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_parrafo_repetido_no_se_convierte_de_nuevo(self):
+        source = self.dir / "entrada.odt"
+        output = self.dir / "salida.odt"
+        paragraph = '"Hola", dijo <text:span text:style-name="A">Juan</text:span>.'
+        make_odt(
+            source,
+            f"<text:p>{paragraph}</text:p>"
+            f'<text:h text:outline-level="1">{paragraph}</text:h>'
+            f"<text:p>{paragraph}</text:p>",
+        )
+
+        converter = DialogConverter()
+        with mock.patch.object(
+            converter_module,
+            "convert_isolated",
+            wraps=converter_module.convert_isolated,
+        ) as isolated:
+            ODTProcessor(source).process_and_save(output, converter.convert)
+
+        self.assertEqual(isolated.call_count, 1)
+        # El log es el de convertir los tres párrafos en serie
+        self.assertEqual(
+            [rec.occurrences[0][2] for rec in converter.logger.changes], [1, 2, 3]
+        )
+        with zipfile.ZipFile(output) as odt:
+            root = ET.fromstring(odt.read("content.xml"))
+        texts = ["".join(elem.itertext()) for elem in root.find(".//{*}text")]
+        self.assertEqual(texts, ["—Hola, dijo Juan."] * 3)
+
+
+ITALIC_STYLES = "".join(
+    f'<style:style style:name="{name}" style:family="text">'
+    '<style:text-properties fo:font-style="italic"/></style:style>'
+    for name in ("T1", "T2", "T3")
+)
+
+
+class TestODTStyleFolding(unittest.TestCase):
+    """Plegado de estilos de texto equivalentes según el modo."""
+
+    BODY = (
+        '<text:p>"Hola", dijo <text:span text:style-name="T2">Juan</text:span>.</text:p>'
+        '<text:section text:name="Codigo">'
+        '<text:p>"x" <text:span text:style-name="T3">y</text:span></text:p>'
+        "</text:section>"
+    )
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.source = self.dir / "entrada.odt"
+        make_odt(self.source, self.BODY, ITALIC_STYLES)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def convert(self, **options):
+        """Convierte el ODT; devuelve los estilos definidos y los del 1.er párrafo."""
+        output = self.dir / "salida.odt"
+        processor = ODTProcessor(self.source, exclude_sections=["Codigo"], **options)
+        processor.process_and_save(output, DialogConverter().convert)
+        with zipfile.ZipFile(output) as odt:
+            root = ET.fromstring(odt.read("content.xml"))
+        style_name = f"{{{ODF_NAMESPACES['style']}}}name"
+        defined = [
+            style.get(style_name)
+            for style in root.iter(f"{{{ODF_NAMESPACES['style']}}}style")
+        ]
+        spans = [
+            span.get(f"{{{T}}}style-name")
+            for span in root.find(f".//{{{T}}}p").iter(f"{{{T}}}span")
+        ]
+        return defined, spans
+
+    def test_modo_arbol_elimina_estilos_plegados(self):
+        defined, spans = self.convert()
+
+        self.assertEqual(spans, ["T1"])
+        # T2 ya no se usa; T3 sigue en la sección excluida
+        self.assertEqual(defined, ["T1", "T3"])
+
+    def test_streaming_y_splice_conservan_las_definiciones(self):
+        for options in ({"streaming": True}, {"splice": True}):
+            with self.subTest(**options):
+                defined, spans = self.convert(**options)
+
+                self.assertEqual(spans, ["T1"])
+                self.assertEqual(defined, ["T1", "T2", "T3"])
+
+
+
+class TestODTReader(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_texto_igual_al_de_siempre(self):
+        source = self.dir / "entrada.odt"
+        make_odt(
+            source,
+            "<text:h>Capítulo<text:s/>uno</text:h>"
+            '<text:p>"Hola",<text:s text:c="3"/>dijo<text:tab/>Juan.<text:line-break/>'
+            '<text:span text:style-name="A">"Ya"'
+            '<text:note text:note-class="footnote">'
+            "<text:note-citation>1</text:note-citation>"
+            "<text:note-body><text:p>Nota al pie.</text:p></text:note-body>"
+            "</text:note></text:span> fin.</text:p>"
+            "<text:p>   </text:p><text:p>Último.</text:p>",
+        )
+
+        # Salida de extract_text antes del recorrido iterativo: las notas
+        # van en línea (y después por separado) y text:s / text:tab no
+        # aportan texto
+        self.assertEqual(
+            ODTReader(source).extract_text(),
+            'Capítulouno\n"Hola",dijoJuan.\n"Ya"1Nota al pie. fin.\n'
+            "Nota al pie.\nÚltimo.",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
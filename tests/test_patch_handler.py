@@ -0,0 +1,99 @@
+"""
+Pruebas de los parches: aplicar el parche da lo mismo que convertir.
+
+Ejecutar desde la raíz del repositorio: python -m unittest discover tests
+"""
+
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+
+from src.converter import DialogConverter
+from src.odt_handler import ODF_NAMESPACES, ODTProcessor
+from src.patch_handler import apply_patch, patch_path_for, save_patch
+
+
+def make_odt(path: Path, body: str):
+    """Escribe un ODT mínimo con `body` como contenido de office:text."""
+    content = (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        "<office:document-content"
+        f' xmlns:office="{ODF_NAMESPACES["office"]}"'
+        f' xmlns:text="{ODF_NAMESPACES["text"]}" office:version="1.3">\n'
+        f"<office:body><office:text>{body}</office:text></office:body>\n"
+        "</office:document-content>\n"
+    )
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as odt:
+        odt.writestr(
+            "mimetype", "application/vnd.oasis.opendocument.text", zipfile.ZIP_STORED
+        )
+        odt.writestr("content.xml", content)
+
+
+class TestPatchRoundTrip(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def patch_and_apply(self, source: Path) -> Path:
+        """Guarda el parche de `source`, lo aplica a otra ruta y la devuelve."""
+        patch_path = patch_path_for(source, self.dir)
+        save_patch(source, patch_path, DialogConverter().convert)
+        return apply_patch(patch_path, output=self.dir / f"parcheado{source.suffix}")
+
+    def test_txt_igual_a_la_conversion(self):
+        source = self.dir / "capitulo.txt"
+        text = 'Narración.\r\n"Hola", dijo Juan.\r\nMás.\n"Adiós", dijo.'
+        source.write_text(text, encoding="utf-8", newline="")
+
+        patched = self.patch_and_apply(source)
+
+        expected, _ = DialogConverter().convert(text)
+        self.assertEqual(patched.read_text(encoding="utf-8", newline=""), expected)
+        self.assertEqual(source.read_text(encoding="utf-8", newline=""), text)
+
+    def test_odt_igual_a_splice(self):
+        source = self.dir / "capitulo.odt"
+        make_odt(
+            source,
+            "<text:p>Narración.</text:p>\n"
+            '<text:p>"Hola", dijo <text:span text:style-name="A">Juan</text:span>.'
+            "</text:p>\n"
+            '<text:p>"Adiós", dijo.</text:p>',
+        )
+        spliced = self.dir / "splice.odt"
+        ODTProcessor(source, splice=True).process_and_save(
+            spliced, DialogConverter().convert
+        )
+
+        patched = self.patch_and_apply(source)
+
+        contents = []
+        for path in (source, spliced, patched):
+            with zipfile.ZipFile(path) as odt:
+                contents.append((odt.namelist(), odt.read("content.xml")))
+        original, expected, result = contents
+        self.assertNotEqual(expected, original)
+        self.assertEqual(result, expected)
+
+    def test_odt_con_retorno_de_carro(self):
+        source = self.dir / "capitulo.odt"
+        # El parser normaliza los CR de un texto XML; el parche los conserva
+        make_odt(source, '<text:p>"Hola",&#13;\r\n dijo Juan.</text:p>')
+        spliced = self.dir / "splice.odt"
+        ODTProcessor(source, splice=True).process_and_save(
+            spliced, DialogConverter().convert
+        )
+
+        patched = self.patch_and_apply(source)
+
+        with zipfile.ZipFile(spliced) as a, zipfile.ZipFile(patched) as b:
+            self.assertEqual(b.read("content.xml"), a.read("content.xml"))
+
+
+if __name__ == "__main__":
+    unittest.main()